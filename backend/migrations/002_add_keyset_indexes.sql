@@ -0,0 +1,7 @@
+-- Composite indexes backing (created_at, id) keyset pagination
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_blog_posts_created_at_id ON blog_posts(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_comments_created_at_id ON comments(created_at, id);
+
+-- Per-post comment listing, ordered by creation time
+CREATE INDEX IF NOT EXISTS idx_comments_blog_post_id_created_at ON comments(blog_post_id, created_at, id);
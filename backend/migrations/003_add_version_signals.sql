@@ -0,0 +1,7 @@
+-- Version signals used to build ETags for conditional GETs
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+-- Per-table version counters, bumped by the API after every committed write
+CREATE SEQUENCE IF NOT EXISTS users_version_seq;
+CREATE SEQUENCE IF NOT EXISTS blog_posts_version_seq;
+CREATE SEQUENCE IF NOT EXISTS comments_version_seq;
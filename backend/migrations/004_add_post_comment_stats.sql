@@ -0,0 +1,16 @@
+-- Denormalized comment statistics, kept up to date by the API's comment writes
+ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS last_comment_at TIMESTAMP;
+
+-- Backfill from existing comments (re-run later with: python -m app.comment_stats)
+UPDATE blog_posts
+SET comment_count = stats.comment_count, last_comment_at = stats.last_comment_at
+FROM (
+    SELECT blog_post_id, COUNT(*) AS comment_count, MAX(created_at) AS last_comment_at
+    FROM comments
+    GROUP BY blog_post_id
+) AS stats
+WHERE blog_posts.id = stats.blog_post_id;
+
+-- Keyset index for the "most discussed" sort
+CREATE INDEX IF NOT EXISTS idx_blog_posts_comment_count_id ON blog_posts(comment_count, id);
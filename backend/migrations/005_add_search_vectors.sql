@@ -0,0 +1,13 @@
+-- Full-text search documents. Generated columns stay current on every INSERT/UPDATE; adding
+-- them rewrites the tables, which backfills the vectors of existing rows.
+ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED;
+
+ALTER TABLE comments ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_blog_posts_search_vector ON blog_posts USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_comments_search_vector ON comments USING GIN (search_vector);
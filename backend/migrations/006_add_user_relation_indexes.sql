@@ -0,0 +1,5 @@
+-- migrate:no-transaction
+-- A user's newest posts and comments (?include=blog_posts,comments), read per user in index
+-- order instead of sorting all of the user's rows
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_blog_posts_user_id_created_at ON blog_posts(user_id, created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_comments_user_id_created_at ON comments(user_id, created_at, id);
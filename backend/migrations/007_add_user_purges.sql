@@ -0,0 +1,13 @@
+-- Progress of batched background user deletes (DELETE /api/users/{id}?background=true)
+CREATE TABLE IF NOT EXISTS user_purges (
+    user_id INTEGER PRIMARY KEY,
+    status VARCHAR(20) NOT NULL,
+    comments_total INTEGER NOT NULL DEFAULT 0,
+    comments_deleted INTEGER NOT NULL DEFAULT 0,
+    blog_posts_total INTEGER NOT NULL DEFAULT 0,
+    blog_posts_deleted INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
@@ -3,6 +3,60 @@ import * as path from "node:path";
 import type { Pool } from "pg";
 import type { Migration } from "./types";
 
+// Files starting with this line run statement by statement outside a transaction, which
+// CREATE INDEX CONCURRENTLY requires (same convention as backend_python/app/migrations.py)
+const NO_TRANSACTION_MARKER = "-- migrate:no-transaction";
+const CONCURRENT_INDEX =
+  /CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)/gi;
+
+// Split a script on top-level semicolons, skipping comments, quotes and $$ bodies
+export function splitStatements(sql: string): string[] {
+  const statements: string[] = [];
+  let current = "";
+  let i = 0;
+  while (i < sql.length) {
+    if (sql.startsWith("--", i)) {
+      const end = sql.indexOf("\n", i);
+      i = end === -1 ? sql.length : end;
+      continue;
+    }
+    if (sql.startsWith("/*", i)) {
+      const end = sql.indexOf("*/", i + 2);
+      i = end === -1 ? sql.length : end + 2;
+      continue;
+    }
+    if (sql[i] === "'") {
+      // A doubled quote inside a literal is an escaped quote
+      let end = sql.indexOf("'", i + 1);
+      while (end !== -1 && sql.startsWith("''", end)) {
+        end = sql.indexOf("'", end + 2);
+      }
+      end = end === -1 ? sql.length : end + 1;
+      current += sql.slice(i, end);
+      i = end;
+      continue;
+    }
+    const dollar = /^\$\w*\$/.exec(sql.slice(i));
+    if (dollar) {
+      const tag = dollar[0];
+      let end = sql.indexOf(tag, i + tag.length);
+      end = end === -1 ? sql.length : end + tag.length;
+      current += sql.slice(i, end);
+      i = end;
+      continue;
+    }
+    if (sql[i] === ";") {
+      statements.push(current.trim());
+      current = "";
+    } else {
+      current += sql[i];
+    }
+    i += 1;
+  }
+  statements.push(current.trim());
+  return statements.filter((statement) => statement.length > 0);
+}
+
 export class MigrationRunner {
   private pool: Pool;
   private migrationsDir: string;
@@ -105,6 +159,12 @@ export class MigrationRunner {
       const migrationPath = path.join(this.migrationsDir, filename);
       const migrationSQL = await fs.readFile(migrationPath, "utf8");
 
+      if (migrationSQL.trimStart().startsWith(NO_TRANSACTION_MARKER)) {
+        await this.executeWithoutTransaction(filename, migrationSQL);
+        console.log(`Migration completed: ${filename}`);
+        return;
+      }
+
       await this.pool.query("BEGIN");
 
       try {
@@ -126,4 +186,34 @@ export class MigrationRunner {
       throw error;
     }
   }
+
+  private async executeWithoutTransaction(filename: string, migrationSQL: string): Promise<void> {
+    // CONCURRENTLY is rejected inside a transaction block and in a multi-statement query, so
+    // every statement is sent on its own. The files are idempotent (IF NOT EXISTS) and are
+    // simply rerun after a failure.
+    await this.dropInvalidIndexes(migrationSQL);
+    for (const statement of splitStatements(migrationSQL)) {
+      await this.pool.query(statement);
+    }
+    await this.pool.query("INSERT INTO migrations (filename) VALUES ($1)", [filename]);
+  }
+
+  private async dropInvalidIndexes(migrationSQL: string): Promise<void> {
+    // An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS would skip
+    const names = Array.from(migrationSQL.matchAll(CONCURRENT_INDEX), (match) => match[1]);
+    if (names.length === 0) {
+      return;
+    }
+    const result = await this.pool.query<{ relname: string }>(
+      `SELECT index_class.relname
+       FROM pg_index
+       JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+       WHERE NOT pg_index.indisvalid AND index_class.relname = ANY($1)`,
+      [names],
+    );
+    for (const { relname } of result.rows) {
+      console.log(`Dropping invalid index left by an interrupted build: ${relname}`);
+      await this.pool.query(`DROP INDEX CONCURRENTLY IF EXISTS "${relname}"`);
+    }
+  }
 }
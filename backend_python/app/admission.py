@@ -0,0 +1,237 @@
+"""Admission control for the API routes.
+
+Every ``/api/`` request needs a slot before it reaches the routers. Slots are sized from the
+database pool (``DB_POOL_SIZE + DB_MAX_OVERFLOW`` per worker), so admitted requests find a free
+connection instead of queueing inside the pool for ``DB_POOL_TIMEOUT``. Requests are classed as:
+
+- ``read``: detail GETs and paginated lists, up to every slot
+- ``write``: POST/PUT/DELETE, up to ``ADMISSION_WRITE_LIMIT`` slots (half by default)
+- ``bulk``: unpaginated or large lists, streams, ``include=`` and search, up to
+  ``ADMISSION_BULK_LIMIT`` slots (a quarter by default)
+
+A request without a free slot waits in a queue of at most ``ADMISSION_QUEUE_SIZE`` entries, for
+at most ``ADMISSION_MAX_WAIT`` seconds; freed slots go to reads first, then writes, then bulk
+requests. When the queue is full a newcomer displaces the lowest priority waiter, or is turned
+away itself. Rejected requests get ``503`` with ``Retry-After`` at once, so overload shows up as
+fast rejections of the least important work instead of every request timing out together.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import os
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+from starlette.routing import Match
+
+from .database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from .metrics import ADMISSION_REJECTED, ADMISSION_WAIT
+
+load_dotenv()
+
+ADMISSION = os.getenv("ADMISSION", "true").lower() in ("1", "true", "yes")
+POOL_CAPACITY = DB_POOL_SIZE + DB_MAX_OVERFLOW
+ADMISSION_LIMIT = int(os.getenv("ADMISSION_LIMIT", str(POOL_CAPACITY)))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", str(max(ADMISSION_LIMIT // 2, 1))))
+ADMISSION_BULK_LIMIT = int(os.getenv("ADMISSION_BULK_LIMIT", str(max(ADMISSION_LIMIT // 4, 1))))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", str(ADMISSION_LIMIT * 4)))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "2"))
+# Lists asking for more rows than this are bulk requests
+BULK_PAGE_SIZE = int(os.getenv("BULK_PAGE_SIZE", "100"))
+
+# Lower runs first
+PRIORITIES = {"read": 0, "write": 1, "bulk": 2}
+# Routes that are bulk whatever their parameters
+BULK_ROUTES = {"/api/search"}
+NDJSON_MEDIA_TYPE = b"application/x-ndjson"
+# (method, route path) of requests that wait without holding a connection and bound their own
+# queue (see group_commit); they are not admitted here
+UNPOOLED_ROUTES: set[tuple[str, str]] = set()
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+class _Waiter:
+    def __init__(self, kind: str, seq: int):
+        self.kind = kind
+        self.key = (PRIORITIES[kind], seq)
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class Admission:
+    """Concurrency slots with per-class limits and a bounded priority queue.
+
+    Only used from the event loop, so no locking is needed. A freed slot is handed directly to
+    the waiter that gets it, so queued requests never race new arrivals for it.
+    """
+
+    def __init__(
+        self,
+        limit: int = ADMISSION_LIMIT,
+        write_limit: int = ADMISSION_WRITE_LIMIT,
+        bulk_limit: int = ADMISSION_BULK_LIMIT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        max_wait: float = ADMISSION_MAX_WAIT,
+    ):
+        self.limit = limit
+        self.limits = {"read": limit, "write": write_limit, "bulk": bulk_limit}
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.active = dict.fromkeys(PRIORITIES, 0)
+        self.waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _can_run(self, kind: str) -> bool:
+        return self.in_flight < self.limit and self.active[kind] < self.limits[kind]
+
+    def _grant(self, kind: str) -> None:
+        self.in_flight += 1
+        self.active[kind] += 1
+
+    async def acquire(self, kind: str) -> None:
+        if self._can_run(kind):
+            self._grant(kind)
+            return
+
+        waiter = _Waiter(kind, next(self._seq))
+        if len(self.waiters) >= self.queue_size:
+            worst = max(self.waiters, key=lambda queued: queued.key)
+            if worst.key < waiter.key:
+                raise Rejected("queue_full")
+            self.waiters.remove(worst)
+            worst.future.set_exception(Rejected("displaced"))
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter.future, self.max_wait)
+        except asyncio.TimeoutError:
+            raise Rejected("timeout") from None
+        except asyncio.CancelledError:
+            # The client went away; give back a slot that was granted meanwhile
+            future = waiter.future
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(kind)
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+    def release(self, kind: str) -> None:
+        self.in_flight -= 1
+        self.active[kind] -= 1
+        for waiter in sorted(self.waiters, key=lambda queued: queued.key):
+            if waiter.future.done() or not self._can_run(waiter.kind):
+                continue
+            self.waiters.remove(waiter)
+            self._grant(waiter.kind)
+            waiter.future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "active": dict(self.active),
+            "limits": dict(self.limits),
+        }
+
+
+_list_routes: dict[int, bool] = {}
+
+
+def _is_list(route) -> bool:
+    # List routes are the ones that paginate (routes are not hashable; they live as long as the
+    # app, so their ids are stable)
+    is_list = _list_routes.get(id(route))
+    if is_list is None:
+        dependant = getattr(route, "dependant", None)
+        is_list = dependant is not None and any(p.name == "limit" for p in dependant.query_params)
+        _list_routes[id(route)] = is_list
+    return is_list
+
+
+def match_route(scope):
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def classify(scope, route) -> str:
+    if scope["method"] not in ("GET", "HEAD"):
+        return "write"
+    if route is None:
+        return "read"
+    if route.path in BULK_ROUTES:
+        return "bulk"
+    params = parse_qs(scope["query_string"].decode("latin-1"))
+    if "stream" in params or "include" in params:
+        return "bulk"
+    if any(name == b"accept" and NDJSON_MEDIA_TYPE in value for name, value in scope["headers"]):
+        return "bulk"
+    if _is_list(route):
+        limit = params.get("limit")
+        if limit is None and "cursor" not in params:
+            return "bulk"
+        if limit is not None and limit[0].isdigit() and int(limit[0]) > BULK_PAGE_SIZE:
+            return "bulk"
+    return "read"
+
+
+async def busy_response(send, retry_after: float) -> None:
+    body = json.dumps({"detail": "Server is busy, retry later"}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+admission = Admission()
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: Admission = admission):
+        self.app = app
+        self.admission = controller
+        self.wait_children = {kind: ADMISSION_WAIT.labels(kind) for kind in PRIORITIES}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        route = match_route(scope)
+        if route is not None and (scope["method"], route.path) in UNPOOLED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+        kind = classify(scope, route)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await self.admission.acquire(kind)
+        except Rejected as e:
+            ADMISSION_REJECTED.labels(kind, e.reason).inc()
+            if route is not None:
+                # Label the rejection with its route in the request metrics
+                scope["route"] = route
+            await busy_response(send, self.admission.max_wait)
+            return
+        self.wait_children[kind].observe(loop.time() - started)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release(kind)
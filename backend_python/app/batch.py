@@ -0,0 +1,19 @@
+import os
+
+from fastapi import HTTPException
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+
+def check_batch_size(items: list) -> None:
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {MAX_BATCH_SIZE} items)")
+
+
+def batch_result(created: list, errors: list[tuple[int, str]]) -> dict:
+    return {
+        "created": created,
+        "errors": [{"index": index, "detail": detail} for index, detail in sorted(errors)],
+    }
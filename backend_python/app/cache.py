@@ -0,0 +1,364 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import orjson
+from dotenv import load_dotenv
+from sqlalchemy.util import await_only
+from starlette.concurrency import run_in_threadpool
+
+from .events import CACHE_TOPIC, EVENT_BUS, event_bus
+
+load_dotenv()
+
+# Worker processes; python -m app.server exports the count it starts
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def default_cache_backend() -> str:
+    # A per-process cache only sees its own worker's invalidations unless the Postgres event
+    # bus carries them to every worker
+    if WEB_CONCURRENCY <= 1 or EVENT_BUS == "postgres":
+        return "memory"
+    return "none"
+
+
+# Cache configuration: "memory" (per-process LRU), "redis" (shared) or "none"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND") or default_cache_backend()
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Writes touching more posts than this drop every cached post response instead of each post's
+CACHE_MAX_TARGETED_INVALIDATIONS = int(os.getenv("CACHE_MAX_TARGETED_INVALIDATIONS", "100"))
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Interface for response cache backends.
+
+    Values are the plain dicts/lists returned by the route handlers. Implementations must be
+    safe to call from both the event loop and threadpool workers; ``blocking`` ones do I/O, so
+    ``get_or_load`` calls them in the threadpool.
+    """
+
+    blocking = False
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped on every invalidation so in-flight loads do not store stale results
+        self.invalidations = 0
+
+    @abstractmethod
+    def get(self, key: str):
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        ...
+
+    async def get_or_load(self, key: str, loader):
+        value = await run_in_threadpool(self.get, key) if self.blocking else self.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        generation = self.invalidations
+        value = await loader()
+        if generation == self.invalidations:
+            if self.blocking:
+                await run_in_threadpool(self.set, key, value)
+            else:
+                self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": self.size(),
+        }
+
+
+class NullCache(CacheBackend):
+    def get(self, key):
+        return _MISSING
+
+    def set(self, key, value):
+        pass
+
+    # Invalidations are still counted: request coalescing relies on them
+    def delete(self, *keys):
+        self.invalidations += 1
+
+    def delete_prefix(self, prefix):
+        self.invalidations += 1
+
+    def clear(self):
+        self.invalidations += 1
+
+    def size(self):
+        return 0
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU bounded by entry count, with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            self.invalidations += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            self.invalidations += 1
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+# Pre-encoded JSON bodies (bytes, see serialization) are stored as strings under this key
+_JSON_BYTES = "__json_bytes__"
+
+
+def _encode_bytes(value):
+    if isinstance(value, bytes):
+        return {_JSON_BYTES: value.decode()}
+    raise TypeError
+
+
+def encode_value(value) -> bytes:
+    """Encode a cached value for a shared store: JSON only, never anything executable."""
+    return orjson.dumps(value, default=_encode_bytes)
+
+
+def _restore(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and _JSON_BYTES in value:
+            return value[_JSON_BYTES].encode()
+        return {key: _restore(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_restore(item) for item in value]
+    return value
+
+
+def decode_value(raw: bytes):
+    # Tuples come back as lists and datetimes as ISO strings, which the response models accept
+    return _restore(orjson.loads(raw))
+
+
+class RedisCache(CacheBackend):
+    """Shared cache for multi-process deployments. Requires the optional ``redis`` package."""
+
+    blocking = True
+
+    def __init__(
+        self, url: str = REDIS_URL, ttl: float = CACHE_TTL, namespace: str = "blog:", client=None
+    ):
+        super().__init__()
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from None
+            client = redis.Redis.from_url(url)
+
+        self.client = client
+        self.ttl = ttl
+        self.namespace = namespace
+
+    def _call(self, fn, *args):
+        # Invalidations run in query functions: in a threadpool worker in sync mode, but in a
+        # run_sync greenlet on the event loop thread in async mode, where the call is handed to
+        # the threadpool and awaited instead
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return fn(*args)
+        return await_only(run_in_threadpool(fn, *args))
+
+    def get(self, key):
+        raw = self.client.get(self.namespace + key)
+        if raw is None:
+            return _MISSING
+        return decode_value(raw)
+
+    def set(self, key, value):
+        self.client.set(self.namespace + key, encode_value(value), px=int(self.ttl * 1000))
+
+    def delete(self, *keys):
+        self.invalidations += 1
+        if keys:
+            self._call(self.client.delete, *(self.namespace + key for key in keys))
+
+    def delete_prefix(self, prefix):
+        self.invalidations += 1
+        self._call(self._delete_matching, self.namespace + prefix + "*")
+
+    def _delete_matching(self, pattern: str) -> None:
+        batch = []
+        for key in self.client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def clear(self):
+        self.delete_prefix("")
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.namespace + "*", count=500))
+
+
+def create_cache() -> CacheBackend:
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    if CACHE_BACKEND == "redis":
+        return RedisCache()
+    if WEB_CONCURRENCY > 1 and EVENT_BUS != "postgres":
+        print(
+            "Warning: with CACHE_BACKEND=memory and several workers, writes are not invalidated "
+            "in the other workers' caches; use EVENT_BUS=postgres or CACHE_BACKEND=redis"
+        )
+    return LRUCache()
+
+
+response_cache = create_cache()
+
+# Per-process caches hear about writes handled by other workers through the event bus
+BROADCAST_INVALIDATIONS = isinstance(response_cache, LRUCache) and EVENT_BUS == "postgres"
+
+
+def _origin() -> str:
+    # Evaluated per call: preloaded workers are forked after import
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _invalidate(keys: tuple[str, ...] = (), prefixes: tuple[str, ...] = ()) -> None:
+    _apply_invalidation(keys, prefixes)
+    if BROADCAST_INVALIDATIONS:
+        event_bus.publish(
+            [CACHE_TOPIC],
+            {
+                "type": "cache.invalidate",
+                "origin": _origin(),
+                "keys": list(keys),
+                "prefixes": list(prefixes),
+            },
+        )
+
+
+def _apply_invalidation(keys, prefixes) -> None:
+    if keys:
+        response_cache.delete(*keys)
+    for prefix in prefixes:
+        response_cache.delete_prefix(prefix)
+
+
+def _on_invalidation(event: dict) -> None:
+    # Every worker receives its own notifications too; those were applied already
+    if event["origin"] != _origin():
+        _apply_invalidation(event["keys"], event["prefixes"])
+
+
+if BROADCAST_INVALIDATIONS:
+    event_bus.handle(CACHE_TOPIC, _on_invalidation)
+    # Invalidations sent while the bus was disconnected never arrive
+    event_bus.on_reconnect(response_cache.clear)
+
+
+# Cache keys
+def blog_post_key(blog_post_id: int) -> str:
+    return f"blog_post:{blog_post_id}"
+
+
+def blog_post_list_key(
+    cursor: str | None, limit: int | None, fields: str | None = None, sort: str = "recent"
+) -> str:
+    return f"blog_posts:list:{sort}:{cursor}:{limit}:{fields}"
+
+
+def blog_post_comments_key(
+    blog_post_id: int, cursor: str | None, limit: int | None, fields: str | None = None
+) -> str:
+    return f"blog_post_comments:{blog_post_id}:{cursor}:{limit}:{fields}"
+
+
+# Invalidation helpers, called by the write handlers after commit
+def invalidate_blog_post(blog_post_id: int) -> None:
+    _invalidate(keys=(blog_post_key(blog_post_id),))
+
+
+def invalidate_blog_post_lists() -> None:
+    _invalidate(prefixes=("blog_posts:list:",))
+
+
+def invalidate_blog_post_comments(blog_post_id: int) -> None:
+    _invalidate(prefixes=(f"blog_post_comments:{blog_post_id}:",))
+
+
+def invalidate_all_blog_posts() -> None:
+    _invalidate(prefixes=("blog_post:", "blog_post_comments:", "blog_posts:list:"))
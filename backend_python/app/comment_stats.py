@@ -0,0 +1,191 @@
+"""Per-post comment statistics (``blog_posts.comment_count`` / ``last_comment_at``).
+
+Comment writes adjust the counters in the same transaction. Adjustments are relative
+(``comment_count + n``) so concurrent writers never overwrite each other, and multi-post updates
+go in post id order so concurrent batches cannot deadlock; ``repair`` recomputes the counters
+from the comments table in bulk.
+"""
+
+import argparse
+import os
+from collections import Counter
+
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import BlogPost as BlogPostModel
+from .models import Comment as CommentModel
+
+REPAIR_BATCH_SIZE = int(os.getenv("COMMENT_STATS_REPAIR_BATCH_SIZE", "5000"))
+
+blog_posts = BlogPostModel.__table__
+comments = CommentModel.__table__
+
+
+def comments_added(created_at, added=1) -> dict:
+    """UPDATE values recording ``added`` new comments, the latest created at ``created_at``."""
+    return {
+        "comment_count": blog_posts.c.comment_count + added,
+        "last_comment_at": func.greatest(blog_posts.c.last_comment_at, created_at),
+        # Statistics are not an edit of the post itself
+        "updated_at": blog_posts.c.updated_at,
+    }
+
+
+def comment_removed(comment_id, created_at) -> dict:
+    """UPDATE values recording the deletion of one comment.
+
+    Evaluated in the same statement as the DELETE, so the deleted row is excluded explicitly.
+    """
+    remaining = (
+        select(func.max(comments.c.created_at))
+        .where(comments.c.blog_post_id == blog_posts.c.id, comments.c.id != comment_id)
+        .scalar_subquery()
+    )
+    return {
+        "comment_count": blog_posts.c.comment_count - 1,
+        "last_comment_at": case(
+            (blog_posts.c.last_comment_at > created_at, blog_posts.c.last_comment_at),
+            else_=remaining,
+        ),
+        "updated_at": blog_posts.c.updated_at,
+    }
+
+
+def record_comments_added(db: Session, rows) -> None:
+    """Apply the counters for freshly inserted comment rows (one UPDATE per post)."""
+    stats = {}
+    for row in rows:
+        added, last = stats.get(row.blog_post_id, (0, row.created_at))
+        stats[row.blog_post_id] = (added + 1, max(last, row.created_at))
+    if not stats:
+        return
+
+    statement = (
+        update(blog_posts)
+        .where(blog_posts.c.id == bindparam("b_blog_post_id"))
+        .values(comments_added(bindparam("b_last_comment_at"), bindparam("b_added")))
+    )
+    db.execute(
+        statement,
+        [
+            {"b_blog_post_id": blog_post_id, "b_added": added, "b_last_comment_at": last}
+            for blog_post_id, (added, last) in sorted(stats.items())
+        ],
+    )
+
+
+def record_user_comments_removed(db: Session, user_id: int) -> None:
+    """Discount a user's comments from every post, ahead of deleting the user."""
+    removed = (
+        select(comments.c.blog_post_id, func.count().label("removed"))
+        .where(comments.c.user_id == user_id)
+        .group_by(comments.c.blog_post_id)
+        .subquery()
+    )
+    remaining = (
+        select(func.max(comments.c.created_at))
+        .where(comments.c.blog_post_id == blog_posts.c.id, comments.c.user_id != user_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(blog_posts)
+        .where(blog_posts.c.id == removed.c.blog_post_id)
+        .values(
+            comment_count=blog_posts.c.comment_count - removed.c.removed,
+            last_comment_at=remaining,
+            updated_at=blog_posts.c.updated_at,
+        )
+    )
+
+
+def record_comments_removed(db: Session, blog_post_ids) -> None:
+    """Apply the counters after a bulk comment delete, given each deleted row's ``blog_post_id``.
+
+    Runs after the DELETE, so the latest remaining comment is simply the newest one left.
+    """
+    removed = Counter(blog_post_ids)
+    if not removed:
+        return
+
+    last = (
+        select(func.max(comments.c.created_at))
+        .where(comments.c.blog_post_id == blog_posts.c.id)
+        .scalar_subquery()
+    )
+    statement = (
+        update(blog_posts)
+        .where(blog_posts.c.id == bindparam("b_blog_post_id"))
+        .values(
+            comment_count=blog_posts.c.comment_count - bindparam("b_removed"),
+            last_comment_at=last,
+            updated_at=blog_posts.c.updated_at,
+        )
+    )
+    db.execute(
+        statement,
+        [
+            {"b_blog_post_id": blog_post_id, "b_removed": count}
+            for blog_post_id, count in sorted(removed.items())
+        ],
+    )
+
+
+def repair(db: Session, batch_size: int = REPAIR_BATCH_SIZE) -> int:
+    """Recompute the counters of every post from the comments table.
+
+    Works through the posts in id order, one committed batch at a time, and only rewrites rows
+    whose counters drifted. Returns the number of repaired posts.
+    """
+    count = select(func.count()).where(comments.c.blog_post_id == blog_posts.c.id).scalar_subquery()
+    last = (
+        select(func.max(comments.c.created_at))
+        .where(comments.c.blog_post_id == blog_posts.c.id)
+        .scalar_subquery()
+    )
+
+    repaired = 0
+    last_id = 0
+    while True:
+        ids = (
+            db.execute(
+                select(blog_posts.c.id)
+                .where(blog_posts.c.id > last_id)
+                .order_by(blog_posts.c.id)
+                .limit(batch_size)
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            return repaired
+
+        result = db.execute(
+            update(blog_posts)
+            .where(
+                blog_posts.c.id.between(ids[0], ids[-1]),
+                or_(
+                    blog_posts.c.comment_count != count,
+                    blog_posts.c.last_comment_at.is_distinct_from(last),
+                ),
+            )
+            .values(comment_count=count, last_comment_at=last, updated_at=blog_posts.c.updated_at)
+        )
+        db.commit()
+        repaired += result.rowcount
+        last_id = ids[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute blog post comment statistics")
+    parser.add_argument("--batch-size", type=int, default=REPAIR_BATCH_SIZE)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        repaired = repair(db, args.batch_size)
+    print(f"Repaired comment statistics of {repaired} blog post(s)")
+
+
+if __name__ == "__main__":
+    main()
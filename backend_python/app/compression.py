@@ -0,0 +1,151 @@
+"""Response compression.
+
+``CompressionMiddleware`` compresses text-like responses (JSON, NDJSON, HTML, JS, CSS, SVG) of at
+least ``COMPRESSION_MIN_SIZE`` bytes with gzip, or brotli when the optional ``brotli`` package is
+installed and the client accepts it. Streamed responses are flushed chunk by chunk, so NDJSON
+exports still arrive row batch by row batch. Responses that are already encoded (precompressed
+static files) pass through untouched.
+
+Compressed responses carry the weak form of the ETag (``W/"..."``): it still identifies the
+content for If-None-Match, whatever the encoding.
+"""
+
+import os
+import zlib
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION = os.getenv("COMPRESSION", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding: str, available) -> str | None:
+    """Pick the first of ``available`` (in server preference order) the client accepts."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def weak_etag(etag: str) -> str:
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits=31 writes the gzip header and trailer
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        flush = zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH
+        return self.compressor.compress(data) + self.compressor.flush(flush)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        chunk = self.compressor.process(data)
+        return chunk + (self.compressor.finish() if last else self.compressor.flush())
+
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self, app, minimum_size: int = COMPRESSION_MIN_SIZE, level: int = COMPRESSION_LEVEL
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    def _compressor(self, encoding: str):
+        return _Brotli(BROTLI_QUALITY) if encoding == "br" else _Gzip(self.level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), ENCODINGS)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type", ""))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["etag"] = weak_etag(headers["etag"])
+                body = compressor.compress(body, not more_body)
+                if more_body:
+                    del headers["content-length"]
+                else:
+                    headers["content-length"] = str(len(body))
+                await send(start)
+            else:
+                body = compressor.compress(body, not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
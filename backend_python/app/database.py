@@ -1,10 +1,22 @@
 import os
+import time
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
+from fastapi import Request, Response
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
+from .instrumentation import (
+    INSTRUMENTATION,
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    instrument_engine,
+)
 from .models import Base
+from .replicas import REPLICA_URLS, Replica, ReplicaSet
 
 load_dotenv()
 
@@ -15,18 +27,137 @@ DB_NAME = os.getenv("DB_NAME", "blogdb")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
+# "sync" runs queries on psycopg2 in the threadpool, "async" on asyncpg in the event loop
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+# Connections per engine (and per worker); admission control sizes its limits from these
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
+
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# After a write, the client's reads stay on the primary this long (replicas may lag behind)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary_until"
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **POOL_OPTIONS
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+if INSTRUMENTATION:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+
+replicas = ReplicaSet(REPLICA_URLS, DB_MODE == "async", POOL_OPTIONS)
+
+
+class Database:
+    """Request-scoped handle that runs ORM work on the configured engine.
+
+    Query functions are written once against a sync ``Session``. In async mode they run
+    through ``AsyncSession.run_sync`` on asyncpg; in sync mode they run in the threadpool.
+    Either way the event loop is never blocked on the database.
+    """
+
+    def __init__(self, session: Session | AsyncSession, replica: Replica | None = None):
+        self.session = session
+        self.replica = replica
+
+    async def run(self, fn, *args, **kwargs):
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def stream(self, statement, batch_size: int = 1000):
+        """Yield result rows in batches from a server-side cursor."""
+        statement = statement.execution_options(yield_per=batch_size)
+        if isinstance(self.session, AsyncSession):
+            result = await self.session.stream(statement)
+            async for partition in result.partitions():
+                yield partition
+            return
 
-def get_db():
-    db = SessionLocal()
+        result = await run_in_threadpool(self.session.execute, statement)
+        partitions = result.partitions()
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                break
+            yield partition
+
+
+@asynccontextmanager
+async def open_database(replica: Replica | None = None):
+    """Open a session on ``replica``, or on the primary when it is ``None``."""
+    if DB_MODE == "async":
+        factory = replica.async_session_factory if replica else AsyncSessionLocal
+        async with factory() as session:
+            yield Database(session, replica)
+    else:
+        db = (replica.session_factory if replica else SessionLocal)()
+        try:
+            yield Database(db, replica)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+def reads_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough that a replica might not have its writes yet."""
     try:
+        return float(request.cookies.get(READ_PRIMARY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request):
+    replica = None
+    if replicas:
+        if reads_primary(request):
+            # conditional_get then skips the response cache as well
+            request.state.read_your_writes = True
+        else:
+            replica = replicas.choose()
+    async with open_database(replica) as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_write_db(response: Response):
+    if replicas:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+    async with open_database() as db:
+        yield db
+
+
+def dispose_engines():
+    # Called in each worker after fork: pooled connections inherited from the parent are
+    # dropped (without closing the parent's sockets) and reopened per process
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+    replicas.dispose(close=False)
 
 
 def create_tables():
@@ -0,0 +1,20 @@
+from sqlalchemy.exc import IntegrityError
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    return "foreign key constraint" in str(error.orig)
+
+
+def violated_foreign_key(error: IntegrityError, *columns: str) -> str | None:
+    """Return which of ``columns`` failed its foreign key check, if any.
+
+    Relies on Postgres' default ``<table>_<column>_fkey`` constraint names, which appear in the
+    error message of both psycopg2 and asyncpg.
+    """
+    if not is_foreign_key_violation(error):
+        return None
+    message = str(error.orig)
+    for column in columns:
+        if f"_{column}_fkey" in message:
+            return column
+    return None
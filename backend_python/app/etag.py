@@ -0,0 +1,104 @@
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .cache import response_cache
+from .serialization import json_response
+from .single_flight import SINGLE_FLIGHT, single_flight
+
+# Per-table version counters. Sequences are used because nextval() is cheap, shared by every
+# worker process and never blocks concurrent writers.
+VERSIONED_TABLES = ("users", "blog_posts", "comments")
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: compressed responses carry W/ tags (see compression)
+    etag = etag.removeprefix("W/")
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def bump_versions(db: Session, *tables: str) -> None:
+    # Called after commit: a reader racing the bump at worst sees an old tag on new data,
+    # which the next poll corrects, never a new tag on old data.
+    for table in tables:
+        assert table in VERSIONED_TABLES, table
+    columns = ", ".join(f"nextval('{table}_version_seq')" for table in tables)
+    db.execute(text(f"SELECT {columns}"))
+
+
+def get_versions(db: Session, *tables: str) -> tuple:
+    columns = ", ".join(f"(SELECT last_value FROM {table}_version_seq)" for table in tables)
+    if "replica" in db.info:
+        # A standby only sees sequence values as WAL-logged, up to 32 calls ahead of nextval(),
+        # so its counters can stand still across writes; the replay position always moves
+        columns += ", pg_last_wal_replay_lsn()::text"
+    return tuple(db.execute(text(f"SELECT {columns}")).one())
+
+
+async def conditional_get(
+    request: Request, response: Response, cache_key: str | None, load_etag, load_body
+):
+    """Serve a GET with ETag/If-None-Match support.
+
+    ``load_etag`` runs a cheap version query; the body is only loaded (and cached together
+    with its tag) when the client's copy is stale. Identical requests in flight at the same
+    time share both loads (see ``single_flight``). A body of ``bytes`` is pre-encoded JSON
+    (see ``serialization``) and is sent as is.
+    """
+
+    # Clients reading their own recent writes bypass the cache, which replica reads fill, and
+    # do not join requests that may have started before their write
+    read_your_writes = getattr(request.state, "read_your_writes", False)
+    if read_your_writes:
+        cache_key = None
+    flight = None
+    if SINGLE_FLIGHT and not read_your_writes:
+        flight = (request.url.path, request.url.query)
+
+    async def coalesced(stage, loader, *key):
+        if flight is None:
+            return await loader()
+        return await single_flight.do((stage, *flight, *key), loader, response_cache.invalidations)
+
+    async def load():
+        etag = await coalesced("etag", load_etag)
+        if etag is not None and etag_matches(request, etag):
+            raise NotModified(etag)
+        return etag, await coalesced("body", load_body, etag)
+
+    try:
+        if cache_key is None:
+            etag, body = await load()
+        else:
+            etag, body = await response_cache.get_or_load(cache_key, load)
+    except NotModified as e:
+        return not_modified_response(e.etag)
+
+    if etag is not None and etag_matches(request, etag):
+        return not_modified_response(etag)
+    if isinstance(body, bytes):
+        return json_response(body, {"ETag": etag} if etag is not None else None)
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return body
@@ -0,0 +1,233 @@
+"""Change events for the WebSocket feed.
+
+Routers call the ``*_changed`` helpers after committing a write. Events are fanned out through
+an ``EventBus``: ``memory`` delivers within the current process, ``postgres`` uses
+LISTEN/NOTIFY so every worker process receives every event.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Event bus: "memory" (single process) or "postgres" (LISTEN/NOTIFY, multi-worker)
+EVENT_BUS = os.getenv("EVENT_BUS", "memory")
+EVENT_CHANNEL = os.getenv("EVENT_CHANNEL", "blog_events")
+# Seconds between checks of the postgres bus' LISTEN connection
+EVENT_CHECK_INTERVAL = float(os.getenv("EVENT_CHECK_INTERVAL", "5"))
+
+logger = logging.getLogger(__name__)
+
+POSTS_TOPIC = "posts"
+# Topics consumed by the workers themselves (see ``EventBus.handle``), never by WebSocket clients
+CACHE_TOPIC = "cache"
+
+
+def post_topic(blog_post_id: int) -> str:
+    return f"post:{blog_post_id}"
+
+
+def encode_event(topics: list[str], event: dict) -> str:
+    return json.dumps({"topics": topics, "event": event}, separators=(",", ":"), default=str)
+
+
+def decode_event(payload: str) -> tuple[list[str], dict]:
+    message = json.loads(payload)
+    return message["topics"], message["event"]
+
+
+class EventBus(ABC):
+    """Interface for event buses.
+
+    ``publish`` may be called from any thread (route handlers run in the threadpool or in
+    ``run_sync``) and never blocks; ``deliver(topics, event)`` is called on the event loop.
+    Events on a topic registered with ``handle`` go to that handler instead of ``deliver``;
+    callbacks registered with ``on_reconnect`` run after events may have been lost.
+    """
+
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.deliver = None
+        self.handlers = {}
+        self.reconnect_callbacks = []
+        self.published = 0
+
+    def handle(self, topic: str, handler) -> None:
+        self.handlers[topic] = handler
+
+    def on_reconnect(self, callback) -> None:
+        self.reconnect_callbacks.append(callback)
+
+    def _dispatch(self, topics: list[str], event: dict) -> None:
+        handler = self.handlers.get(topics[0]) if len(topics) == 1 else None
+        if handler is not None:
+            handler(event)
+        else:
+            self.deliver(topics, event)
+
+    async def start(self, deliver) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.deliver = deliver
+
+    async def stop(self) -> None:
+        self.loop = None
+
+    def publish(self, topics: list[str], event: dict) -> None:
+        # Not started (e.g. scripts using the routers' functions): nobody is listening
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.published += 1
+        self.loop.call_soon_threadsafe(self._publish, topics, event)
+
+    @abstractmethod
+    def _publish(self, topics: list[str], event: dict) -> None:
+        """Send the event on, on the event loop."""
+
+    def stats(self) -> dict:
+        return {"bus": type(self).__name__, "published": self.published}
+
+
+class InProcessBus(EventBus):
+    def _publish(self, topics, event):
+        self._dispatch(topics, event)
+
+
+class PostgresBus(EventBus):
+    """Fans events out to all workers through Postgres LISTEN/NOTIFY (requires asyncpg).
+
+    Each worker keeps one dedicated connection that both listens and sends; a worker receives
+    its own notifications, so local delivery also goes through Postgres. The connection is
+    replaced as soon as it is closed, and checked every ``check_interval`` seconds in case it
+    died silently, so a worker that never publishes still keeps listening.
+    """
+
+    def __init__(self, channel: str = EVENT_CHANNEL, check_interval: float = EVENT_CHECK_INTERVAL):
+        super().__init__()
+        self.channel = channel
+        self.check_interval = check_interval
+        self.connection = None
+        self.failed = 0
+        self.reconnects = 0
+        self._pending: set[asyncio.Task] = set()
+        self._watcher: asyncio.Task | None = None
+        # asyncpg connections run one query at a time
+        self._lock = asyncio.Lock()
+
+    async def start(self, deliver):
+        await super().start(deliver)
+        await self._connect()
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def _connect(self):
+        import asyncpg
+
+        from .database import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER
+
+        self.connection = await asyncpg.connect(
+            user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT, database=DB_NAME
+        )
+        await self.connection.add_listener(self.channel, self._on_notify)
+        self.connection.add_termination_listener(self._on_terminated)
+
+    async def _reconnect(self):
+        # Called with the lock held
+        closed, self.connection = self.connection, None
+        if closed is not None:
+            closed.terminate()
+        await self._connect()
+        self.reconnects += 1
+        logger.warning("Event bus reconnected to channel %s", self.channel)
+        # Notifications sent while the connection was down are lost for good
+        for callback in self.reconnect_callbacks:
+            callback()
+
+    def _connected(self) -> bool:
+        return self.connection is not None and not self.connection.is_closed()
+
+    async def _check(self):
+        async with self._lock:
+            if self.loop is None:
+                return
+            try:
+                if self._connected():
+                    await self.connection.execute("SELECT 1", timeout=self.check_interval)
+                    return
+            except Exception as e:
+                logger.warning("Event bus connection check failed: %s", e)
+            try:
+                await self._reconnect()
+            except Exception as e:
+                # Retried on the next check
+                logger.warning("Event bus could not reconnect: %s", e)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self._check()
+
+    def _on_terminated(self, connection):
+        # Also called for connections closed on purpose (stop, replaced ones)
+        if self.loop is None or connection is not self.connection:
+            return
+        task = asyncio.create_task(self._check())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def stop(self):
+        await super().stop()
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._dispatch(*decode_event(payload))
+
+    def _publish(self, topics, event):
+        task = asyncio.create_task(self._notify(encode_event(topics, event)))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _notify(self, payload: str):
+        async with self._lock:
+            try:
+                if not self._connected():
+                    # Lost the connection (and with it the LISTEN): start over
+                    await self._reconnect()
+                await self.connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Error publishing event: %s", e)
+
+    def stats(self):
+        return {**super().stats(), "failed": self.failed, "reconnects": self.reconnects}
+
+
+def create_event_bus() -> EventBus:
+    if EVENT_BUS == "postgres":
+        return PostgresBus()
+    return InProcessBus()
+
+
+event_bus = create_event_bus()
+
+
+# Event helpers, called by the write handlers after commit
+def post_changed(action: str, blog_post_id: int) -> None:
+    event_bus.publish(
+        [POSTS_TOPIC, post_topic(blog_post_id)], {"type": f"post.{action}", "id": blog_post_id}
+    )
+
+
+def comment_changed(action: str, comment_id: int, blog_post_id: int) -> None:
+    event_bus.publish(
+        [post_topic(blog_post_id)],
+        {"type": f"comment.{action}", "id": comment_id, "blog_post_id": blog_post_id},
+    )
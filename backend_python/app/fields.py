@@ -0,0 +1,54 @@
+from fastapi import HTTPException
+from sqlalchemy import func, literal
+
+EXCERPT_LENGTH = 200
+
+# Extra columns selected alongside a projection so keyset cursors can still be built
+CURSOR_SORT_VALUE = "cursor_sort_value"
+CURSOR_ID = "cursor_id"
+
+
+def excerpt(column):
+    # Truncated in SQL so the full Text value never leaves the database
+    return func.substr(column, 1, EXCERPT_LENGTH)
+
+
+def parse_fields(fields: str | None, view: str | None, allowed, summary) -> tuple[str, ...] | None:
+    """Resolve ``fields``/``view`` query parameters to the requested field names.
+
+    Returns ``None`` when the full representation was requested.
+    """
+    if view not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be 'full' or 'summary'")
+
+    if fields is None:
+        return tuple(summary) if view == "summary" else None
+
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="fields must not be empty")
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return names
+
+
+def fields_key(names: tuple[str, ...] | None) -> str | None:
+    return ",".join(names) if names else None
+
+
+def select_columns(columns: dict, names) -> list:
+    return [
+        (columns[name] if columns[name] is not None else literal(None)).label(name)
+        for name in names
+    ]
+
+
+def projection(db, columns: dict, names, sort_column, id_column):
+    """Build a query selecting only the requested columns (plus the keyset columns)."""
+    selected = select_columns(columns, names)
+    return db.query(*selected, sort_column.label(CURSOR_SORT_VALUE), id_column.label(CURSOR_ID))
+
+
+def cursor_key(row):
+    return row._mapping[CURSOR_SORT_VALUE], row._mapping[CURSOR_ID]
@@ -0,0 +1,164 @@
+"""Serving the built React frontend.
+
+The build directory (``FRONTEND_BUILD_PATH``) is indexed once at startup, so requests are
+dictionary lookups with no filesystem checks. ``index.html`` is held in memory. Every file gets a
+content-hash ETag (``304`` on a match) and is served from its ``.br`` / ``.gz`` sibling when the
+client accepts that encoding; ``python -m app.frontend`` writes those siblings after a build.
+
+Bundler output with a content hash in its name (``assets/index-BQ3x_kd1.js`` from Vite,
+``static/js/main.3f2a1b4c.js`` from Create React App) never changes, so it is cached for a year
+as ``immutable``. Everything else, ``index.html`` included, is revalidated on each use.
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+from .compression import COMPRESSION_MIN_SIZE, brotli, choose_encoding, is_compressible, weak_etag
+from .etag import etag_matches
+
+load_dotenv()
+
+FRONTEND_BUILD_PATH = os.getenv(
+    "FRONTEND_BUILD_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend-build"),
+)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+# Where bundlers write hashed files, and what a hashed name looks like
+HASHED_DIRS = ("assets/", "static/")
+HASHED_NAME = re.compile(r"[.-][0-9A-Za-z_-]{8,}(\.chunk)?\.\w+$")
+# Precompressed siblings, in server preference order
+VARIANTS = {"br": ".br", "gzip": ".gz"}
+
+
+class Asset:
+    """One file of the build and its precompressed variants."""
+
+    def __init__(self, path: str, name: str, in_memory: bool = False):
+        self.path = path
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.stat = os.stat(path)
+        with open(path, "rb") as f:
+            body = f.read()
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        hashed = name.startswith(HASHED_DIRS) and HASHED_NAME.search(name) is not None
+        self.cache_control = IMMUTABLE if hashed else REVALIDATE
+
+        # encoding -> (path, stat); a sibling older than the file is left over from an old build
+        self.variants = {}
+        for encoding, suffix in VARIANTS.items():
+            variant = path + suffix
+            if os.path.exists(variant) and os.stat(variant).st_mtime >= self.stat.st_mtime:
+                self.variants[encoding] = (variant, os.stat(variant))
+
+        # encoding -> bytes (None: identity), for the files kept in memory
+        self.bodies = None
+        if in_memory:
+            self.bodies = {None: body}
+            for encoding, (variant, _) in self.variants.items():
+                with open(variant, "rb") as f:
+                    self.bodies[encoding] = f.read()
+            if is_compressible(self.media_type):
+                self.bodies.setdefault("gzip", gzip.compress(body, mtime=0))
+                if brotli is not None:
+                    self.bodies.setdefault("br", brotli.compress(body))
+            self.variants = {encoding: None for encoding in VARIANTS if encoding in self.bodies}
+
+    def response(self, request: Request) -> Response:
+        encoding = None
+        headers = {"Cache-Control": self.cache_control}
+        if self.variants:
+            encoding = choose_encoding(request.headers.get("accept-encoding", ""), self.variants)
+            headers["Vary"] = "Accept-Encoding"
+        headers["ETag"] = weak_etag(self.etag) if encoding else self.etag
+        if etag_matches(request, self.etag):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        if self.bodies is not None:
+            return Response(self.bodies[encoding], headers=headers, media_type=self.media_type)
+        path, stat = self.variants[encoding] if encoding else (self.path, self.stat)
+        return FileResponse(
+            path,
+            headers=headers,
+            media_type=self.media_type,
+            stat_result=stat,
+            method=request.method,
+        )
+
+
+class Frontend:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.assets: dict[str, Asset] = {}
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith((".br", ".gz")) and filename[:-3] in files:
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory).replace(os.sep, "/")
+                self.assets[name] = Asset(path, name, in_memory=name == "index.html")
+        self.index = self.assets.get("index.html")
+
+    def get(self, name: str) -> Asset | None:
+        return self.assets.get(name)
+
+
+def load_frontend(directory: str = FRONTEND_BUILD_PATH) -> Frontend | None:
+    if not os.path.isdir(directory):
+        return None
+    frontend = Frontend(directory)
+    print(f"Indexed {len(frontend.assets)} frontend file(s) in {directory}")
+    return frontend
+
+
+def precompress(directory: str, minimum_size: int = COMPRESSION_MIN_SIZE) -> int:
+    """Write .gz (and .br, with the ``brotli`` package) next to each compressible file."""
+    written = 0
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            path = os.path.join(root, filename)
+            media_type = mimetypes.guess_type(path)[0] or ""
+            if filename.endswith((".br", ".gz")) or not is_compressible(media_type):
+                continue
+            with open(path, "rb") as f:
+                body = f.read()
+            if len(body) < minimum_size:
+                continue
+            compressed = {".gz": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed[".br"] = brotli.compress(body, quality=11)
+            for suffix, data in compressed.items():
+                # Not worth a variant unless it saves something
+                if len(data) < len(body):
+                    with open(path + suffix, "wb") as f:
+                        f.write(data)
+                    written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress the frontend build")
+    parser.add_argument("--dir", default=FRONTEND_BUILD_PATH)
+    args = parser.parse_args()
+    if not os.path.isdir(args.dir):
+        raise SystemExit(f"No frontend build at {args.dir}")
+    written = precompress(args.dir)
+    print(
+        f"Wrote {written} precompressed file(s)"
+        + ("" if brotli else " (gzip only: brotli is not installed)")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Group commit: concurrent single-row writes flushed together in one transaction.
+
+With ``COMMENT_GROUP_COMMIT=true``, ``POST /api/comments/`` queues its row instead of taking a
+connection and committing on its own. Queued rows are written in batches of up to
+``GROUP_COMMIT_MAX_BATCH``: as soon as a batch is full, or ``GROUP_COMMIT_WINDOW_MS`` after the
+oldest queued row arrived, by at most ``GROUP_COMMIT_CONCURRENCY`` writers at once. While the
+writers are busy rows keep queueing, so batches grow with the load. A burst of N inserts then
+costs about N / batch size transactions and WAL flushes on a couple of connections, at the price
+of up to one window of extra latency when traffic is light.
+
+Queued requests hold no connection, so admission control leaves them alone; instead more than
+``GROUP_COMMIT_MAX_PENDING`` queued rows are turned away with ``503``.
+
+The writer function gets a ``Session`` and the queued items, and returns one result per item: the
+value for that caller, or the exception to raise in that caller's request.
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from .database import open_database
+from .metrics import GROUP_COMMIT_BATCH_SIZE
+
+load_dotenv()
+
+COMMENT_GROUP_COMMIT = os.getenv("COMMENT_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "100"))
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_CONCURRENCY = int(os.getenv("GROUP_COMMIT_CONCURRENCY", "2"))
+GROUP_COMMIT_MAX_PENDING = int(os.getenv("GROUP_COMMIT_MAX_PENDING", "2000"))
+
+
+class GroupCommit:
+    def __init__(
+        self,
+        name: str,
+        writer,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+        window: float = GROUP_COMMIT_WINDOW_MS / 1000,
+        concurrency: int = GROUP_COMMIT_CONCURRENCY,
+        max_pending: int = GROUP_COMMIT_MAX_PENDING,
+    ):
+        self.writer = writer
+        self.max_batch = max_batch
+        self.window = window
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.batch_sizes = GROUP_COMMIT_BATCH_SIZE.labels(name)
+        self.pending: list[tuple[object, asyncio.Future]] = []
+        self.timer = None
+        # Set once the oldest pending item has waited a full window
+        self.due = False
+        # Running flush tasks (the event loop only keeps weak references)
+        self.tasks: set[asyncio.Task] = set()
+        self.flushes = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """Queue ``item`` and return its result once its batch is committed."""
+        if len(self.pending) >= self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, retry later",
+                headers={"Retry-After": "1"},
+            )
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Retrieved here so results of callers that went away are not reported as unhandled
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.pending.append((item, future))
+        self._drain()
+        # Shielded: a caller going away does not take its row out of the batch
+        return await asyncio.shield(future)
+
+    def _window_elapsed(self) -> None:
+        self.timer = None
+        self.due = True
+        self._drain()
+
+    def _drain(self) -> None:
+        # While every writer is busy rows keep queueing, so batches grow with the load
+        while (
+            self.pending
+            and len(self.tasks) < self.concurrency
+            and (self.due or len(self.pending) >= self.max_batch)
+        ):
+            batch, self.pending = self.pending[: self.max_batch], self.pending[self.max_batch :]
+            task = asyncio.create_task(self._write(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self._written)
+        if not self.pending:
+            self.due = False
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        elif self.timer is None and not self.due:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self._window_elapsed)
+
+    def _written(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        self._drain()
+
+    async def _write(self, batch) -> None:
+        items = [item for item, _ in batch]
+        try:
+            async with open_database() as db:
+                results = await db.run(self.writer, items)
+        except Exception as e:
+            print(f"Group commit of {len(items)} item(s) failed: {e!r}")
+            results = [e] * len(items)
+
+        self.flushes += 1
+        self.items += len(items)
+        self.batch_sizes.observe(len(items))
+        for (_, future), result in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "items": self.items,
+            "average_batch": round(self.items / self.flushes, 2) if self.flushes else 0,
+            "pending": len(self.pending),
+            "writing": len(self.tasks),
+        }
@@ -0,0 +1,189 @@
+"""Relation expansion (``?include=``) for the list and detail routes.
+
+Each requested relation is loaded for the whole page with one query, so a page costs the same
+number of queries however many rows it has:
+
+- to-one relations (``author``, ``blog_post``) with ``WHERE id IN (...)``
+- to-many relations (``comments``, ``blog_posts``) with a ``LATERAL`` subquery per parent key
+  that stops after ``include_limit`` children (newest first). It reads those rows straight from
+  the ``(parent id, created_at, id)`` indexes, however many children a parent has.
+
+Children come back in their full representation, without the field naming the parent.
+"""
+
+import os
+
+from fastapi import HTTPException
+from sqlalchemy import ARRAY, Integer, bindparam, func, select, true
+from sqlalchemy.orm import Session
+
+from .etag import VERSIONED_TABLES, get_versions
+from .models import BlogPost as BlogPostModel
+from .models import Comment as CommentModel
+from .models import User as UserModel
+from .schemas import BlogPost, Comment, User
+from .serialization import row_dicts
+
+INCLUDE_LIMIT = int(os.getenv("INCLUDE_LIMIT", "5"))
+MAX_INCLUDE_LIMIT = 50
+
+INCLUDE_KEY = "include_key"
+
+
+class Relation:
+    """How to load one relation of a parent item.
+
+    The parent's ``parent_key`` field is matched against the child column ``match``. Children
+    are built from ``columns`` (field name -> column, in output order), which may need
+    ``joins``. To-many relations give the ``order`` fields, sorted descending and limited per
+    parent.
+    """
+
+    def __init__(self, parent_key: str, match, columns: dict, joins=(), order=None):
+        self.parent_key = parent_key
+        self.match = match
+        self.columns = columns
+        self.joins = joins
+        self.order = order
+
+    @property
+    def many(self) -> bool:
+        return self.order is not None
+
+    def statement(self):
+        statement = select(*[column.label(name) for name, column in self.columns.items()])
+        statement = statement.select_from(self.match.table)
+        for target, onclause in self.joins:
+            statement = statement.join(target, onclause)
+        return statement
+
+
+def _columns(model, schema, exclude=(), **overrides) -> dict:
+    return {
+        name: overrides[name] if name in overrides else getattr(model, name)
+        for name in schema.model_fields
+        if name not in exclude
+    }
+
+
+AUTHOR = Relation("user_id", UserModel.id, _columns(UserModel, User))
+COMMENT_BLOG_POST = Relation(
+    "blog_post_id",
+    BlogPostModel.id,
+    _columns(BlogPostModel, BlogPost, author_name=UserModel.name),
+    joins=[(UserModel, BlogPostModel.user_id == UserModel.id)],
+)
+BLOG_POST_COMMENTS = Relation(
+    "id",
+    CommentModel.blog_post_id,
+    _columns(CommentModel, Comment, exclude=("blog_post_title",), author_name=UserModel.name),
+    joins=[(UserModel, CommentModel.user_id == UserModel.id)],
+    order=("created_at", "id"),
+)
+USER_BLOG_POSTS = Relation(
+    "id",
+    BlogPostModel.user_id,
+    _columns(BlogPostModel, BlogPost, exclude=("author_name",)),
+    order=("created_at", "id"),
+)
+USER_COMMENTS = Relation(
+    "id",
+    CommentModel.user_id,
+    _columns(CommentModel, Comment, exclude=("author_name",), blog_post_title=BlogPostModel.title),
+    joins=[(BlogPostModel, CommentModel.blog_post_id == BlogPostModel.id)],
+    order=("created_at", "id"),
+)
+
+# Relations offered by each route family
+USER_INCLUDES = {"blog_posts": USER_BLOG_POSTS, "comments": USER_COMMENTS}
+BLOG_POST_INCLUDES = {"author": AUTHOR, "comments": BLOG_POST_COMMENTS}
+COMMENT_INCLUDES = {"author": AUTHOR, "blog_post": COMMENT_BLOG_POST}
+BLOG_POST_COMMENT_INCLUDES = {"author": AUTHOR}
+
+
+def parse_include(include: str | None, relations: dict, fields=None) -> tuple[str, ...]:
+    """Resolve the ``include`` query parameter against the relations a route offers.
+
+    ``fields`` are the sparse fieldset names (``None`` for all); they must contain the field
+    each relation is keyed on.
+    """
+    if include is None:
+        return ()
+    names = tuple(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+    unknown = [name for name in names if name not in relations]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include(s): {', '.join(unknown)} (available: {', '.join(relations)})",
+        )
+    for name in names:
+        key = relations[name].parent_key
+        if fields is not None and key not in fields:
+            raise HTTPException(status_code=400, detail=f"include={name} needs the {key} field")
+    return names
+
+
+def include_key(includes: tuple[str, ...], limit: int) -> str | None:
+    return f"{','.join(includes)}:{limit}" if includes else None
+
+
+def include_etag_parts(db: Session, includes: tuple[str, ...], limit: int) -> tuple:
+    # Included children come from other tables; any write to them changes the tag
+    if not includes:
+        return ()
+    return (include_key(includes, limit), *get_versions(db, *VERSIONED_TABLES))
+
+
+def _load_one(db: Session, relation: Relation, keys: set) -> dict:
+    statement = relation.statement().add_columns(relation.match.label(INCLUDE_KEY))
+    rows = db.execute(statement.where(relation.match.in_(keys))).all()
+    names = tuple(relation.columns)
+    return {
+        row._mapping[INCLUDE_KEY]: child
+        for row, child in zip(rows, row_dicts(rows, names), strict=True)
+    }
+
+
+def _load_many(db: Session, relation: Relation, keys: set, limit: int) -> dict:
+    parents = select(
+        func.unnest(bindparam("include_keys", sorted(keys), type_=ARRAY(Integer))).label(
+            INCLUDE_KEY
+        )
+    ).subquery()
+    order = [relation.columns[name].desc() for name in relation.order]
+    children = (
+        relation.statement()
+        .where(relation.match == parents.c[INCLUDE_KEY])
+        .order_by(*order)
+        .limit(limit)
+        .lateral()
+    )
+    names = tuple(relation.columns)
+    statement = (
+        select(*[children.c[name] for name in names], parents.c[INCLUDE_KEY])
+        .select_from(parents.join(children, true()))
+        .order_by(parents.c[INCLUDE_KEY], *[children.c[name].desc() for name in relation.order])
+    )
+    rows = db.execute(statement).all()
+    grouped: dict = {}
+    for row, child in zip(rows, row_dicts(rows, names), strict=True):
+        grouped.setdefault(row._mapping[INCLUDE_KEY], []).append(child)
+    return grouped
+
+
+def expand(
+    db: Session, items: list[dict], includes: tuple[str, ...], relations: dict, limit: int
+) -> None:
+    """Add each included relation to ``items`` in place, one query per relation."""
+    for name in includes:
+        relation = relations[name]
+        keys = {item[relation.parent_key] for item in items}
+        if not keys:
+            continue
+        if relation.many:
+            children = _load_many(db, relation, keys, limit)
+        else:
+            children = _load_one(db, relation, keys)
+        for item in items:
+            key = item[relation.parent_key]
+            item[name] = children.get(key, []) if relation.many else children.get(key)
@@ -0,0 +1,239 @@
+"""Per-request database and serialization instrumentation.
+
+``InstrumentationMiddleware`` opens a ``RequestMetrics`` for each HTTP request; SQLAlchemy events
+on the engines add every query to it (the context variable follows the request into threadpool
+workers and ``run_sync`` greenlets). Responses carry a ``Server-Timing`` header with:
+
+- ``db``: total query time and query count
+- ``pool``: time spent waiting for a pooled connection
+- ``serialize``: time from the handler returning to the response starting (response model
+  validation, ``jsonable_encoder`` and JSON rendering)
+- ``total``: the whole request
+
+Streaming responses send their headers before querying, so only the log line covers them.
+
+Statements executed ``N_PLUS_ONE_THRESHOLD`` times or more within one request are reported as
+N+1 candidates, and queries slower than ``SLOW_QUERY_MS`` are logged with their ``EXPLAIN`` plan.
+"""
+
+import functools
+import inspect
+import json
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .metrics import POOL_CHECKOUT_TIMEOUTS
+
+load_dotenv()
+
+INSTRUMENTATION = os.getenv("INSTRUMENTATION", "true").lower() in ("1", "true", "yes")
+# Request log lines: "all", "flagged" (N+1 or slow queries only) or "none"
+REQUEST_LOG = os.getenv("REQUEST_LOG", "flagged")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_current: ContextVar["RequestMetrics | None"] = ContextVar("request_metrics", default=None)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class RequestMetrics:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.handler_finished: float | None = None
+        self.serialize_time = 0.0
+        self.statements: Counter[str] = Counter()
+        self.slow_queries: list[dict] = []
+
+    def n_plus_one(self) -> list[dict]:
+        return [
+            {"statement": statement, "count": count}
+            for statement, count in self.statements.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+    def server_timing(self, total: float) -> str:
+        queries = "1 query" if self.queries == 1 else f"{self.queries} queries"
+        return ", ".join(
+            [
+                f'db;dur={_ms(self.db_time)};desc="{queries}"',
+                f"pool;dur={_ms(self.pool_wait)}",
+                f"serialize;dur={_ms(self.serialize_time)}",
+                f"total;dur={_ms(total)}",
+            ]
+        )
+
+    def log(self, status: int, total: float) -> None:
+        n_plus_one = self.n_plus_one()
+        if REQUEST_LOG == "none":
+            return
+        if REQUEST_LOG == "flagged" and not (n_plus_one or self.slow_queries):
+            return
+        record = {
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "total_ms": _ms(total),
+            "queries": self.queries,
+            "db_ms": _ms(self.db_time),
+            "pool_wait_ms": _ms(self.pool_wait),
+            "serialize_ms": _ms(self.serialize_time),
+        }
+        if n_plus_one:
+            record["n_plus_one"] = n_plus_one
+        if self.slow_queries:
+            record["slow_queries"] = self.slow_queries
+        print(json.dumps(record, default=str))
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(scope["method"], scope["path"])
+        token = _current.set(metrics)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status = message["status"]
+                if metrics.handler_finished is not None:
+                    metrics.serialize_time = now - metrics.handler_finished
+                timing = metrics.server_timing(now - metrics.started)
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            metrics.log(status, time.perf_counter() - metrics.started)
+
+
+class InstrumentedRoute(APIRoute):
+    """Marks when the endpoint returns, so serialization can be told apart from handler time."""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _timed_endpoint(endpoint):
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.handler_finished = time.perf_counter()
+
+    return timed
+
+
+class _TimedPoolMixin:
+    metrics_name = ""
+
+    # There is no "checkout requested" pool event, so the wait is measured around _do_get
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(self.metrics_name).inc()
+            raise
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.pool_wait += time.perf_counter() - started
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    metrics_name = "sync"
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"]
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.queries += 1
+        metrics.db_time += elapsed
+        metrics.statements[statement] += 1
+
+    if elapsed * 1000 < SLOW_QUERY_MS:
+        return
+    slow = {"duration_ms": _ms(elapsed), "statement": statement}
+    if not executemany and not context.execution_options.get("stream_results"):
+        slow["plan"] = _explain(conn, statement, parameters)
+    if metrics is not None:
+        metrics.slow_queries.append(slow)
+    else:
+        print(json.dumps({"slow_query": slow}, default=str))
+
+
+def _explain(conn, statement: str, parameters) -> list[str] | None:
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    # Plain EXPLAIN (not ANALYZE) on a raw cursor: plans without running the statement again
+    # and without re-entering these events. The savepoint keeps a failure from aborting the
+    # request's transaction.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT explain_slow_query")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT explain_slow_query")
+            print(f"Error explaining slow query: {e}")
+            return None
+        cursor.execute("RELEASE SAVEPOINT explain_slow_query")
+        return plan
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine) -> None:
+    """Attach the query hooks to a sync ``Engine`` (for async engines, pass ``.sync_engine``)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
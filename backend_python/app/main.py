@@ -1,18 +1,55 @@
+import asyncio
 import os
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-
-from .database import create_tables
-from .routers import blog_posts, comments, users
-from .websocket import websocket_endpoint
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.concurrency import run_in_threadpool
+
+from .admission import ADMISSION, AdmissionMiddleware, admission
+from .cache import blog_post_comments_key, response_cache
+from .compression import COMPRESSION, CompressionMiddleware
+from .database import Database, create_tables, get_read_db, replicas
+from .etag import conditional_get
+from .events import event_bus
+from .fields import fields_key, parse_fields
+from .frontend import load_frontend
+from .include import BLOG_POST_COMMENT_INCLUDES, INCLUDE_LIMIT, MAX_INCLUDE_LIMIT, parse_include
+from .instrumentation import INSTRUMENTATION, InstrumentationMiddleware, InstrumentedRoute
+from .metrics import MetricsMiddleware, render, run_sampler
+from .migrations import migrate
+from .pagination import MAX_PAGE_SIZE
+from .routers import blog_posts, comments, search, users
+from .routers.comments import (
+    BLOG_POST_COMMENT_COLUMNS,
+    comment_writes,
+    get_blog_post_comments,
+    get_blog_post_comments_etag,
+)
+from .routers.comments import SUMMARY_FIELDS as COMMENT_SUMMARY_FIELDS
+from .schemas import Comment, CommentPage, CommentSummary, CommentSummaryPage
+from .single_flight import single_flight
+from .websocket import manager, websocket_endpoint
 
 load_dotenv()
 
+# Run metadata.create_all on boot; the dev runners enable it, production uses migrations
+CREATE_TABLES = os.getenv("CREATE_TABLES", "false").lower() in ("1", "true", "yes")
+# Apply backend/migrations on boot (safe with several workers: the runner takes a lock)
+RUN_MIGRATIONS = os.getenv("RUN_MIGRATIONS", "false").lower() in ("1", "true", "yes")
+
 app = FastAPI(title="Blog API", description="Simple FastAPI + PostgreSQL blog API", version="1.0.0")
+app.router.route_class = InstrumentedRoute
+
+# Concurrency slots sized from the DB pool; overload is shed with 503 + Retry-After. Added
+# first so it sits inside CORS and the metrics, which then cover rejected requests too.
+if ADMISSION:
+    app.add_middleware(AdmissionMiddleware)
+# gzip/brotli for large JSON and text responses (COMPRESSION_MIN_SIZE)
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -21,25 +58,102 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser devtools show the timing breakdown of cross-origin API calls
+    expose_headers=["Server-Timing"],
 )
 
+# Query count, DB/pool/serialization time per request (Server-Timing header, N+1 warnings)
+if INSTRUMENTATION:
+    app.add_middleware(InstrumentationMiddleware)
+# Prometheus latency histograms and status counters per route (served at /metrics)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(users.router)
 app.include_router(blog_posts.router)
 app.include_router(comments.router)
+app.include_router(search.router)
 
 
 # Special route for blog post comments (to match Node.js API)
-@app.get("/api/blog_posts/{blog_post_id}/comments")
-async def get_blog_post_comments_endpoint(blog_post_id: int):
-    from .database import get_db
-    from .routers.comments import get_blog_post_comments
-
-    db = next(get_db())
-    try:
-        return get_blog_post_comments(blog_post_id, db)
-    finally:
-        db.close()
+@app.get(
+    "/api/blog_posts/{blog_post_id}/comments",
+    response_model=list[Comment] | CommentPage | list[CommentSummary] | CommentSummaryPage,
+    response_model_exclude_unset=True,
+)
+async def get_blog_post_comments_endpoint(
+    blog_post_id: int,
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    view: str | None = None,
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    names = parse_fields(fields, view, BLOG_POST_COMMENT_COLUMNS, COMMENT_SUMMARY_FIELDS)
+    includes = parse_include(include, BLOG_POST_COMMENT_INCLUDES, names)
+    return await conditional_get(
+        request,
+        response,
+        None
+        if includes
+        else blog_post_comments_key(blog_post_id, cursor, limit, fields_key(names)),
+        lambda: db.run(
+            get_blog_post_comments_etag,
+            blog_post_id,
+            cursor,
+            limit,
+            names,
+            includes,
+            include_limit,
+        ),
+        lambda: db.run(
+            get_blog_post_comments, blog_post_id, cursor, limit, names, includes, include_limit
+        ),
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # The pool stayed exhausted for DB_POOL_TIMEOUT seconds: tell clients to come back later
+    return JSONResponse(
+        {"detail": "Server is busy, retry later"}, status_code=503, headers={"Retry-After": "1"}
+    )
+
+
+@app.get("/api/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    # Counting entries scans Redis with CACHE_BACKEND=redis
+    return await run_in_threadpool(response_cache.stats)
+
+
+@app.get("/api/group_commit/stats")
+async def group_commit_stats():
+    return comment_writes.stats()
+
+
+@app.get("/api/single_flight/stats")
+async def single_flight_stats():
+    return single_flight.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/api/ws/stats")
+async def websocket_stats():
+    return {**manager.stats(), "bus": event_bus.stats()}
 
 
 # WebSocket endpoint
@@ -48,27 +162,49 @@ async def websocket_route(websocket: WebSocket):
     await websocket_endpoint(websocket)
 
 
-# Serve static files from frontend build (if exists)
-frontend_build_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend-build")
-if os.path.exists(frontend_build_path):
-    app.mount("/static", StaticFiles(directory=frontend_build_path), name="static")
+# Serve the frontend build (if exists), indexed once at startup
+frontend = load_frontend()
+if frontend is not None:
+
+    @app.api_route("/static/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_static(path: str, request: Request):
+        asset = frontend.get(path)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return asset.response(request)
 
-    # Serve React app for all non-API routes
-    @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    # Serve React app for all non-API routes (and files at the build root)
+    @app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+    async def serve_react_app(full_path: str, request: Request):
         if full_path.startswith("api/") or full_path.startswith("ws"):
             return {"error": "Not found"}
 
-        index_file = os.path.join(frontend_build_path, "index.html")
-        if os.path.exists(index_file):
-            return FileResponse(index_file)
-        return {"error": "Frontend not built"}
+        asset = frontend.get(full_path) or frontend.index
+        if asset is None:
+            return {"error": "Frontend not built"}
+        return asset.response(request)
 
 
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
-    print("Database tables created/verified")
+    if RUN_MIGRATIONS:
+        await run_in_threadpool(migrate)
+    if CREATE_TABLES:
+        create_tables()
+        print("Database tables created/verified")
+    await event_bus.start(manager.deliver)
+    app.state.metrics_sampler = asyncio.create_task(run_sampler(manager))
+    if replicas:
+        await run_in_threadpool(replicas.check)
+        app.state.replica_checks = asyncio.create_task(replicas.run_checks())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.metrics_sampler.cancel()
+    if replicas:
+        app.state.replica_checks.cancel()
+    await event_bus.stop()
 
 
 @app.get("/")
@@ -80,4 +216,5 @@ if __name__ == "__main__":
     import uvicorn
 
     port = int(os.getenv("PORT", 8000))
+    os.environ.setdefault("CREATE_TABLES", "true")
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
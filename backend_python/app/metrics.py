@@ -0,0 +1,200 @@
+"""Prometheus metrics, served at ``/metrics``.
+
+Request latency and status counts are recorded per route template by ``MetricsMiddleware``.
+Gauges that describe state (connection pools, WebSocket clients, event loop lag) are not
+updated on the hot path but sampled every ``METRICS_SAMPLE_INTERVAL`` seconds by a task in each
+worker.
+
+Under ``python -m app.server`` every worker writes its values to ``PROMETHEUS_MULTIPROC_DIR``
+and ``/metrics`` aggregates all live workers, whichever worker serves the scrape.
+"""
+
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+load_dotenv()
+
+METRICS_SAMPLE_INTERVAL = float(os.getenv("METRICS_SAMPLE_INTERVAL", "1"))
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP responses by route template and status",
+    ["method", "route", "status"],
+)
+POOL_SIZE = Gauge(
+    "db_pool_size", "Connections kept in the pool", ["pool"], multiprocess_mode="livesum"
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections in use", ["pool"], multiprocess_mode="livesum"
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a connection", ["pool"]
+)
+WS_CONNECTIONS = Gauge(
+    "websocket_connections", "Open WebSocket connections", multiprocess_mode="livesum"
+)
+WS_QUEUED = Gauge(
+    "websocket_queued_messages",
+    "Messages waiting in connection queues",
+    multiprocess_mode="livesum",
+)
+WS_BROADCAST_DURATION = Histogram(
+    "websocket_broadcast_duration_seconds",
+    "Time to serialize and queue one broadcast or change event for all recipients",
+    ["kind"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "1 while a read replica is in rotation",
+    ["replica"],
+    multiprocess_mode="livemin",
+)
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replay lag of a read replica",
+    ["replica"],
+    multiprocess_mode="livemax",
+)
+ADMISSION_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted API requests waited for a slot",
+    ["kind"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "API requests turned away with 503", ["kind", "reason"]
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "API requests holding a slot", multiprocess_mode="livesum"
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "API requests waiting for a slot", multiprocess_mode="livesum"
+)
+SINGLE_FLIGHT_REQUESTS = Counter(
+    "single_flight_requests_total",
+    "Conditional GET loads that ran (leader), joined an identical one in flight (joined) or "
+    "reused a result within SINGLE_FLIGHT_TTL (reused)",
+    ["stage", "result"],
+)
+SINGLE_FLIGHT_FOLLOWERS = Histogram(
+    "single_flight_followers",
+    "Requests that joined each flight",
+    ["stage"],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+SINGLE_FLIGHT_WAITING = Gauge(
+    "single_flight_waiting", "Requests waiting on a flight", multiprocess_mode="livesum"
+)
+GROUP_COMMIT_BATCH_SIZE = Histogram(
+    "group_commit_batch_size",
+    "Rows written per group commit transaction",
+    ["writer"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500),
+)
+EVENT_LOOP_LAG = Gauge(
+    "event_loop_lag_seconds",
+    "Delay of a scheduled wake-up on the event loop",
+    multiprocess_mode="livemax",
+)
+
+
+def render() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        # labels() validates and locks on every call; the children are resolved once instead
+        self.children: dict[tuple, tuple] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The matched route's template keeps label cardinality bounded; FastAPI stores
+            # the route in the scope while routing
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", "unmatched"), status)
+            children = self.children.get(key)
+            if children is None:
+                children = (REQUEST_DURATION.labels(*key[:2]), REQUESTS.labels(*key))
+                self.children[key] = children
+            children[0].observe(time.perf_counter() - started)
+            children[1].inc()
+
+
+def _sample_pool(name: str, pool) -> None:
+    POOL_SIZE.labels(name).set(pool.size())
+    POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+    POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+
+
+def sample(manager) -> None:
+    from .admission import admission
+    from .database import async_engine, engine, replicas
+    from .single_flight import single_flight
+
+    _sample_pool("sync", engine.pool)
+    if async_engine is not None:
+        _sample_pool("async", async_engine.pool)
+    for replica in replicas.replicas:
+        _sample_pool(replica.name, replica.pool)
+    ADMISSION_IN_FLIGHT.set(admission.in_flight)
+    ADMISSION_QUEUED.set(len(admission.waiters))
+    SINGLE_FLIGHT_WAITING.set(single_flight.waiting)
+    stats = manager.stats()
+    WS_CONNECTIONS.set(stats["connections"])
+    WS_QUEUED.set(stats["queued"])
+
+
+async def run_sampler(manager, interval: float = METRICS_SAMPLE_INTERVAL) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(loop.time() - scheduled, 0))
+        sample(manager)
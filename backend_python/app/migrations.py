@@ -0,0 +1,277 @@
+"""SQL migration runner for ``backend/migrations``.
+
+Usage: python -m app.migrations [--status] [--dir PATH]
+
+Files are applied in filename order and recorded, with a checksum, in the ``migrations`` table
+shared with the Node backend. Runners in several processes serialize on a Postgres advisory lock;
+when nothing is pending the check costs a single query.
+
+A file whose first line is ``-- migrate:no-transaction`` runs statement by statement outside a
+transaction, which ``CREATE INDEX CONCURRENTLY`` requires. Such files should be idempotent
+(``IF NOT EXISTS``): indexes a failed concurrent build left INVALID are dropped before a retry.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import errors
+
+from .database import engine
+
+MIGRATIONS_DIR = Path(
+    os.getenv("MIGRATIONS_DIR", Path(__file__).resolve().parents[2] / "backend" / "migrations")
+)
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+# Arbitrary application-wide key for pg_advisory_lock
+MIGRATION_LOCK_ID = 8_014_001
+LOCK_POLL_INTERVAL = 0.5
+
+CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE
+)
+
+
+class MigrationError(Exception):
+    pass
+
+
+class MigrationFile:
+    def __init__(self, path: Path):
+        self.path = path
+        self.filename = path.name
+        self.sql = path.read_text()
+        self.checksum = hashlib.sha256(path.read_bytes()).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION_MARKER)
+
+
+def load_migrations(directory: Path = MIGRATIONS_DIR) -> list[MigrationFile]:
+    # A missing directory would otherwise look like a fully migrated database
+    if not directory.is_dir():
+        raise MigrationError(f"Migrations directory not found: {directory} (set MIGRATIONS_DIR)")
+    migrations = [MigrationFile(path) for path in sorted(directory.glob("*.sql"))]
+    if not migrations:
+        raise MigrationError(f"No migration files in {directory}")
+    return migrations
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split a script on top-level semicolons, skipping comments, quotes and $$ bodies."""
+    statements = []
+    current = []
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = len(sql) if end == -1 else end
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            i = len(sql) if end == -1 else end + 2
+            continue
+        if char == "'":
+            end = i + 1
+            while True:
+                end = sql.find("'", end)
+                if end == -1 or not sql.startswith("''", end):
+                    break
+                end += 2
+            end = len(sql) if end == -1 else end + 1
+            current.append(sql[i:end])
+            i = end
+            continue
+        dollar = re.match(r"\$\w*\$", sql[i:])
+        if dollar:
+            tag = dollar.group()
+            end = sql.find(tag, i + len(tag))
+            end = len(sql) if end == -1 else end + len(tag)
+            current.append(sql[i:end])
+            i = end
+            continue
+        if char == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+def _applied(cursor) -> dict[str, str | None]:
+    cursor.execute("SELECT filename, checksum FROM migrations")
+    return dict(cursor.fetchall())
+
+
+def _is_current(cursor, migrations: list[MigrationFile]) -> bool:
+    # The fast path: one query, no lock. Any failure (no table yet, no checksum column) means
+    # the slow path has work to do.
+    try:
+        applied = _applied(cursor)
+    except (errors.UndefinedTable, errors.UndefinedColumn):
+        return False
+    return all(applied.get(migration.filename) == migration.checksum for migration in migrations)
+
+
+def _ensure_table(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migrations (
+            id SERIAL PRIMARY KEY,
+            filename VARCHAR(255) UNIQUE NOT NULL,
+            executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE migrations ADD COLUMN IF NOT EXISTS checksum VARCHAR(64);
+        """
+    )
+
+
+def _drop_invalid_indexes(cursor, migration: MigrationFile):
+    names = CONCURRENT_INDEX.findall(migration.sql)
+    if not names:
+        return
+    cursor.execute(
+        """
+        SELECT index_class.relname
+        FROM pg_index
+        JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid
+        WHERE NOT pg_index.indisvalid AND index_class.relname = ANY(%s)
+        """,
+        (names,),
+    )
+    for (name,) in cursor.fetchall():
+        print(f"Dropping invalid index left by an interrupted build: {name}")
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+@contextmanager
+def _connect():
+    connection = engine.raw_connection()
+    connection.driver_connection.autocommit = True
+    try:
+        yield connection
+    finally:
+        # Back to the pool in the state sessions expect
+        connection.driver_connection.autocommit = False
+        connection.close()
+
+
+def _apply(connection, migration: MigrationFile):
+    print(f"Executing migration: {migration.filename}")
+    cursor = connection.cursor()
+    if migration.transactional:
+        connection.driver_connection.autocommit = False
+        try:
+            cursor.execute(migration.sql)
+            cursor.execute(
+                "INSERT INTO migrations (filename, checksum) VALUES (%s, %s)",
+                (migration.filename, migration.checksum),
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.driver_connection.autocommit = True
+    else:
+        _drop_invalid_indexes(cursor, migration)
+        for statement in split_statements(migration.sql):
+            cursor.execute(statement)
+        cursor.execute(
+            "INSERT INTO migrations (filename, checksum) VALUES (%s, %s)",
+            (migration.filename, migration.checksum),
+        )
+    print(f"Migration completed: {migration.filename}")
+
+
+def _acquire_lock(cursor):
+    # Polls instead of blocking in pg_advisory_lock: a waiting statement holds a snapshot, and
+    # CREATE INDEX CONCURRENTLY in the lock holder would wait for it forever
+    while True:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        if cursor.fetchone()[0]:
+            return
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def migrate(directory: Path = MIGRATIONS_DIR) -> list[str]:
+    """Apply pending migrations; returns the filenames that were applied."""
+    migrations = load_migrations(directory)
+    with _connect() as connection:
+        cursor = connection.cursor()
+        if _is_current(cursor, migrations):
+            return []
+
+        # Waits while another process migrates; what it applied is re-read below
+        _acquire_lock(cursor)
+        try:
+            _ensure_table(cursor)
+            applied = _applied(cursor)
+
+            for migration in migrations:
+                checksum = applied.get(migration.filename, migration.checksum)
+                if migration.filename in applied and checksum is None:
+                    # Recorded by a runner that did not store checksums
+                    cursor.execute(
+                        "UPDATE migrations SET checksum = %s WHERE filename = %s",
+                        (migration.checksum, migration.filename),
+                    )
+                elif checksum != migration.checksum:
+                    raise MigrationError(f"{migration.filename} was modified after it was applied")
+
+            pending = [migration for migration in migrations if migration.filename not in applied]
+            for migration in pending:
+                _apply(connection, migration)
+            return [migration.filename for migration in pending]
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+
+
+def status(directory: Path = MIGRATIONS_DIR) -> list[tuple[str, str]]:
+    migrations = load_migrations(directory)
+    with _connect() as connection:
+        try:
+            applied = _applied(connection.cursor())
+        except (errors.UndefinedTable, errors.UndefinedColumn):
+            applied = {}
+
+    result = []
+    for migration in migrations:
+        if migration.filename not in applied:
+            state = "pending"
+        elif applied[migration.filename] in (None, migration.checksum):
+            state = "applied"
+        else:
+            state = "modified"
+        result.append((migration.filename, state))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply SQL migrations")
+    parser.add_argument("--dir", type=Path, default=MIGRATIONS_DIR)
+    parser.add_argument("--status", action="store_true", help="list migrations and exit")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            for filename, state in status(args.dir):
+                print(f"{state:>8}  {filename}")
+            return
+        applied = migrate(args.dir)
+    except (MigrationError, psycopg2.Error) as e:
+        raise SystemExit(f"Migration failed: {e}") from None
+    if applied:
+        print(f"Applied {len(applied)} migration(s)")
+    else:
+        print("No pending migrations found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Sequence,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 
 Base = declarative_base()
 
@@ -15,8 +26,16 @@ class User(Base):
     email = Column(String(255), unique=True, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    blog_posts = relationship("BlogPost", back_populates="author", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="author", cascade="all, delete-orphan")
+    # Children are deleted by the database (ON DELETE CASCADE) or set-based DELETEs, never
+    # loaded into the session one by one
+    blog_posts = relationship(
+        "BlogPost", back_populates="author", cascade="all, delete-orphan", passive_deletes=True
+    )
+    comments = relationship(
+        "Comment", back_populates="author", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (Index("idx_users_created_at_id", "created_at", "id"),)
 
 
 class BlogPost(Base):
@@ -25,12 +44,36 @@ class BlogPost(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Maintained by the comment write handlers (see app/comment_stats.py)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_comment_at = Column(DateTime, nullable=True)
+    # Full-text search document, title ranked above content (see app/routers/search.py)
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+                persisted=True,
+            ),
+        )
+    )
 
     author = relationship("User", back_populates="blog_posts")
-    comments = relationship("Comment", back_populates="blog_post", cascade="all, delete-orphan")
+    comments = relationship(
+        "Comment", back_populates="blog_post", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        Index("idx_blog_posts_user_id", "user_id"),
+        Index("idx_blog_posts_user_id_created_at", "user_id", "created_at", "id"),
+        Index("idx_blog_posts_created_at_id", "created_at", "id"),
+        Index("idx_blog_posts_comment_count_id", "comment_count", "id"),
+        Index("idx_blog_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 
 class Comment(Base):
@@ -38,17 +81,60 @@ class Comment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    blog_post_id = Column(Integer, ForeignKey("blog_posts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    blog_post_id = Column(Integer, ForeignKey("blog_posts.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Version signal for comment edits (not part of the API response)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', coalesce(content, ''))", persisted=True),
+        )
+    )
 
     author = relationship("User", back_populates="comments")
     blog_post = relationship("BlogPost", back_populates="comments")
 
+    __table_args__ = (
+        Index("idx_comments_user_id", "user_id"),
+        Index("idx_comments_user_id_created_at", "user_id", "created_at", "id"),
+        Index("idx_comments_blog_post_id", "blog_post_id"),
+        Index("idx_comments_created_at_id", "created_at", "id"),
+        Index("idx_comments_blog_post_id_created_at", "blog_post_id", "created_at", "id"),
+        Index("idx_comments_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+# Per-table version counters backing the list route ETags
+users_version_seq = Sequence("users_version_seq", metadata=Base.metadata)
+blog_posts_version_seq = Sequence("blog_posts_version_seq", metadata=Base.metadata)
+comments_version_seq = Sequence("comments_version_seq", metadata=Base.metadata)
+
+
+class UserPurge(Base):
+    """Progress of a batched background delete of a user (see app/purge.py)."""
+
+    __tablename__ = "user_purges"
+
+    # No foreign key: the row outlives the user it describes
+    user_id = Column(Integer, primary_key=True)
+    status = Column(String(20), nullable=False)
+    comments_total = Column(Integer, nullable=False, default=0)
+    comments_deleted = Column(Integer, nullable=False, default=0)
+    blog_posts_total = Column(Integer, nullable=False, default=0)
+    blog_posts_deleted = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
 
 class Migration(Base):
     __tablename__ = "migrations"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), unique=True, nullable=False)
+    # sha256 of the applied file; NULL for rows recorded by the Node runner
+    checksum = Column(String(64), nullable=True)
     executed_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.engine import Row
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value: datetime | int | float, row_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, value_type: type = datetime) -> tuple[datetime | int | float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if value_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif not isinstance(sort_value, value_type):
+            raise TypeError(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+def is_paginated(cursor: str | None, limit: int | None) -> bool:
+    # Requests without cursor/limit keep the legacy full-list response
+    return cursor is not None or limit is not None
+
+
+def keyset_page(query, sort_column, id_column, cursor, limit, descending=True, row_key=None):
+    """Apply a (sort_column, id) keyset seek and return (rows, next_cursor).
+
+    ``sort_column`` is usually ``created_at``; it must be NOT NULL for the seek to be exact.
+    ``row_key`` extracts ``(sort value, id)`` from a row; by default the first entity of every
+    row must expose the sort column's attribute and ``id``.
+    """
+    limit = limit or DEFAULT_PAGE_SIZE
+    key = tuple_(sort_column, id_column)
+
+    if cursor is not None:
+        seek = decode_cursor(cursor, sort_column.type.python_type)
+        query = query.filter(key < seek if descending else key > seek)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if row_key is not None:
+            next_cursor = encode_cursor(*row_key(rows[-1]))
+        else:
+            last = rows[-1][0] if isinstance(rows[-1], Row) else rows[-1]
+            next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+
+    return rows, next_cursor
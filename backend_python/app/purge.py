@@ -0,0 +1,209 @@
+"""Batched background deletes of users (``DELETE /api/users/{id}?background=true``).
+
+A plain user delete removes the user's posts and comments in one transaction, which for a
+prolific user holds thousands of row locks until it commits. A purge deletes in committed batches
+of ``PURGE_BATCH_SIZE`` rows instead: the user's comments, then the other comments on the user's
+posts, then the posts, pausing ``PURGE_PAUSE`` seconds between batches so other writers get their
+turn. The regular delete then removes the user together with anything written meanwhile.
+
+Progress is kept in the ``user_purges`` table, so every worker can report it. A purge whose
+worker stopped stops updating its row; after ``PURGE_STALE_SECONDS`` asking again restarts it
+from what is left.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, select, union, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from .cache import (
+    CACHE_MAX_TARGETED_INVALIDATIONS,
+    invalidate_all_blog_posts,
+    invalidate_blog_post,
+    invalidate_blog_post_comments,
+    invalidate_blog_post_lists,
+)
+from .comment_stats import record_comments_removed
+from .etag import bump_versions
+from .events import post_changed
+from .models import BlogPost as BlogPostModel
+from .models import Comment as CommentModel
+from .models import UserPurge
+
+load_dotenv()
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+PURGE_PAUSE = float(os.getenv("PURGE_PAUSE", "0.05"))
+PURGE_STALE_SECONDS = int(os.getenv("PURGE_STALE_SECONDS", "60"))
+
+blog_posts = BlogPostModel.__table__
+comments = CommentModel.__table__
+purges = UserPurge.__table__
+
+# Running purge tasks (the event loop only keeps weak references)
+_tasks: set[asyncio.Task] = set()
+
+
+def user_comment_ids(user_id: int):
+    """Ids of the comments deleted with a user: their own, and every comment on their posts."""
+    return union(
+        select(comments.c.id).where(comments.c.user_id == user_id),
+        select(comments.c.id)
+        .join(blog_posts, blog_posts.c.id == comments.c.blog_post_id)
+        .where(blog_posts.c.user_id == user_id),
+    )
+
+
+def purge_status(db: Session, user_id: int) -> dict | None:
+    row = db.execute(select(purges).where(purges.c.user_id == user_id)).first()
+    return row._asdict() if row is not None else None
+
+
+def begin_purge(db: Session, user_id: int) -> tuple[dict, bool]:
+    """Record a purge of ``user_id``; returns its status and whether the caller should run it.
+
+    A purge that is still making progress is reported as is instead of being started twice.
+    """
+    current = db.execute(
+        select(purges).where(purges.c.user_id == user_id).with_for_update()
+    ).first()
+    stale = datetime.utcnow() - timedelta(seconds=PURGE_STALE_SECONDS)
+    if current is not None and current.status == "running" and current.updated_at > stale:
+        db.rollback()
+        return current._asdict(), False
+
+    comments_total = db.execute(
+        select(func.count()).select_from(user_comment_ids(user_id).subquery())
+    ).scalar_one()
+    blog_posts_total = db.execute(
+        select(func.count()).where(blog_posts.c.user_id == user_id)
+    ).scalar_one()
+    now = datetime.utcnow()
+    values = {
+        "status": "running",
+        "comments_total": comments_total,
+        "comments_deleted": 0,
+        "blog_posts_total": blog_posts_total,
+        "blog_posts_deleted": 0,
+        "error": None,
+        "started_at": now,
+        "updated_at": now,
+        "finished_at": None,
+    }
+    statement = pg_insert(purges).values(user_id=user_id, **values)
+    row = db.execute(
+        statement.on_conflict_do_update(index_elements=[purges.c.user_id], set_=values).returning(
+            *purges.c
+        )
+    ).one()
+    db.commit()
+    return row._asdict(), True
+
+
+def _record_progress(db: Session, user_id: int, comments_deleted: int, blog_posts_deleted: int):
+    db.execute(
+        update(purges)
+        .where(purges.c.user_id == user_id)
+        .values(
+            comments_deleted=purges.c.comments_deleted + comments_deleted,
+            blog_posts_deleted=purges.c.blog_posts_deleted + blog_posts_deleted,
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+def purge_batch(db: Session, user_id: int) -> bool:
+    """Delete and commit the next batch of the user's content; False when none is left."""
+    # Comments first, so the posts they belong to can go without a cascade
+    batch = select(user_comment_ids(user_id).subquery().c.id).limit(PURGE_BATCH_SIZE)
+    deleted = (
+        db.execute(
+            delete(comments).where(comments.c.id.in_(batch)).returning(comments.c.blog_post_id)
+        )
+        .scalars()
+        .all()
+    )
+    deleted_posts = []
+    if deleted:
+        record_comments_removed(db, deleted)
+    else:
+        deleted_posts = (
+            db.execute(
+                select(blog_posts.c.id)
+                .where(blog_posts.c.user_id == user_id)
+                .limit(PURGE_BATCH_SIZE)
+                .with_for_update()
+            )
+            .scalars()
+            .all()
+        )
+        if not deleted_posts:
+            return False
+        # Comments posted since the comment batches would otherwise block the posts
+        deleted = (
+            db.execute(
+                delete(comments)
+                .where(comments.c.blog_post_id.in_(deleted_posts))
+                .returning(comments.c.blog_post_id)
+            )
+            .scalars()
+            .all()
+        )
+        db.execute(delete(blog_posts).where(blog_posts.c.id.in_(deleted_posts)))
+
+    _record_progress(db, user_id, len(deleted), len(deleted_posts))
+    db.commit()
+    bump_versions(db, "blog_posts", "comments")
+
+    touched = set(deleted) | set(deleted_posts)
+    if len(touched) > CACHE_MAX_TARGETED_INVALIDATIONS:
+        invalidate_all_blog_posts()
+    else:
+        for blog_post_id in touched:
+            invalidate_blog_post(blog_post_id)
+            invalidate_blog_post_comments(blog_post_id)
+        invalidate_blog_post_lists()
+    for blog_post_id in deleted_posts:
+        post_changed("deleted", blog_post_id)
+    for blog_post_id in touched - set(deleted_posts):
+        post_changed("updated", blog_post_id)
+    return True
+
+
+def finish_purge(db: Session, user_id: int, error: str | None = None) -> None:
+    db.execute(
+        update(purges)
+        .where(purges.c.user_id == user_id)
+        .values(
+            status="failed" if error else "done",
+            error=error,
+            updated_at=datetime.utcnow(),
+            finished_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+
+
+async def run_purge(db, user_id: int, delete_user) -> None:
+    """Delete batches until only the user is left, then run ``delete_user`` on it."""
+    try:
+        while await db.run(purge_batch, user_id):
+            await asyncio.sleep(PURGE_PAUSE)
+        await db.run(delete_user, user_id)
+    except Exception as e:
+        await db.run(lambda session: session.rollback())
+        print(f"Purge of user {user_id} failed: {e!r}")
+        await db.run(finish_purge, user_id, repr(e))
+    else:
+        await db.run(finish_purge, user_id)
+        print(f"Purged user {user_id}")
+
+
+def spawn(coroutine) -> None:
+    task = asyncio.create_task(coroutine)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -0,0 +1,146 @@
+"""Read replicas for GET traffic.
+
+``DB_REPLICA_URLS`` lists replica URLs (comma-separated ``postgresql://`` URLs; in async mode
+the same URLs are used with asyncpg). Reads rotate over the healthy replicas. A background
+task checks each one every ``REPLICA_CHECK_INTERVAL`` seconds and takes it out of rotation when
+it cannot be reached or its replay lag exceeds ``REPLICA_MAX_LAG`` seconds; replicas only join
+the rotation after passing a check. With no healthy replica, reads go to the primary.
+"""
+
+import asyncio
+import itertools
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from .instrumentation import (
+    INSTRUMENTATION,
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    instrument_engine,
+)
+from .metrics import REPLICA_HEALTHY, REPLICA_LAG
+
+load_dotenv()
+
+REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "10"))
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+
+# Seconds since the last replayed transaction, or 0 when the replica has replayed everything it
+# received (an idle primary would otherwise look like a lagging replica). Also 0 on a primary,
+# so the same database can be listed as a "replica" for testing.
+LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN pg_is_in_recovery() AND pg_last_wal_receive_lsn() IS DISTINCT FROM
+            pg_last_wal_replay_lsn()
+        THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        ELSE 0
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, name: str, url: str, async_mode: bool, pool_options: dict):
+        self.name = name
+        self.display_url = make_url(url).render_as_string(hide_password=True)
+        # None until the first check
+        self.healthy: bool | None = None
+        self.lag: float | None = None
+        # Sessions record where they run; etag.get_versions needs to know
+        info = {"replica": name}
+
+        self.engine = create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            connect_args={"connect_timeout": REPLICA_CONNECT_TIMEOUT},
+            **pool_options,
+        )
+        self.session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=self.engine, info=info
+        )
+        self.async_engine = None
+        self.async_session_factory = None
+        if async_mode:
+            self.async_engine = create_async_engine(
+                make_url(url).set(drivername="postgresql+asyncpg"),
+                poolclass=TimedAsyncQueuePool,
+                connect_args={"timeout": REPLICA_CONNECT_TIMEOUT},
+                **pool_options,
+            )
+            self.async_session_factory = async_sessionmaker(
+                bind=self.async_engine, autoflush=False, expire_on_commit=False, info=info
+            )
+
+        if INSTRUMENTATION:
+            instrument_engine(self.engine)
+            if self.async_engine is not None:
+                instrument_engine(self.async_engine.sync_engine)
+
+    @property
+    def pool(self):
+        return (self.async_engine.sync_engine if self.async_engine else self.engine).pool
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as connection:
+                lag = float(connection.execute(LAG_QUERY).scalar())
+        except SQLAlchemyError as e:
+            self._set_health(False, None, f"unreachable: {e.__class__.__name__}")
+            return
+        self._set_health(lag <= REPLICA_MAX_LAG, lag, f"lag {lag:.1f}s")
+
+    def _set_health(self, healthy: bool, lag: float | None, reason: str) -> None:
+        if healthy != self.healthy:
+            state = "in rotation" if healthy else "out of rotation"
+            print(f"Replica {self.name} ({self.display_url}) {state}: {reason}")
+        self.healthy = healthy
+        self.lag = lag
+        REPLICA_HEALTHY.labels(self.name).set(int(healthy))
+        if lag is not None:
+            REPLICA_LAG.labels(self.name).set(lag)
+
+    def dispose(self, close: bool = True) -> None:
+        self.engine.dispose(close=close)
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose(close=close)
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str], async_mode: bool, pool_options: dict | None = None):
+        self.replicas = [
+            Replica(f"replica{i}", url, async_mode, pool_options or {})
+            for i, url in enumerate(urls)
+        ]
+        self._turn = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Replica | None:
+        """Next healthy replica in round-robin order, or ``None`` to use the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._turn) % len(healthy)]
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            replica.check()
+
+    async def run_checks(self, interval: float = REPLICA_CHECK_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await run_in_threadpool(self.check)
+
+    def dispose(self, close: bool = True) -> None:
+        for replica in self.replicas:
+            replica.dispose(close)
@@ -1,42 +1,199 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..batch import batch_result, check_batch_size
+from ..cache import (
+    blog_post_key,
+    blog_post_list_key,
+    invalidate_blog_post,
+    invalidate_blog_post_comments,
+    invalidate_blog_post_lists,
+)
+from ..database import Database, get_read_db, get_write_db
+from ..errors import is_foreign_key_violation
+from ..etag import bump_versions, conditional_get, get_versions, make_etag
+from ..events import post_changed
+from ..fields import (
+    cursor_key,
+    excerpt,
+    fields_key,
+    parse_fields,
+    projection,
+    select_columns,
+)
+from ..include import (
+    BLOG_POST_INCLUDES,
+    INCLUDE_LIMIT,
+    MAX_INCLUDE_LIMIT,
+    expand,
+    include_etag_parts,
+    parse_include,
+)
+from ..instrumentation import InstrumentedRoute
 from ..models import BlogPost as BlogPostModel
+from ..models import Comment as CommentModel
 from ..models import User as UserModel
-from ..schemas import BlogPost, BlogPostCreate, BlogPostUpdate
+from ..pagination import MAX_PAGE_SIZE, is_paginated, keyset_page
+from ..schemas import (
+    BlogPost,
+    BlogPostBatchResult,
+    BlogPostCreate,
+    BlogPostPage,
+    BlogPostSummary,
+    BlogPostSummaryPage,
+    BlogPostUpdate,
+    BlogPostWithRelations,
+)
+from ..serialization import dump_json, output_fields, row_dicts
+from ..streaming import ndjson_response, wants_stream
 
-router = APIRouter(prefix="/api/blog_post", tags=["blog_post"])
+router = APIRouter(prefix="/api/blog_post", tags=["blog_post"], route_class=InstrumentedRoute)
 
+# Columns available to sparse fieldsets (?fields=); author_name needs the users join
+BLOG_POST_COLUMNS = {
+    "id": BlogPostModel.id,
+    "title": BlogPostModel.title,
+    "content": BlogPostModel.content,
+    "excerpt": excerpt(BlogPostModel.content),
+    "user_id": BlogPostModel.user_id,
+    "created_at": BlogPostModel.created_at,
+    "updated_at": BlogPostModel.updated_at,
+    "author_name": UserModel.name,
+    "comment_count": BlogPostModel.comment_count,
+    "last_comment_at": BlogPostModel.last_comment_at,
+}
+# ?sort= orderings; each is a keyset on (column, id), newest/highest first
+BLOG_POST_SORTS = {
+    "recent": BlogPostModel.created_at,
+    "discussed": BlogPostModel.comment_count,
+}
+# Row shape returned by INSERT/UPDATE ... RETURNING (author_name is joined in)
+RETURNING_COLUMNS = (
+    BlogPostModel.id,
+    BlogPostModel.title,
+    BlogPostModel.content,
+    BlogPostModel.user_id,
+    BlogPostModel.created_at,
+    BlogPostModel.updated_at,
+    BlogPostModel.comment_count,
+    BlogPostModel.last_comment_at,
+)
+SUMMARY_FIELDS = (
+    "id",
+    "title",
+    "excerpt",
+    "user_id",
+    "created_at",
+    "updated_at",
+    "author_name",
+    "comment_count",
+    "last_comment_at",
+)
 
-@router.get("/", response_model=list[BlogPost])
-def get_blog_posts(db: Session = Depends(get_db)):
-    blog_posts = (
-        db.query(BlogPostModel)
-        .join(UserModel)
-        .add_columns(UserModel.name.label("author_name"))
-        .order_by(BlogPostModel.created_at.desc())
-        .all()
+
+def _sort_column(sort: str | None):
+    if sort is None:
+        return BLOG_POST_SORTS["recent"]
+    if sort not in BLOG_POST_SORTS:
+        raise HTTPException(
+            status_code=400, detail=f"sort must be one of: {', '.join(BLOG_POST_SORTS)}"
+        )
+    return BLOG_POST_SORTS[sort]
+
+
+def _blog_post_stream_statement(fields, sort_column):
+    # Keys in the same order as the JSON list responses
+    fields = output_fields(fields, BlogPost, BlogPostSummary)
+    statement = select(*select_columns(BLOG_POST_COLUMNS, fields)).select_from(BlogPostModel)
+    if "author_name" in fields:
+        statement = statement.join(UserModel, BlogPostModel.user_id == UserModel.id)
+    return statement.order_by(sort_column.desc(), BlogPostModel.id.desc())
+
+
+def _list_blog_posts(
+    db: Session,
+    cursor: str | None,
+    limit: int | None,
+    fields=None,
+    sort_column=None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+) -> bytes:
+    if sort_column is None:
+        sort_column = BLOG_POST_SORTS["recent"]
+    fields = output_fields(fields, BlogPost, BlogPostSummary)
+    query = projection(db, BLOG_POST_COLUMNS, fields, sort_column, BlogPostModel.id).select_from(
+        BlogPostModel
     )
+    if "author_name" in fields:
+        query = query.join(UserModel, BlogPostModel.user_id == UserModel.id)
+
+    if is_paginated(cursor, limit):
+        rows, next_cursor = keyset_page(
+            query, sort_column, BlogPostModel.id, cursor, limit, row_key=cursor_key
+        )
+        items = row_dicts(rows, fields)
+        expand(db, items, includes, BLOG_POST_INCLUDES, include_limit)
+        return dump_json({"items": items, "next_cursor": next_cursor})
 
-    result = []
-    for blog_post, author_name in blog_posts:
-        blog_post_dict = {
-            "id": blog_post.id,
-            "title": blog_post.title,
-            "content": blog_post.content,
-            "user_id": blog_post.user_id,
-            "created_at": blog_post.created_at,
-            "updated_at": blog_post.updated_at,
-            "author_name": author_name,
-        }
-        result.append(blog_post_dict)
+    rows = query.order_by(sort_column.desc(), BlogPostModel.id.desc()).all()
+    items = row_dicts(rows, fields)
+    expand(db, items, includes, BLOG_POST_INCLUDES, include_limit)
+    return dump_json(items)
 
-    return result
+
+def _blog_post_list_etag(
+    db: Session,
+    cursor: str | None,
+    limit: int | None,
+    fields=None,
+    sort: str | None = None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+):
+    return make_etag(
+        "blog_posts",
+        sort,
+        cursor,
+        limit,
+        fields_key(fields),
+        *get_versions(db, "blog_posts"),
+        *include_etag_parts(db, includes, include_limit),
+    )
+
+
+def _blog_post_etag(
+    db: Session,
+    blog_post_id: int,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+):
+    row = (
+        db.query(
+            BlogPostModel.updated_at,
+            BlogPostModel.comment_count,
+            BlogPostModel.last_comment_at,
+            UserModel.name,
+        )
+        .join(UserModel)
+        .filter(BlogPostModel.id == blog_post_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return make_etag(
+        "blog_post", blog_post_id, *row, *include_etag_parts(db, includes, include_limit)
+    )
 
 
-@router.get("/{blog_post_id}", response_model=BlogPost)
-def get_blog_post(blog_post_id: int, db: Session = Depends(get_db)):
+def _get_blog_post(
+    db: Session,
+    blog_post_id: int,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+):
     blog_post_result = (
         db.query(BlogPostModel)
         .join(UserModel)
@@ -49,7 +206,7 @@ def get_blog_post(blog_post_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Blog post not found")
 
     blog_post, author_name = blog_post_result
-    return {
+    item = {
         "id": blog_post.id,
         "title": blog_post.title,
         "content": blog_post.content,
@@ -57,65 +214,203 @@ def get_blog_post(blog_post_id: int, db: Session = Depends(get_db)):
         "created_at": blog_post.created_at,
         "updated_at": blog_post.updated_at,
         "author_name": author_name,
+        "comment_count": blog_post.comment_count,
+        "last_comment_at": blog_post.last_comment_at,
     }
+    expand(db, [item], includes, BLOG_POST_INCLUDES, include_limit)
+    return item
 
 
-@router.post("/", response_model=BlogPost, status_code=status.HTTP_201_CREATED)
-def create_blog_post(blog_post: BlogPostCreate, db: Session = Depends(get_db)):
-    # Verify user exists
-    user = db.query(UserModel).filter(UserModel.id == blog_post.user_id).first()
-    if user is None:
-        raise HTTPException(status_code=400, detail="User not found")
-
-    db_blog_post = BlogPostModel(
-        title=blog_post.title, content=blog_post.content, user_id=blog_post.user_id
+def _with_author_name(cte):
+    return select(cte, UserModel.name.label("author_name")).outerjoin(
+        UserModel, UserModel.id == cte.c.user_id
     )
-    db.add(db_blog_post)
-    db.commit()
-    db.refresh(db_blog_post)
-
-    return {
-        "id": db_blog_post.id,
-        "title": db_blog_post.title,
-        "content": db_blog_post.content,
-        "user_id": db_blog_post.user_id,
-        "created_at": db_blog_post.created_at,
-        "updated_at": db_blog_post.updated_at,
-        "author_name": user.name,
-    }
 
 
-@router.put("/{blog_post_id}", response_model=BlogPost)
-def update_blog_post(blog_post_id: int, blog_post: BlogPostUpdate, db: Session = Depends(get_db)):
-    db_blog_post = db.query(BlogPostModel).filter(BlogPostModel.id == blog_post_id).first()
-    if db_blog_post is None:
-        raise HTTPException(status_code=404, detail="Blog post not found")
+def _create_blog_post(db: Session, blog_post: BlogPostCreate):
+    # Single statement: the users foreign key replaces the existence check and the join
+    # returns the author name
+    inserted = (
+        insert(BlogPostModel)
+        .values(title=blog_post.title, content=blog_post.content, user_id=blog_post.user_id)
+        .returning(*RETURNING_COLUMNS)
+        .cte("inserted")
+    )
+    try:
+        row = db.execute(_with_author_name(inserted)).one()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if is_foreign_key_violation(e):
+            raise HTTPException(status_code=400, detail="User not found") from None
+        raise
+
+    bump_versions(db, "blog_posts")
+    invalidate_blog_post_lists()
+    post_changed("created", row.id)
+    return row._asdict()
+
+
+def _create_blog_posts_batch(db: Session, blog_posts: list[BlogPostCreate]):
+    # Validate every referenced user in one query (also yields the author names)
+    user_ids = {blog_post.user_id for blog_post in blog_posts}
+    author_names = dict(
+        db.query(UserModel.id, UserModel.name).filter(UserModel.id.in_(user_ids)).all()
+    )
 
-    db_blog_post.title = blog_post.title
-    db_blog_post.content = blog_post.content
+    errors = []
+    pending = []
+    for index, blog_post in enumerate(blog_posts):
+        if blog_post.user_id in author_names:
+            pending.append((index, blog_post))
+        else:
+            errors.append((index, "User not found"))
+
+    created = []
+    if pending:
+        statement = insert(BlogPostModel).returning(
+            *RETURNING_COLUMNS, sort_by_parameter_order=True
+        )
+        params = [
+            {"title": blog_post.title, "content": blog_post.content, "user_id": blog_post.user_id}
+            for _, blog_post in pending
+        ]
+        try:
+            rows = db.execute(statement, params).all()
+            db.commit()
+        except IntegrityError:
+            # A referenced user was deleted between validation and insert
+            db.rollback()
+            raise HTTPException(status_code=400, detail="User not found") from None
+
+        created = [{**row._asdict(), "author_name": author_names[row.user_id]} for row in rows]
+        bump_versions(db, "blog_posts")
+        invalidate_blog_post_lists()
+        for row in rows:
+            post_changed("created", row.id)
+
+    return batch_result(created, errors)
+
+
+def _update_blog_post(db: Session, blog_post_id: int, blog_post: BlogPostUpdate):
+    updated = (
+        update(BlogPostModel)
+        .where(BlogPostModel.id == blog_post_id)
+        .values(title=blog_post.title, content=blog_post.content)
+        .returning(*RETURNING_COLUMNS)
+        .cte("updated")
+    )
+    row = db.execute(_with_author_name(updated)).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Blog post not found")
     db.commit()
-    db.refresh(db_blog_post)
-
-    # Get author name
-    user = db.query(UserModel).filter(UserModel.id == db_blog_post.user_id).first()
-
-    return {
-        "id": db_blog_post.id,
-        "title": db_blog_post.title,
-        "content": db_blog_post.content,
-        "user_id": db_blog_post.user_id,
-        "created_at": db_blog_post.created_at,
-        "updated_at": db_blog_post.updated_at,
-        "author_name": user.name if user else None,
-    }
 
+    bump_versions(db, "blog_posts")
+    invalidate_blog_post(blog_post_id)
+    invalidate_blog_post_lists()
+    post_changed("updated", blog_post_id)
+    return row._asdict()
 
-@router.delete("/{blog_post_id}")
-def delete_blog_post(blog_post_id: int, db: Session = Depends(get_db)):
-    db_blog_post = db.query(BlogPostModel).filter(BlogPostModel.id == blog_post_id).first()
-    if db_blog_post is None:
+
+def _delete_blog_post(db: Session, blog_post_id: int):
+    # Locked first so comments posted concurrently wait instead of landing between the deletes
+    locked = db.execute(
+        select(BlogPostModel.id).where(BlogPostModel.id == blog_post_id).with_for_update()
+    ).first()
+    if locked is None:
         raise HTTPException(status_code=404, detail="Blog post not found")
 
-    db.delete(db_blog_post)
+    db.execute(delete(CommentModel).where(CommentModel.blog_post_id == blog_post_id))
+    db.execute(delete(BlogPostModel).where(BlogPostModel.id == blog_post_id))
     db.commit()
+    bump_versions(db, "blog_posts", "comments")
+    invalidate_blog_post(blog_post_id)
+    invalidate_blog_post_lists()
+    invalidate_blog_post_comments(blog_post_id)
+    post_changed("deleted", blog_post_id)
     return {"message": "Blog post deleted successfully"}
+
+
+@router.get(
+    "/",
+    response_model=list[BlogPost] | BlogPostPage | list[BlogPostSummary] | BlogPostSummaryPage,
+    response_model_exclude_unset=True,
+)
+async def get_blog_posts(
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    view: str | None = None,
+    sort: str | None = None,
+    stream: bool = False,
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    names = parse_fields(fields, view, BLOG_POST_COLUMNS, SUMMARY_FIELDS)
+    includes = parse_include(include, BLOG_POST_INCLUDES, names)
+    sort_column = _sort_column(sort)
+    sort = sort or "recent"
+    if wants_stream(request, stream):
+        if includes:
+            raise HTTPException(status_code=400, detail="include is not supported when streaming")
+        return ndjson_response(_blog_post_stream_statement(names, sort_column), db.replica)
+
+    return await conditional_get(
+        request,
+        response,
+        # Included relations are not invalidated with the post lists, so they skip the cache
+        None if includes else blog_post_list_key(cursor, limit, fields_key(names), sort),
+        lambda: db.run(_blog_post_list_etag, cursor, limit, names, sort, includes, include_limit),
+        lambda: db.run(
+            _list_blog_posts, cursor, limit, names, sort_column, includes, include_limit
+        ),
+    )
+
+
+@router.get(
+    "/{blog_post_id}", response_model=BlogPostWithRelations, response_model_exclude_unset=True
+)
+async def get_blog_post(
+    blog_post_id: int,
+    request: Request,
+    response: Response,
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    includes = parse_include(include, BLOG_POST_INCLUDES)
+    return await conditional_get(
+        request,
+        response,
+        None if includes else blog_post_key(blog_post_id),
+        lambda: db.run(_blog_post_etag, blog_post_id, includes, include_limit),
+        lambda: db.run(_get_blog_post, blog_post_id, includes, include_limit),
+    )
+
+
+@router.post("/", response_model=BlogPost, status_code=status.HTTP_201_CREATED)
+async def create_blog_post(blog_post: BlogPostCreate, db: Database = Depends(get_write_db)):
+    return await db.run(_create_blog_post, blog_post)
+
+
+@router.post("/batch", response_model=BlogPostBatchResult)
+async def create_blog_posts_batch(
+    blog_posts: list[BlogPostCreate], db: Database = Depends(get_write_db)
+):
+    check_batch_size(blog_posts)
+    return await db.run(_create_blog_posts_batch, blog_posts)
+
+
+@router.put("/{blog_post_id}", response_model=BlogPost)
+async def update_blog_post(
+    blog_post_id: int, blog_post: BlogPostUpdate, db: Database = Depends(get_write_db)
+):
+    return await db.run(_update_blog_post, blog_post_id, blog_post)
+
+
+@router.delete("/{blog_post_id}")
+async def delete_blog_post(blog_post_id: int, db: Database = Depends(get_write_db)):
+    return await db.run(_delete_blog_post, blog_post_id)
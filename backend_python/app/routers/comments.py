@@ -1,46 +1,186 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..admission import UNPOOLED_ROUTES
+from ..batch import batch_result, check_batch_size
+from ..cache import (
+    invalidate_blog_post,
+    invalidate_blog_post_comments,
+    invalidate_blog_post_lists,
+)
+from ..comment_stats import (
+    blog_posts,
+    comment_removed,
+    comments_added,
+    record_comments_added,
+)
+from ..database import Database, get_read_db, get_write_db
+from ..errors import violated_foreign_key
+from ..etag import bump_versions, conditional_get, get_versions, make_etag
+from ..events import comment_changed
+from ..fields import (
+    cursor_key,
+    excerpt,
+    fields_key,
+    parse_fields,
+    projection,
+    select_columns,
+)
+from ..group_commit import COMMENT_GROUP_COMMIT, GroupCommit
+from ..include import (
+    BLOG_POST_COMMENT_INCLUDES,
+    COMMENT_INCLUDES,
+    INCLUDE_LIMIT,
+    MAX_INCLUDE_LIMIT,
+    expand,
+    include_etag_parts,
+    parse_include,
+)
+from ..instrumentation import InstrumentedRoute
 from ..models import BlogPost as BlogPostModel
 from ..models import Comment as CommentModel
 from ..models import User as UserModel
-from ..schemas import Comment, CommentCreate, CommentUpdate
+from ..pagination import MAX_PAGE_SIZE, is_paginated, keyset_page
+from ..schemas import (
+    Comment,
+    CommentBatchResult,
+    CommentCreate,
+    CommentPage,
+    CommentSummary,
+    CommentSummaryPage,
+    CommentUpdate,
+    CommentWithRelations,
+)
+from ..serialization import dump_json, output_fields, row_dicts
+from ..streaming import ndjson_response, wants_stream
 
-router = APIRouter(prefix="/api/comments", tags=["comments"])
+router = APIRouter(prefix="/api/comments", tags=["comments"], route_class=InstrumentedRoute)
 
+# Columns available to sparse fieldsets (?fields=); the name/title columns need joins
+COMMENT_COLUMNS = {
+    "id": CommentModel.id,
+    "content": CommentModel.content,
+    "excerpt": excerpt(CommentModel.content),
+    "user_id": CommentModel.user_id,
+    "blog_post_id": CommentModel.blog_post_id,
+    "created_at": CommentModel.created_at,
+    "author_name": UserModel.name,
+    "blog_post_title": BlogPostModel.title,
+}
+SUMMARY_FIELDS = (
+    "id",
+    "excerpt",
+    "user_id",
+    "blog_post_id",
+    "created_at",
+    "author_name",
+    "blog_post_title",
+)
+# Row shape returned by INSERT/UPDATE ... RETURNING (names and titles are joined in)
+RETURNING_COLUMNS = (
+    CommentModel.id,
+    CommentModel.content,
+    CommentModel.user_id,
+    CommentModel.blog_post_id,
+    CommentModel.created_at,
+)
+# The per-post listing never includes the post title (matches the Node.js API)
+BLOG_POST_COMMENT_COLUMNS = {**COMMENT_COLUMNS, "blog_post_title": None}
 
-@router.get("/", response_model=list[Comment])
-def get_comments(db: Session = Depends(get_db)):
-    comments = (
-        db.query(CommentModel)
-        .join(UserModel, CommentModel.user_id == UserModel.id)
-        .join(BlogPostModel, CommentModel.blog_post_id == BlogPostModel.id)
-        .add_columns(
-            UserModel.name.label("author_name"), BlogPostModel.title.label("blog_post_title")
+
+def _comment_stream_statement(fields):
+    # Keys in the same order as the JSON list responses
+    fields = output_fields(fields, Comment, CommentSummary)
+    statement = select(*select_columns(COMMENT_COLUMNS, fields)).select_from(CommentModel)
+    if "author_name" in fields:
+        statement = statement.join(UserModel, CommentModel.user_id == UserModel.id)
+    if "blog_post_title" in fields:
+        statement = statement.join(BlogPostModel, CommentModel.blog_post_id == BlogPostModel.id)
+    return statement.order_by(CommentModel.created_at.desc(), CommentModel.id.desc())
+
+
+def _comment_fields_query(db: Session, columns: dict, fields):
+    query = projection(db, columns, fields, CommentModel.created_at, CommentModel.id).select_from(
+        CommentModel
+    )
+    if "author_name" in fields:
+        query = query.join(UserModel, CommentModel.user_id == UserModel.id)
+    if columns["blog_post_title"] is not None and "blog_post_title" in fields:
+        query = query.join(BlogPostModel, CommentModel.blog_post_id == BlogPostModel.id)
+    return query
+
+
+def _list_comment_fields(
+    query,
+    cursor: str | None,
+    limit: int | None,
+    fields,
+    descending=True,
+    includes: tuple[str, ...] = (),
+    relations: dict = COMMENT_INCLUDES,
+    include_limit: int = INCLUDE_LIMIT,
+):
+    if is_paginated(cursor, limit):
+        rows, next_cursor = keyset_page(
+            query,
+            CommentModel.created_at,
+            CommentModel.id,
+            cursor,
+            limit,
+            descending=descending,
+            row_key=cursor_key,
         )
-        .order_by(CommentModel.created_at.desc())
-        .all()
-    )
-
-    result = []
-    for comment, author_name, blog_post_title in comments:
-        comment_dict = {
-            "id": comment.id,
-            "content": comment.content,
-            "user_id": comment.user_id,
-            "blog_post_id": comment.blog_post_id,
-            "created_at": comment.created_at,
-            "author_name": author_name,
-            "blog_post_title": blog_post_title,
-        }
-        result.append(comment_dict)
+        items = row_dicts(rows, fields)
+        expand(query.session, items, includes, relations, include_limit)
+        return dump_json({"items": items, "next_cursor": next_cursor})
+
+    order = CommentModel.created_at.desc() if descending else CommentModel.created_at.asc()
+    items = row_dicts(query.order_by(order).all(), fields)
+    expand(query.session, items, includes, relations, include_limit)
+    return dump_json(items)
 
-    return result
+
+def _list_comments(
+    db: Session,
+    cursor: str | None,
+    limit: int | None,
+    fields=None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+) -> bytes:
+    fields = output_fields(fields, Comment, CommentSummary)
+    query = _comment_fields_query(db, COMMENT_COLUMNS, fields)
+    return _list_comment_fields(
+        query, cursor, limit, fields, includes=includes, include_limit=include_limit
+    )
 
 
-@router.get("/{comment_id}", response_model=Comment)
-def get_comment(comment_id: int, db: Session = Depends(get_db)):
+def _comment_list_etag(
+    db: Session,
+    cursor: str | None,
+    limit: int | None,
+    fields=None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+):
+    # The items carry their post's title, which post edits change
+    return make_etag(
+        "comments",
+        cursor,
+        limit,
+        fields_key(fields),
+        *get_versions(db, "comments", "blog_posts"),
+        *include_etag_parts(db, includes, include_limit),
+    )
+
+
+def _get_comment(
+    db: Session, comment_id: int, includes: tuple[str, ...] = (), include_limit: int = INCLUDE_LIMIT
+):
     comment_result = (
         db.query(CommentModel)
         .join(UserModel, CommentModel.user_id == UserModel.id)
@@ -56,7 +196,7 @@ def get_comment(comment_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Comment not found")
 
     comment, author_name, blog_post_title = comment_result
-    return {
+    item = {
         "id": comment.id,
         "content": comment.content,
         "user_id": comment.user_id,
@@ -65,95 +205,388 @@ def get_comment(comment_id: int, db: Session = Depends(get_db)):
         "author_name": author_name,
         "blog_post_title": blog_post_title,
     }
+    expand(db, [item], includes, COMMENT_INCLUDES, include_limit)
+    return item
 
 
-def get_blog_post_comments(blog_post_id: int, db: Session):
-    comments = (
-        db.query(CommentModel)
-        .join(UserModel, CommentModel.user_id == UserModel.id)
-        .add_columns(UserModel.name.label("author_name"))
+def get_blog_post_comments_etag(
+    db: Session,
+    blog_post_id: int,
+    cursor: str | None = None,
+    limit: int | None = None,
+    fields=None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+):
+    # Count catches deletes, max(id) catches inserts and max(updated_at) catches edits;
+    # the users version covers author renames.
+    stats = (
+        db.query(
+            func.count(CommentModel.id),
+            func.max(CommentModel.id),
+            func.max(CommentModel.updated_at),
+        )
         .filter(CommentModel.blog_post_id == blog_post_id)
-        .order_by(CommentModel.created_at.asc())
-        .all()
-    )
-
-    result = []
-    for comment, author_name in comments:
-        comment_dict = {
-            "id": comment.id,
-            "content": comment.content,
-            "user_id": comment.user_id,
-            "blog_post_id": comment.blog_post_id,
-            "created_at": comment.created_at,
-            "author_name": author_name,
-            "blog_post_title": None,
-        }
-        result.append(comment_dict)
+        .one()
+    )
+    return make_etag(
+        "blog_post_comments",
+        blog_post_id,
+        cursor,
+        limit,
+        fields_key(fields),
+        *stats,
+        *get_versions(db, "users"),
+        *include_etag_parts(db, includes, include_limit),
+    )
 
-    return result
 
+def get_blog_post_comments(
+    db: Session,
+    blog_post_id: int,
+    cursor: str | None = None,
+    limit: int | None = None,
+    fields=None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+) -> bytes:
+    fields = output_fields(fields, Comment, CommentSummary)
+    query = _comment_fields_query(db, BLOG_POST_COMMENT_COLUMNS, fields).filter(
+        CommentModel.blog_post_id == blog_post_id
+    )
+    return _list_comment_fields(
+        query,
+        cursor,
+        limit,
+        fields,
+        descending=False,
+        includes=includes,
+        relations=BLOG_POST_COMMENT_INCLUDES,
+        include_limit=include_limit,
+    )
 
-@router.post("/", response_model=Comment, status_code=status.HTTP_201_CREATED)
-def create_comment(comment: CommentCreate, db: Session = Depends(get_db)):
-    # Verify user exists
-    user = db.query(UserModel).filter(UserModel.id == comment.user_id).first()
-    if user is None:
-        raise HTTPException(status_code=400, detail="User not found")
 
-    # Verify blog post exists
-    blog_post = db.query(BlogPostModel).filter(BlogPostModel.id == comment.blog_post_id).first()
-    if blog_post is None:
-        raise HTTPException(status_code=400, detail="Blog post not found")
+def _with_related_names(cte):
+    return (
+        select(
+            cte,
+            UserModel.name.label("author_name"),
+            BlogPostModel.title.label("blog_post_title"),
+        )
+        .outerjoin(UserModel, UserModel.id == cte.c.user_id)
+        .outerjoin(BlogPostModel, BlogPostModel.id == cte.c.blog_post_id)
+    )
+
+
+def _comments_changed(db: Session, blog_post_ids):
+    # Comment writes also change the posts' comment statistics
+    bump_versions(db, "comments", "blog_posts")
+    for blog_post_id in blog_post_ids:
+        invalidate_blog_post(blog_post_id)
+        invalidate_blog_post_comments(blog_post_id)
+    invalidate_blog_post_lists()
+
 
-    db_comment = CommentModel(
-        content=comment.content, user_id=comment.user_id, blog_post_id=comment.blog_post_id
+def _create_comment(db: Session, comment: CommentCreate):
+    # Single statement: the foreign keys replace the existence checks, the second CTE bumps
+    # the post's comment statistics and the joins return the author name and post title
+    # Timestamps are explicit: column defaults are not applied to DML nested this deep
+    now = datetime.utcnow()
+    inserted = (
+        insert(CommentModel)
+        .values(
+            content=comment.content,
+            user_id=comment.user_id,
+            blog_post_id=comment.blog_post_id,
+            created_at=now,
+            updated_at=now,
+        )
+        .returning(*RETURNING_COLUMNS)
+        .cte("inserted")
     )
-    db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
-
-    return {
-        "id": db_comment.id,
-        "content": db_comment.content,
-        "user_id": db_comment.user_id,
-        "blog_post_id": db_comment.blog_post_id,
-        "created_at": db_comment.created_at,
-        "author_name": user.name,
-        "blog_post_title": blog_post.title,
-    }
+    counted = (
+        update(blog_posts)
+        .where(blog_posts.c.id == inserted.c.blog_post_id)
+        .values(comments_added(now))
+        .returning(blog_posts.c.id, blog_posts.c.title)
+        .cte("counted")
+    )
+    statement = (
+        select(
+            inserted,
+            UserModel.name.label("author_name"),
+            counted.c.title.label("blog_post_title"),
+        )
+        .outerjoin(UserModel, UserModel.id == inserted.c.user_id)
+        .outerjoin(counted, counted.c.id == inserted.c.blog_post_id)
+    )
+    try:
+        row = db.execute(statement).one()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = violated_foreign_key(e, "user_id", "blog_post_id")
+        if column == "user_id":
+            raise HTTPException(status_code=400, detail="User not found") from None
+        if column == "blog_post_id":
+            raise HTTPException(status_code=400, detail="Blog post not found") from None
+        raise
 
+    _comments_changed(db, [row.blog_post_id])
+    comment_changed("created", row.id, row.blog_post_id)
+    return row._asdict()
 
-@router.put("/{comment_id}", response_model=Comment)
-def update_comment(comment_id: int, comment: CommentUpdate, db: Session = Depends(get_db)):
-    db_comment = db.query(CommentModel).filter(CommentModel.id == comment_id).first()
-    if db_comment is None:
-        raise HTTPException(status_code=404, detail="Comment not found")
 
-    db_comment.content = comment.content
+def _lookup_references(db: Session, comments: list[CommentCreate]) -> tuple[dict, dict]:
+    # Validate every referenced user and post in a single round trip
+    user_ids = {comment.user_id for comment in comments}
+    blog_post_ids = {comment.blog_post_id for comment in comments}
+    lookup = union_all(
+        select(literal("user").label("kind"), UserModel.id, UserModel.name.label("label")).where(
+            UserModel.id.in_(user_ids)
+        ),
+        select(literal("post"), BlogPostModel.id, BlogPostModel.title).where(
+            BlogPostModel.id.in_(blog_post_ids)
+        ),
+    )
+    author_names = {}
+    blog_post_titles = {}
+    for kind, row_id, label in db.execute(lookup):
+        (author_names if kind == "user" else blog_post_titles)[row_id] = label
+    return author_names, blog_post_titles
+
+
+def _create_comments_batch(db: Session, comments: list[CommentCreate]):
+    author_names, blog_post_titles = _lookup_references(db, comments)
+
+    errors = []
+    pending = []
+    for index, comment in enumerate(comments):
+        if comment.user_id not in author_names:
+            errors.append((index, "User not found"))
+        elif comment.blog_post_id not in blog_post_titles:
+            errors.append((index, "Blog post not found"))
+        else:
+            pending.append((index, comment))
+
+    created = []
+    if pending:
+        statement = insert(CommentModel).returning(*RETURNING_COLUMNS, sort_by_parameter_order=True)
+        params = [
+            {
+                "content": comment.content,
+                "user_id": comment.user_id,
+                "blog_post_id": comment.blog_post_id,
+            }
+            for _, comment in pending
+        ]
+        try:
+            rows = db.execute(statement, params).all()
+            record_comments_added(db, rows)
+            db.commit()
+        except IntegrityError:
+            # A referenced user or post was deleted between validation and insert
+            db.rollback()
+            raise HTTPException(
+                status_code=400, detail="Referenced user or blog post not found"
+            ) from None
+
+        created = [
+            {
+                **row._asdict(),
+                "author_name": author_names[row.user_id],
+                "blog_post_title": blog_post_titles[row.blog_post_id],
+            }
+            for row in rows
+        ]
+        _comments_changed(db, {row.blog_post_id for row in rows})
+        for row in rows:
+            comment_changed("created", row.id, row.blog_post_id)
+
+    return batch_result(created, errors)
+
+
+def _create_comment_group(db: Session, comments: list[CommentCreate]) -> list:
+    """Insert comments queued by concurrent ``create_comment`` calls in one transaction.
+
+    Returns one result per comment: its response, or the ``HTTPException`` for its caller.
+    """
+    author_names, blog_post_titles = _lookup_references(db, comments)
+    results: list = [None] * len(comments)
+    pending = []
+    for index, comment in enumerate(comments):
+        if comment.user_id not in author_names:
+            results[index] = HTTPException(status_code=400, detail="User not found")
+        elif comment.blog_post_id not in blog_post_titles:
+            results[index] = HTTPException(status_code=400, detail="Blog post not found")
+        else:
+            pending.append(index)
+    if not pending:
+        return results
+
+    params = [
+        {
+            "content": comments[index].content,
+            "user_id": comments[index].user_id,
+            "blog_post_id": comments[index].blog_post_id,
+        }
+        for index in pending
+    ]
+    statement = insert(CommentModel).returning(*RETURNING_COLUMNS, sort_by_parameter_order=True)
+    try:
+        rows = dict(zip(pending, db.execute(statement, params).all(), strict=True))
+    except IntegrityError:
+        # A referenced user or post was deleted since the lookup: insert row by row, each in
+        # its own savepoint, so only the affected callers fail
+        db.rollback()
+        rows = {}
+        for index, values in zip(pending, params, strict=True):
+            try:
+                with db.begin_nested():
+                    rows[index] = db.execute(statement, [values]).one()
+            except IntegrityError as e:
+                column = violated_foreign_key(e, "user_id", "blog_post_id")
+                if column == "user_id":
+                    results[index] = HTTPException(status_code=400, detail="User not found")
+                elif column == "blog_post_id":
+                    results[index] = HTTPException(status_code=400, detail="Blog post not found")
+                else:
+                    results[index] = e
+
+    record_comments_added(db, rows.values())
     db.commit()
-    db.refresh(db_comment)
-
-    # Get related data
-    user = db.query(UserModel).filter(UserModel.id == db_comment.user_id).first()
-    blog_post = db.query(BlogPostModel).filter(BlogPostModel.id == db_comment.blog_post_id).first()
-
-    return {
-        "id": db_comment.id,
-        "content": db_comment.content,
-        "user_id": db_comment.user_id,
-        "blog_post_id": db_comment.blog_post_id,
-        "created_at": db_comment.created_at,
-        "author_name": user.name if user else None,
-        "blog_post_title": blog_post.title if blog_post else None,
-    }
 
+    for index, row in rows.items():
+        results[index] = {
+            **row._asdict(),
+            "author_name": author_names[row.user_id],
+            "blog_post_title": blog_post_titles[row.blog_post_id],
+        }
+    if rows:
+        _comments_changed(db, {row.blog_post_id for row in rows.values()})
+    for row in rows.values():
+        comment_changed("created", row.id, row.blog_post_id)
+    return results
 
-@router.delete("/{comment_id}")
-def delete_comment(comment_id: int, db: Session = Depends(get_db)):
-    db_comment = db.query(CommentModel).filter(CommentModel.id == comment_id).first()
-    if db_comment is None:
+
+comment_writes = GroupCommit("comments", _create_comment_group)
+if COMMENT_GROUP_COMMIT:
+    UNPOOLED_ROUTES.add(("POST", "/api/comments/"))
+
+
+def _update_comment(db: Session, comment_id: int, comment: CommentUpdate):
+    updated = (
+        update(CommentModel)
+        .where(CommentModel.id == comment_id)
+        .values(content=comment.content)
+        .returning(*RETURNING_COLUMNS)
+        .cte("updated")
+    )
+    row = db.execute(_with_related_names(updated)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Comment not found")
+    db.commit()
+
+    bump_versions(db, "comments")
+    invalidate_blog_post_comments(row.blog_post_id)
+    comment_changed("updated", comment_id, row.blog_post_id)
+    return row._asdict()
 
-    db.delete(db_comment)
+
+def _delete_comment(db: Session, comment_id: int):
+    deleted = (
+        delete(CommentModel)
+        .where(CommentModel.id == comment_id)
+        .returning(CommentModel.id, CommentModel.blog_post_id, CommentModel.created_at)
+        .cte("deleted")
+    )
+    counted = (
+        update(blog_posts)
+        .where(blog_posts.c.id == deleted.c.blog_post_id)
+        .values(comment_removed(deleted.c.id, deleted.c.created_at))
+        .returning(blog_posts.c.id)
+        .cte("counted")
+    )
+    statement = select(deleted.c.blog_post_id).outerjoin(
+        counted, counted.c.id == deleted.c.blog_post_id
+    )
+    row = db.execute(statement).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
     db.commit()
+
+    _comments_changed(db, [row.blog_post_id])
+    comment_changed("deleted", comment_id, row.blog_post_id)
     return {"message": "Comment deleted successfully"}
+
+
+@router.get(
+    "/",
+    response_model=list[Comment] | CommentPage | list[CommentSummary] | CommentSummaryPage,
+    response_model_exclude_unset=True,
+)
+async def get_comments(
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    view: str | None = None,
+    stream: bool = False,
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    names = parse_fields(fields, view, COMMENT_COLUMNS, SUMMARY_FIELDS)
+    includes = parse_include(include, COMMENT_INCLUDES, names)
+    if wants_stream(request, stream):
+        if includes:
+            raise HTTPException(status_code=400, detail="include is not supported when streaming")
+        return ndjson_response(_comment_stream_statement(names), db.replica)
+
+    return await conditional_get(
+        request,
+        response,
+        None,
+        lambda: db.run(_comment_list_etag, cursor, limit, names, includes, include_limit),
+        lambda: db.run(_list_comments, cursor, limit, names, includes, include_limit),
+    )
+
+
+@router.get("/{comment_id}", response_model=CommentWithRelations, response_model_exclude_unset=True)
+async def get_comment(
+    comment_id: int,
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    includes = parse_include(include, COMMENT_INCLUDES)
+    return await db.run(_get_comment, comment_id, includes, include_limit)
+
+
+@router.post("/", response_model=Comment, status_code=status.HTTP_201_CREATED)
+async def create_comment(comment: CommentCreate, db: Database = Depends(get_write_db)):
+    if COMMENT_GROUP_COMMIT:
+        # Committed together with other comments arriving within the group commit window
+        return await comment_writes.submit(comment)
+    return await db.run(_create_comment, comment)
+
+
+@router.post("/batch", response_model=CommentBatchResult)
+async def create_comments_batch(
+    comments: list[CommentCreate], db: Database = Depends(get_write_db)
+):
+    check_batch_size(comments)
+    return await db.run(_create_comments_batch, comments)
+
+
+@router.put("/{comment_id}", response_model=Comment)
+async def update_comment(
+    comment_id: int, comment: CommentUpdate, db: Database = Depends(get_write_db)
+):
+    return await db.run(_update_comment, comment_id, comment)
+
+
+@router.delete("/{comment_id}")
+async def delete_comment(comment_id: int, db: Database = Depends(get_write_db)):
+    return await db.run(_delete_comment, comment_id)
@@ -0,0 +1,113 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import Double, cast, func, literal
+from sqlalchemy.orm import Session
+
+from ..database import Database, get_read_db
+from ..instrumentation import InstrumentedRoute
+from ..models import BlogPost as BlogPostModel
+from ..models import Comment as CommentModel
+from ..models import User as UserModel
+from ..pagination import MAX_PAGE_SIZE, keyset_page
+from ..schemas import SearchPage
+
+router = APIRouter(prefix="/api/search", tags=["search"], route_class=InstrumentedRoute)
+
+# Must match the configuration of the generated search_vector columns
+SEARCH_CONFIG = "english"
+SEARCH_TYPES = ("posts", "comments")
+SEARCH_PAGE_SIZE = 20
+# Matches are wrapped in <mark></mark>; the text is HTML-escaped first, so these are the only
+# markup in a snippet
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+# As html.escape, ampersands first
+HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+
+def _rank(vector, query):
+    # ts_rank returns real; as double precision the value round-trips exactly through cursors
+    return cast(func.ts_rank(vector, query), Double)
+
+
+def _escape_html(text):
+    for char, entity in HTML_ESCAPES:
+        text = func.replace(text, char, entity)
+    return text
+
+
+def _snippet(text, query):
+    return func.ts_headline(SEARCH_CONFIG, _escape_html(text), query, HEADLINE_OPTIONS)
+
+
+def _search_query(db: Session, search_type: str, query):
+    if search_type == "posts":
+        rank = _rank(BlogPostModel.search_vector, query)
+        columns = (
+            BlogPostModel.id,
+            BlogPostModel.title,
+            literal(None).label("blog_post_id"),
+            _snippet(BlogPostModel.content, query).label("snippet"),
+            BlogPostModel.created_at,
+            BlogPostModel.user_id,
+            UserModel.name.label("author_name"),
+            rank.label("rank"),
+        )
+        statement = (
+            db.query(*columns)
+            .join(UserModel, UserModel.id == BlogPostModel.user_id)
+            .filter(BlogPostModel.search_vector.op("@@")(query))
+        )
+        return statement, rank, BlogPostModel.id
+
+    rank = _rank(CommentModel.search_vector, query)
+    columns = (
+        CommentModel.id,
+        BlogPostModel.title,
+        CommentModel.blog_post_id,
+        _snippet(CommentModel.content, query).label("snippet"),
+        CommentModel.created_at,
+        CommentModel.user_id,
+        UserModel.name.label("author_name"),
+        rank.label("rank"),
+    )
+    statement = (
+        db.query(*columns)
+        .join(UserModel, UserModel.id == CommentModel.user_id)
+        .join(BlogPostModel, BlogPostModel.id == CommentModel.blog_post_id)
+        .filter(CommentModel.search_vector.op("@@")(query))
+    )
+    return statement, rank, CommentModel.id
+
+
+def _search(db: Session, q: str, search_type: str, cursor: str | None, limit: int | None):
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    statement, rank, id_column = _search_query(db, search_type, query)
+    # Best match first; the id breaks ties so the keyset cursor is stable
+    rows, next_cursor = keyset_page(
+        statement,
+        rank,
+        id_column,
+        cursor,
+        limit or SEARCH_PAGE_SIZE,
+        row_key=lambda row: (row.rank, row.id),
+    )
+    return {
+        "items": [{"type": search_type, **row._asdict()} for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("", response_model=SearchPage)
+async def search(
+    q: str = Query(..., max_length=200),
+    type: str = "posts",
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Database = Depends(get_read_db),
+):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be empty")
+    if type not in SEARCH_TYPES:
+        raise HTTPException(
+            status_code=400, detail=f"type must be one of: {', '.join(SEARCH_TYPES)}"
+        )
+    return await db.run(_search, q, type, cursor, limit)
@@ -1,64 +1,378 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..batch import batch_result, check_batch_size
+from ..cache import (
+    CACHE_MAX_TARGETED_INVALIDATIONS,
+    invalidate_all_blog_posts,
+    invalidate_blog_post,
+    invalidate_blog_post_comments,
+    invalidate_blog_post_lists,
+)
+from ..comment_stats import record_user_comments_removed
+from ..database import Database, get_read_db, get_write_db, open_database
+from ..etag import bump_versions, conditional_get, get_versions, make_etag
+from ..events import post_changed
+from ..fields import cursor_key, projection, select_columns
+from ..include import (
+    INCLUDE_LIMIT,
+    MAX_INCLUDE_LIMIT,
+    USER_INCLUDES,
+    expand,
+    include_etag_parts,
+    parse_include,
+)
+from ..instrumentation import InstrumentedRoute
+from ..models import BlogPost as BlogPostModel
+from ..models import Comment as CommentModel
 from ..models import User as UserModel
-from ..schemas import User, UserCreate, UserUpdate
+from ..pagination import MAX_PAGE_SIZE, is_paginated, keyset_page
+from ..purge import begin_purge, purge_status, run_purge, spawn, user_comment_ids
+from ..schemas import (
+    User,
+    UserBatchResult,
+    UserCreate,
+    UserPage,
+    UserPurgeStatus,
+    UserUpdate,
+    UserWithRelations,
+)
+from ..serialization import dump_json, row_dicts
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=InstrumentedRoute)
 
+USER_COLUMNS = {
+    "id": UserModel.id,
+    "name": UserModel.name,
+    "email": UserModel.email,
+    "created_at": UserModel.created_at,
+}
+USER_FIELDS = tuple(User.model_fields)
 
-@router.get("/", response_model=list[User])
-def get_users(db: Session = Depends(get_db)):
-    users = db.query(UserModel).order_by(UserModel.created_at.desc()).all()
-    return users
 
+def _list_users(
+    db: Session,
+    cursor: str | None,
+    limit: int | None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+) -> bytes:
+    query = projection(db, USER_COLUMNS, USER_FIELDS, UserModel.created_at, UserModel.id)
 
-@router.get("/{user_id}", response_model=User)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if user is None:
+    if is_paginated(cursor, limit):
+        rows, next_cursor = keyset_page(
+            query, UserModel.created_at, UserModel.id, cursor, limit, row_key=cursor_key
+        )
+        items = row_dicts(rows, USER_FIELDS)
+        expand(db, items, includes, USER_INCLUDES, include_limit)
+        return dump_json({"items": items, "next_cursor": next_cursor})
+
+    rows = query.order_by(UserModel.created_at.desc()).all()
+    items = row_dicts(rows, USER_FIELDS)
+    expand(db, items, includes, USER_INCLUDES, include_limit)
+    return dump_json(items)
+
+
+def _user_list_etag(
+    db: Session,
+    cursor: str | None,
+    limit: int | None,
+    includes: tuple[str, ...] = (),
+    include_limit: int = INCLUDE_LIMIT,
+):
+    return make_etag(
+        "users",
+        cursor,
+        limit,
+        *get_versions(db, "users"),
+        *include_etag_parts(db, includes, include_limit),
+    )
+
+
+def _affected_blog_post_ids(db: Session, user_id: int) -> tuple[set[int], set[int]] | None:
+    """Posts whose cached responses embed this user's name: (authored, commented).
+
+    ``None`` past ``CACHE_MAX_TARGETED_INVALIDATIONS`` posts of either kind; such users
+    invalidate every cached post response instead (see ``_invalidate_user_content``).
+    """
+    limit = CACHE_MAX_TARGETED_INVALIDATIONS + 1
+    authored = set(
+        db.execute(select(BlogPostModel.id).where(BlogPostModel.user_id == user_id).limit(limit))
+        .scalars()
+        .all()
+    )
+    if len(authored) == limit:
+        return None
+    commented = set(
+        db.execute(
+            select(CommentModel.blog_post_id)
+            .where(CommentModel.user_id == user_id)
+            .distinct()
+            .limit(limit)
+        )
+        .scalars()
+        .all()
+    )
+    if len(commented) == limit:
+        return None
+    return authored, commented
+
+
+def _invalidate_user_content(authored: set[int], commented: set[int]):
+    for blog_post_id in authored:
+        invalidate_blog_post(blog_post_id)
+    for blog_post_id in authored | commented:
+        invalidate_blog_post_comments(blog_post_id)
+    if authored:
+        invalidate_blog_post_lists()
+
+
+def _get_user(
+    db: Session, user_id: int, includes: tuple[str, ...] = (), include_limit: int = INCLUDE_LIMIT
+):
+    row = (
+        db.query(*select_columns(USER_COLUMNS, USER_FIELDS)).filter(UserModel.id == user_id).first()
+    )
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    item = row._asdict()
+    expand(db, [item], includes, USER_INCLUDES, include_limit)
+    return item
 
 
-@router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+def _create_user(db: Session, user: UserCreate):
+    statement = (
+        insert(UserModel)
+        .values(name=user.name, email=user.email)
+        .returning(UserModel.id, UserModel.name, UserModel.email, UserModel.created_at)
+    )
     try:
-        db_user = UserModel(name=user.name, email=user.email)
-        db.add(db_user)
+        row = db.execute(statement).one()
         db.commit()
-        db.refresh(db_user)
-        return db_user
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Email already registered") from None
 
+    bump_versions(db, "users")
+    return row._asdict()
 
-@router.put("/{user_id}", response_model=User)
-def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db)):
-    db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if db_user is None:
-        raise HTTPException(status_code=404, detail="User not found")
 
+def _create_users_batch(db: Session, users: list[UserCreate]):
+    errors = []
+    pending = []
+    seen_emails = set()
+    for index, user in enumerate(users):
+        if user.email in seen_emails:
+            errors.append((index, "Email already registered"))
+        else:
+            seen_emails.add(user.email)
+            pending.append((index, user))
+
+    # One multi-row INSERT; rows skipped by ON CONFLICT are the already registered emails
+    statement = (
+        pg_insert(UserModel)
+        .values([{"name": user.name, "email": user.email} for _, user in pending])
+        .on_conflict_do_nothing(index_elements=[UserModel.email])
+        .returning(UserModel.id, UserModel.name, UserModel.email, UserModel.created_at)
+    )
+    inserted = {row.email: row for row in db.execute(statement)}
+    db.commit()
+
+    created = []
+    for index, user in pending:
+        row = inserted.get(user.email)
+        if row is None:
+            errors.append((index, "Email already registered"))
+        else:
+            created.append(
+                {"id": row.id, "name": row.name, "email": row.email, "created_at": row.created_at}
+            )
+
+    if created:
+        bump_versions(db, "users")
+    return batch_result(created, errors)
+
+
+def _update_user(db: Session, user_id: int, user: UserUpdate):
+    # Self-join on the pre-update row so the old name comes back in the same statement
+    users = UserModel.__table__
+    previous = users.alias("previous")
+    statement = (
+        update(users)
+        .where(users.c.id == user_id, previous.c.id == users.c.id)
+        .values(name=user.name, email=user.email)
+        .returning(
+            users.c.id,
+            users.c.name,
+            users.c.email,
+            users.c.created_at,
+            previous.c.name.label("previous_name"),
+        )
+    )
     try:
-        db_user.name = user.name
-        db_user.email = user.email
+        row = db.execute(statement).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="User not found")
         db.commit()
-        db.refresh(db_user)
-        return db_user
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Email already registered") from None
 
+    if row.previous_name != row.name:
+        # Posts and comments embed the author name
+        bump_versions(db, "users", "blog_posts", "comments")
+        affected = _affected_blog_post_ids(db, user_id)
+        if affected is None:
+            # Too many posts to announce one by one; only the author name changed
+            invalidate_all_blog_posts()
+        else:
+            authored, commented = affected
+            _invalidate_user_content(authored, commented)
+            for blog_post_id in authored:
+                post_changed("updated", blog_post_id)
+    else:
+        bump_versions(db, "users")
+    return {
+        "id": row.id,
+        "name": row.name,
+        "email": row.email,
+        "created_at": row.created_at,
+    }
 
-@router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = db.query(UserModel).filter(UserModel.id == user_id).first()
-    if db_user is None:
+
+def _delete_user(db: Session, user_id: int):
+    # Locking the user makes concurrent inserts of their posts and comments wait (and then fail
+    # their foreign key check) instead of slipping in between the deletes below
+    locked = db.execute(
+        select(UserModel.id).where(UserModel.id == user_id).with_for_update()
+    ).first()
+    if locked is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.delete(db_user)
+    affected = _affected_blog_post_ids(db, user_id)
+    record_user_comments_removed(db, user_id)
+    # Set-based deletes: a constant number of statements however much the user wrote
+    db.execute(delete(CommentModel).where(CommentModel.id.in_(user_comment_ids(user_id))))
+    db.execute(delete(BlogPostModel).where(BlogPostModel.user_id == user_id))
+    db.execute(delete(UserModel).where(UserModel.id == user_id))
     db.commit()
+    bump_versions(db, "users", "blog_posts", "comments")
+    if affected is None:
+        # Large accounts announce their posts batch by batch through ?background=true
+        invalidate_all_blog_posts()
+        return {"message": "User deleted successfully"}
+
+    authored, commented = affected
+    _invalidate_user_content(authored, commented)
+    # Posts the user commented on lose comments (their comment_count changes)
+    for blog_post_id in commented - authored:
+        invalidate_blog_post(blog_post_id)
+    if commented:
+        invalidate_blog_post_lists()
+    for blog_post_id in authored:
+        post_changed("deleted", blog_post_id)
+    for blog_post_id in commented - authored:
+        post_changed("updated", blog_post_id)
     return {"message": "User deleted successfully"}
+
+
+def _begin_user_purge(db: Session, user_id: int):
+    if db.get(UserModel, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return begin_purge(db, user_id)
+
+
+def _get_user_purge(db: Session, user_id: int):
+    purge = purge_status(db, user_id)
+    if purge is None:
+        raise HTTPException(status_code=404, detail="No purge for this user")
+    return purge
+
+
+def _delete_purged_user(db: Session, user_id: int):
+    try:
+        _delete_user(db, user_id)
+    except HTTPException as e:
+        # Deleted by someone else meanwhile: the purge is done all the same
+        if e.status_code != 404:
+            raise
+        db.rollback()
+
+
+async def _purge_user(user_id: int):
+    async with open_database() as db:
+        await run_purge(db, user_id, _delete_purged_user)
+
+
+@router.get("/", response_model=list[User] | UserPage)
+async def get_users(
+    request: Request,
+    response: Response,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    includes = parse_include(include, USER_INCLUDES)
+    return await conditional_get(
+        request,
+        response,
+        None,
+        lambda: db.run(_user_list_etag, cursor, limit, includes, include_limit),
+        lambda: db.run(_list_users, cursor, limit, includes, include_limit),
+    )
+
+
+@router.get("/{user_id}", response_model=UserWithRelations, response_model_exclude_unset=True)
+async def get_user(
+    user_id: int,
+    include: str | None = None,
+    include_limit: int = Query(INCLUDE_LIMIT, ge=1, le=MAX_INCLUDE_LIMIT),
+    db: Database = Depends(get_read_db),
+):
+    includes = parse_include(include, USER_INCLUDES)
+    return await db.run(_get_user, user_id, includes, include_limit)
+
+
+@router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
+async def create_user(user: UserCreate, db: Database = Depends(get_write_db)):
+    return await db.run(_create_user, user)
+
+
+@router.post("/batch", response_model=UserBatchResult)
+async def create_users_batch(users: list[UserCreate], db: Database = Depends(get_write_db)):
+    check_batch_size(users)
+    return await db.run(_create_users_batch, users)
+
+
+@router.put("/{user_id}", response_model=User)
+async def update_user(user_id: int, user: UserUpdate, db: Database = Depends(get_write_db)):
+    return await db.run(_update_user, user_id, user)
+
+
+@router.delete("/{user_id}")
+async def delete_user(
+    user_id: int,
+    response: Response,
+    background: bool = False,
+    db: Database = Depends(get_write_db),
+):
+    if not background:
+        return await db.run(_delete_user, user_id)
+
+    # Large accounts: delete in batches after responding; progress at GET .../purge
+    purge, start = await db.run(_begin_user_purge, user_id)
+    if start:
+        spawn(_purge_user(user_id))
+    response.status_code = status.HTTP_202_ACCEPTED
+    response.headers["Location"] = f"/api/users/{user_id}/purge"
+    return purge
+
+
+@router.get("/{user_id}/purge", response_model=UserPurgeStatus)
+async def get_user_purge(user_id: int, db: Database = Depends(get_read_db)):
+    return await db.run(_get_user_purge, user_id)
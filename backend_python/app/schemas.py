@@ -25,6 +25,24 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserPage(BaseModel):
+    items: list[User]
+    next_cursor: str | None = None
+
+
+class UserPurgeStatus(BaseModel):
+    user_id: int
+    status: str
+    comments_total: int
+    comments_deleted: int
+    blog_posts_total: int
+    blog_posts_deleted: int
+    error: str | None = None
+    started_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
+
+
 class UserWithRelations(User):
     blog_posts: list["BlogPost"] = []
     comments: list["Comment"] = []
@@ -50,19 +68,50 @@ class BlogPost(BlogPostBase):
     created_at: datetime
     updated_at: datetime
     author_name: str | None = None
+    comment_count: int = 0
+    last_comment_at: datetime | None = None
 
     class Config:
         from_attributes = True
 
 
+class BlogPostPage(BaseModel):
+    items: list[BlogPost]
+    next_cursor: str | None = None
+
+
+class BlogPostSummary(BaseModel):
+    # Sparse projection (?fields= / ?view=summary): only requested fields are returned
+    id: int | None = None
+    title: str | None = None
+    content: str | None = None
+    excerpt: str | None = None
+    user_id: int | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    author_name: str | None = None
+    comment_count: int | None = None
+    last_comment_at: datetime | None = None
+
+
+class BlogPostSummaryPage(BaseModel):
+    items: list[BlogPostSummary]
+    next_cursor: str | None = None
+
+
 class BlogPostWithAuthor(BlogPost):
-    author: User
+    author: User | None = None
 
 
 class BlogPostWithComments(BlogPost):
     comments: list["Comment"] = []
 
 
+class BlogPostWithRelations(BlogPostWithAuthor, BlogPostWithComments):
+    # ?include=author,comments; with exclude_unset, relations not included are left out
+    pass
+
+
 # Comment Schemas
 class CommentBase(BaseModel):
     content: str
@@ -89,9 +138,53 @@ class Comment(CommentBase):
         from_attributes = True
 
 
+class CommentPage(BaseModel):
+    items: list[Comment]
+    next_cursor: str | None = None
+
+
+class CommentSummary(BaseModel):
+    # Sparse projection (?fields= / ?view=summary): only requested fields are returned
+    id: int | None = None
+    content: str | None = None
+    excerpt: str | None = None
+    user_id: int | None = None
+    blog_post_id: int | None = None
+    created_at: datetime | None = None
+    author_name: str | None = None
+    blog_post_title: str | None = None
+
+
+class CommentSummaryPage(BaseModel):
+    items: list[CommentSummary]
+    next_cursor: str | None = None
+
+
 class CommentWithRelations(Comment):
-    author: User
-    blog_post: BlogPost
+    # ?include=author,blog_post
+    author: User | None = None
+    blog_post: BlogPost | None = None
+
+
+# Batch Schemas
+class BatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class UserBatchResult(BaseModel):
+    created: list[User]
+    errors: list[BatchError] = []
+
+
+class BlogPostBatchResult(BaseModel):
+    created: list[BlogPost]
+    errors: list[BatchError] = []
+
+
+class CommentBatchResult(BaseModel):
+    created: list[Comment]
+    errors: list[BatchError] = []
 
 
 # WebSocket Message Schema
@@ -105,3 +198,23 @@ class Message(BaseModel):
 # Update forward references
 UserWithRelations.model_rebuild()
 BlogPostWithComments.model_rebuild()
+BlogPostWithRelations.model_rebuild()
+
+
+# Search Schemas
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    rank: float
+    snippet: str
+    created_at: datetime
+    user_id: int
+    author_name: str | None = None
+    # Posts: the post title; comments: the title of the post they belong to
+    title: str | None = None
+    blog_post_id: int | None = None
+
+
+class SearchPage(BaseModel):
+    items: list[SearchResult]
+    next_cursor: str | None = None
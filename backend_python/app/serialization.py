@@ -0,0 +1,66 @@
+"""Fast JSON path for read-only list responses.
+
+List handlers select plain columns (never ORM objects), turn each ``Row`` into a dict in output
+field order and encode the whole body with orjson. The handler returns those bytes as a
+``Response``, so FastAPI skips validating them against ``response_model`` (which still documents
+the endpoint) and ``jsonable_encoder``; cached bodies are stored already encoded.
+
+The bytes are the same FastAPI produces through the response model: keys in the field order of
+the model ``projection_model`` picks, only the selected fields (``exclude_unset``), ISO 8601
+datetimes and unescaped non-ASCII.
+"""
+
+from functools import lru_cache
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def projection_model(
+    names: tuple[str, ...] | None, model: type[BaseModel], summary_model: type[BaseModel]
+) -> type[BaseModel]:
+    """The model a list of ``names`` is rendered with.
+
+    ``None`` means the full representation. ``model`` is used when ``names`` covers its required
+    fields and nothing else; any other projection, e.g. one asking for ``excerpt`` too, uses the
+    summary model, which has every selectable field. Chosen here rather than by validating
+    against ``model | summary_model``, where the first member that validates wins and silently
+    drops the fields it does not know.
+    """
+    if names is None:
+        return model
+    fields = model.model_fields
+    required = {name for name, field in fields.items() if field.is_required()}
+    if required <= set(names) <= set(fields):
+        return model
+    return summary_model
+
+
+@lru_cache(maxsize=256)
+def output_fields(
+    names: tuple[str, ...] | None, model: type[BaseModel], summary_model: type[BaseModel]
+) -> tuple[str, ...]:
+    """Order ``names`` the way their ``projection_model`` declares them."""
+    chosen = projection_model(names, model, summary_model)
+    if names is None:
+        return tuple(chosen.model_fields)
+    return tuple(name for name in chosen.model_fields if name in names)
+
+
+def row_dicts(rows, fields: tuple[str, ...]) -> list[dict]:
+    """Map rows whose leading columns are ``fields`` (in order) to dicts.
+
+    Trailing columns, such as the keyset cursor columns of a projection, are left out.
+    """
+    return [dict(zip(fields, row, strict=False)) for row in rows]
+
+
+def dump_json(content) -> bytes:
+    return orjson.dumps(content)
+
+
+def json_response(body: bytes, headers: dict | None = None) -> Response:
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,113 @@
+"""Production server: gunicorn supervising uvicorn workers.
+
+Usage: python -m app.server
+
+The app is imported once in the master (``PRELOAD``) and forked into ``WEB_CONCURRENCY``
+workers running uvloop and httptools. Each worker drops the connection pools inherited from the
+master, so no socket is ever shared between processes. SIGTERM drains in-flight requests for up
+to ``GRACEFUL_TIMEOUT`` seconds before workers are killed.
+
+Prometheus metrics are kept in ``PROMETHEUS_MULTIPROC_DIR`` (a fresh temporary directory unless
+set) so ``/metrics`` reports all workers.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+load_dotenv()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+PRELOAD = os.getenv("PRELOAD", "true").lower() in ("1", "true", "yes")
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        # Close lingering connections (e.g. WebSockets) before gunicorn's hard kill
+        "timeout_graceful_shutdown": max(GRACEFUL_TIMEOUT - 5, 1),
+    }
+
+
+def post_fork(server, worker):
+    from .database import dispose_engines
+
+    dispose_engines()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # Drop the dead worker's live gauges (counters and histograms keep its totals)
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def prepare_metrics_dir():
+    # Must run before prometheus_client is imported: it picks its storage at import time
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="blog-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+    # Values left by a previous run would be added to this one's
+    for path in Path(directory).glob("*.db"):
+        path.unlink()
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from .main import app
+
+        return app
+
+
+def main():
+    prepare_metrics_dir()
+    # Read by the workers (the response cache default depends on it)
+    os.environ["WEB_CONCURRENCY"] = str(WEB_CONCURRENCY)
+
+    from .database import create_tables
+    from .migrations import migrate
+
+    # Schema work happens once here rather than in every worker on boot
+    if os.getenv("RUN_MIGRATIONS", "false").lower() in ("1", "true", "yes"):
+        migrate()
+    if os.getenv("CREATE_TABLES", "false").lower() in ("1", "true", "yes"):
+        create_tables()
+        print("Database tables created/verified")
+    os.environ["RUN_MIGRATIONS"] = "false"
+    os.environ["CREATE_TABLES"] = "false"
+
+    Server(
+        {
+            "bind": f"{HOST}:{PORT}",
+            "workers": WEB_CONCURRENCY,
+            "worker_class": "app.server.Worker",
+            "preload_app": PRELOAD,
+            "graceful_timeout": GRACEFUL_TIMEOUT,
+            "keepalive": KEEPALIVE,
+            "post_fork": post_fork,
+            "child_exit": child_exit,
+            "accesslog": os.getenv("ACCESS_LOG") or None,
+        }
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
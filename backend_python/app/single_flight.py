@@ -0,0 +1,142 @@
+"""Request coalescing for conditional GETs.
+
+When many clients ask for the same resource at once (a post going viral), ``conditional_get``
+lets the first request run the version query and the body load while identical requests arriving
+meanwhile await its result instead of each taking a pool connection for the same queries. The
+flight is keyed by path and query string; ``If-None-Match`` is still checked per request against
+the shared ETag.
+
+With ``SINGLE_FLIGHT_TTL`` > 0 a finished result is also reused for that many seconds (a
+micro-cache, 0 by default). Either way a flight is not joined after a cache invalidation that
+happened since it started, and clients reading their own writes (see ``get_read_db``) never join
+one.
+
+Flights live on the event loop, so they cover both ``DB_MODE`` settings: in sync mode the leader's
+queries run in the threadpool while followers wait on the loop without occupying a thread.
+"""
+
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from .metrics import SINGLE_FLIGHT_FOLLOWERS, SINGLE_FLIGHT_REQUESTS
+
+load_dotenv()
+
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+SINGLE_FLIGHT_TTL = float(os.getenv("SINGLE_FLIGHT_TTL", "0"))
+
+# A flight loads either the ETag or the body of a response; keys start with the stage
+STAGES = ("etag", "body")
+_requests = {
+    (stage, result): SINGLE_FLIGHT_REQUESTS.labels(stage, result)
+    for stage in STAGES
+    for result in ("leader", "joined", "reused")
+}
+_followers = {stage: SINGLE_FLIGHT_FOLLOWERS.labels(stage) for stage in STAGES}
+
+
+class _LeaderCancelled(Exception):
+    """The leading request went away; its followers run the load themselves."""
+
+
+class _Flight:
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.future = asyncio.get_running_loop().create_future()
+        self.followers = 0
+        self.expires_at = None
+
+    def joinable(self, generation: int, now: float) -> bool:
+        if self.generation != generation:
+            return False
+        return self.expires_at is None or now < self.expires_at
+
+
+class SingleFlight:
+    def __init__(self, ttl: float = SINGLE_FLIGHT_TTL):
+        self.ttl = ttl
+        self.flights: dict[tuple, _Flight] = {}
+        # Followers currently waiting on a leader
+        self.waiting = 0
+        self.leaders = 0
+        self.joined = 0
+        self.reused = 0
+
+    async def do(self, key: tuple, loader, generation: int = 0):
+        """Return ``await loader()``, shared with concurrent calls for the same ``key``.
+
+        ``generation`` is the cache invalidation counter: flights started before a newer
+        generation are not joined.
+        """
+        while True:
+            loop = asyncio.get_running_loop()
+            flight = self.flights.get(key)
+            if flight is None or not flight.joinable(generation, loop.time()):
+                return await self._lead(key, loader, generation)
+
+            if flight.future.done():
+                self.reused += 1
+                _requests[key[0], "reused"].inc()
+                return flight.future.result()
+
+            self.joined += 1
+            _requests[key[0], "joined"].inc()
+            flight.followers += 1
+            self.waiting += 1
+            try:
+                # Shielded: a follower going away must not cancel the leader's result
+                return await asyncio.shield(flight.future)
+            except _LeaderCancelled:
+                continue
+            finally:
+                self.waiting -= 1
+
+    async def _lead(self, key: tuple, loader, generation: int):
+        flight = _Flight(generation)
+        self.flights[key] = flight
+        self.leaders += 1
+        _requests[key[0], "leader"].inc()
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            self._land(key, flight, drop=True)
+            flight.future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            # Errors (404s included) are shared with the current followers but not reused
+            self._land(key, flight, drop=True)
+            flight.future.set_exception(e)
+            raise
+        self._land(key, flight, drop=self.ttl <= 0)
+        flight.future.set_result(value)
+        return value
+
+    def _land(self, key: tuple, flight: _Flight, drop: bool) -> None:
+        _followers[key[0]].observe(flight.followers)
+        # Retrieve the exception so an unjoined failed flight is not reported as unhandled
+        flight.future.add_done_callback(lambda future: future.exception())
+        if drop:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            return
+        loop = asyncio.get_running_loop()
+        flight.expires_at = loop.time() + self.ttl
+        loop.call_later(self.ttl, self._expire, key, flight)
+
+    def _expire(self, key: tuple, flight: _Flight) -> None:
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "joined": self.joined,
+            "reused": self.reused,
+            "waiting": self.waiting,
+            "in_flight": sum(not flight.future.done() for flight in self.flights.values()),
+        }
+
+
+single_flight = SingleFlight()
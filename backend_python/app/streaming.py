@@ -0,0 +1,34 @@
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from .database import open_database
+from .replicas import Replica
+from .serialization import dump_json
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def encode_rows(rows) -> bytes:
+    # The encoder of the paged responses, so a row reads the same either way
+    return b"".join(dump_json(dict(row._mapping)) + b"\n" for row in rows)
+
+
+async def _ndjson_chunks(statement, replica):
+    # The stream owns its session: the request's session may be closed before the body is sent
+    async with open_database(replica) as db:
+        async for rows in db.stream(statement, STREAM_BATCH_SIZE):
+            yield encode_rows(rows)
+
+
+def ndjson_response(statement, replica: Replica | None = None) -> StreamingResponse:
+    """Stream every row of ``statement`` as one JSON object per line.
+
+    Rows are read through a server-side cursor one batch at a time, so memory use does not
+    grow with the size of the table. ``replica`` is the request's read replica, if any.
+    """
+    return StreamingResponse(_ndjson_chunks(statement, replica), media_type=NDJSON_MEDIA_TYPE)
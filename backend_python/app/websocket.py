@@ -1,9 +1,25 @@
 import asyncio
+import json
+import os
+import re
+import time
 from datetime import datetime
 
 from fastapi import WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 
+from .metrics import WS_BROADCAST_DURATION
+
+# Per-connection outbound queue bound and what happens to clients that fall behind
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop")
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+SLOW_CONSUMER_POLICIES = ("drop", "evict")
+WS_MAX_TOPICS = int(os.getenv("WS_MAX_TOPICS", "100"))
+
+# Change feed topics: "posts" (every post) and "post:{id}" (one post and its comments)
+TOPIC_PATTERN = re.compile(r"^(posts|post:\d+)$")
+
 
 class Message(BaseModel):
     text: str
@@ -15,41 +31,223 @@ class Message(BaseModel):
         super().__init__(**data)
 
 
+class Connection:
+    """A client socket with its own bounded outbound queue, drained by a writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.topics: set[str] = set()
+        self.writer: asyncio.Task | None = None
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: set[WebSocket] = set()
+    """Tracks WebSocket clients and fans messages out to them.
+
+    Sending never waits on a client: messages are put on each connection's queue and written
+    by that connection's task, so one slow client cannot delay the others. When a queue is
+    full the slow-consumer policy applies: ``drop`` discards the message for that client,
+    ``evict`` closes the connection.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WS_QUEUE_SIZE,
+        policy: str = WS_SLOW_CONSUMER_POLICY,
+        send_timeout: float = WS_SEND_TIMEOUT,
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.connections: dict[WebSocket, Connection] = {}
+        self.subscriptions: dict[str, set[Connection]] = {}
+        self.sent = 0
+        self.dropped = 0
+        self.evicted = 0
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def active_connections(self) -> set[WebSocket]:
+        return set(self.connections)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.add(websocket)
+        self.register(websocket)
         print("New WebSocket connection established")
 
+    def register(self, websocket: WebSocket) -> Connection:
+        connection = Connection(websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.connections[websocket] = connection
+        return connection
+
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        self._unsubscribe(connection, connection.topics)
+        if connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
         print("WebSocket connection closed")
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            self._enqueue(connection, message)
+
+    async def broadcast(self, message: str | dict | BaseModel) -> int:
+        """Queue ``message`` for every client; returns how many clients accepted it."""
+        started = time.perf_counter()
+        # Serialized once, however many clients there are
+        if isinstance(message, BaseModel):
+            message = message.model_dump_json()
+        elif not isinstance(message, str):
+            message = json.dumps(message, default=str)
+
+        delivered = 0
+        for connection in list(self.connections.values()):
+            delivered += self._enqueue(connection, message)
+        WS_BROADCAST_DURATION.labels("broadcast").observe(time.perf_counter() - started)
+        return delivered
+
+    def subscribe(self, websocket: WebSocket, topics: list[str]):
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        for topic in topics:
+            connection.topics.add(topic)
+            self.subscriptions.setdefault(topic, set()).add(connection)
+
+    def unsubscribe(self, websocket: WebSocket, topics: list[str]):
+        connection = self.connections.get(websocket)
+        if connection is not None:
+            self._unsubscribe(connection, topics)
+
+    def _unsubscribe(self, connection: Connection, topics):
+        for topic in list(topics):
+            connection.topics.discard(topic)
+            subscribers = self.subscriptions.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.subscriptions[topic]
+
+    def deliver(self, topics: list[str], event: dict) -> int:
+        """Queue ``event`` once for every subscriber of any of ``topics``."""
+        started = time.perf_counter()
+        connections = set()
+        for topic in topics:
+            connections |= self.subscriptions.get(topic, set())
+        if not connections:
+            return 0
+
+        message = json.dumps(event, separators=(",", ":"), default=str)
+        delivered = sum(self._enqueue(connection, message) for connection in connections)
+        WS_BROADCAST_DURATION.labels("event").observe(time.perf_counter() - started)
+        return delivered
+
+    def stats(self) -> dict:
+        depths = [connection.queue.qsize() for connection in self.connections.values()]
+        return {
+            "connections": len(depths),
+            "topics": len(self.subscriptions),
+            "policy": self.policy,
+            "queue_size": self.queue_size,
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+        }
+
+    def _enqueue(self, connection: Connection, message: str) -> bool:
+        try:
+            connection.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            if self.policy == "evict":
+                self._evict(connection)
+            else:
+                connection.dropped += 1
+                self.dropped += 1
+            return False
+
+    def _evict(self, connection: Connection):
+        print("Evicting slow WebSocket consumer")
+        self.evicted += 1
+        self.disconnect(connection.websocket)
+        task = asyncio.create_task(self._close(connection.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            # 1013: try again later
+            await asyncio.wait_for(websocket.close(code=1013), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _write(self, connection: Connection):
+        websocket = connection.websocket
         try:
-            await websocket.send_text(message)
+            while True:
+                message = await connection.queue.get()
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+                self.sent += 1
+        except asyncio.TimeoutError:
+            self._evict(connection)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"Error sending message: {e}")
             self.disconnect(websocket)
 
-    async def broadcast(self, message: str):
-        disconnected = set()
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
-                disconnected.add(connection)
 
-        # Remove disconnected connections
-        for conn in disconnected:
-            self.disconnect(conn)
+manager = ConnectionManager()
 
 
-manager = ConnectionManager()
+def parse_command(data: str) -> dict | None:
+    """Return a subscribe/unsubscribe command, or None for plain (echoed) messages."""
+    if not data.startswith("{"):
+        return None
+    try:
+        command = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(command, dict) or command.get("action") not in ("subscribe", "unsubscribe"):
+        return None
+    return command
+
+
+def invalid_topics(topics) -> list:
+    if not isinstance(topics, list):
+        return [topics]
+    return [
+        topic for topic in topics if not isinstance(topic, str) or not TOPIC_PATTERN.match(topic)
+    ]
+
+
+async def handle_command(websocket: WebSocket, command: dict):
+    connection = manager.connections.get(websocket)
+    if connection is None:
+        # Evicted as a slow consumer while the command was in flight; it is being closed
+        return
+    topics = command.get("topics", [])
+    invalid = invalid_topics(topics)
+    if invalid:
+        reply = {"type": "error", "detail": f"Invalid topic(s): {invalid}"}
+    elif command["action"] == "unsubscribe":
+        manager.unsubscribe(websocket, topics)
+        reply = {"type": "unsubscribed", "topics": topics}
+    elif len(connection.topics | set(topics)) > WS_MAX_TOPICS:
+        reply = {"type": "error", "detail": f"Too many topics (max {WS_MAX_TOPICS})"}
+    else:
+        manager.subscribe(websocket, topics)
+        reply = {"type": "subscribed", "topics": topics}
+    await manager.send_personal_message(json.dumps(reply), websocket)
 
 
 async def websocket_endpoint(websocket: WebSocket):
@@ -59,6 +257,12 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             print(f"Received message: {data}")
 
+            # {"action": "subscribe", "topics": ["posts", "post:1"]} joins the change feed
+            command = parse_command(data)
+            if command is not None:
+                await handle_command(websocket, command)
+                continue
+
             # Wait 1 second and send echo response (mimicking Node.js behavior)
             await asyncio.sleep(1)
             echo_response = f"Echo: {data}"
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Compare comment insert throughput of the single-row and batch endpoints.
+
+Usage: python -m benchmarks.batch_insert --base-url http://localhost:8000 --rows 2000
+"""
+
+import argparse
+import time
+import uuid
+
+from .client import request_json
+
+
+def setup(base_url: str) -> tuple[int, int]:
+    tag = uuid.uuid4().hex[:8]
+    _, user = request_json(
+        base_url,
+        "POST",
+        "/api/users/",
+        {"name": f"bench {tag}", "email": f"{tag}@bench.example.com"},
+    )
+    _, blog_post = request_json(
+        base_url,
+        "POST",
+        "/api/blog_post/",
+        {"title": f"bench {tag}", "content": "benchmark", "user_id": user["id"]},
+    )
+    return user["id"], blog_post["id"]
+
+
+def bench_single(base_url: str, rows: int, user_id: int, blog_post_id: int) -> float:
+    started = time.perf_counter()
+    for i in range(rows):
+        request_json(
+            base_url,
+            "POST",
+            "/api/comments/",
+            {"content": f"single {i}", "user_id": user_id, "blog_post_id": blog_post_id},
+        )
+    return rows / (time.perf_counter() - started)
+
+
+def bench_batch(base_url: str, rows: int, batch_size: int, user_id: int, blog_post_id: int):
+    started = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        items = [
+            {"content": f"batch {i}", "user_id": user_id, "blog_post_id": blog_post_id}
+            for i in range(offset, min(offset + batch_size, rows))
+        ]
+        status, result = request_json(base_url, "POST", "/api/comments/batch", items)
+        if status != 200 or result["errors"]:
+            raise RuntimeError(f"batch insert failed: {status} {result}")
+    return rows / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    user_id, blog_post_id = setup(args.base_url)
+    single = bench_single(args.base_url, args.rows, user_id, blog_post_id)
+    batch = bench_batch(args.base_url, args.rows, args.batch_size, user_id, blog_post_id)
+
+    print(f"single-row: {single:10.1f} rows/s")
+    print(f"batch({args.batch_size}): {batch:10.1f} rows/s  ({batch / single:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
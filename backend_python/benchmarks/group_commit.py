@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Throughput versus latency of comment creation with and without group commit.
+
+Starts a server per configuration (group commit off, then on with each ``--windows`` value in
+milliseconds) and drives ``POST /api/comments/`` at each ``--concurrency`` level, printing req/s
+and p50/p95/p99 latency. Run it against a seeded database (``python -m benchmarks.seed``); every
+request inserts a comment.
+
+Usage: python -m benchmarks.group_commit --concurrency 1,16,64 --windows 2,10 --duration 10
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+
+from .load import Targets, print_table, run_rest
+from .startup import wait_until_ready
+
+
+def configurations(windows: list[str]) -> dict:
+    result = {"off": {"COMMENT_GROUP_COMMIT": "false"}}
+    for window in windows:
+        result[f"{window}ms"] = {"COMMENT_GROUP_COMMIT": "true", "GROUP_COMMIT_WINDOW_MS": window}
+    return result
+
+
+def run_configuration(env: dict, args) -> dict:
+    base_url = f"http://127.0.0.1:{args.port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        env={
+            **os.environ,
+            **env,
+            "PORT": str(args.port),
+            "HOST": "127.0.0.1",
+            "WEB_CONCURRENCY": str(args.workers),
+            "REQUEST_LOG": "none",
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(base_url + "/", process, timeout=60)
+        targets = Targets(base_url)
+        return {
+            concurrency: run_rest(
+                base_url, "comments.create", targets, concurrency, args.duration, args.warmup
+            )
+            for concurrency in args.concurrency
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--windows", default="2,10", help="group commit windows (ms) to try")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    args.concurrency = [int(value) for value in args.concurrency.split(",")]
+
+    results = {}
+    for name, env in configurations(args.windows.split(",")).items():
+        for concurrency, result in run_configuration(env, args).items():
+            results[f"{name} c={concurrency}"] = result
+            print(f"  {name} c={concurrency}: done", flush=True)
+    print_table(results, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Drive each REST route and the /ws change feed at fixed concurrency and report latency.
+
+Every scenario runs for ``--duration`` seconds (after ``--warmup``) with ``--concurrency``
+workers, each on its own keep-alive connection, and reports throughput and p50/p95/p99
+latency. Ids are sampled from the first pages of the list endpoints, so run it against a
+seeded database (``python -m benchmarks.seed``). The ``ws.feed`` scenario connects
+``--ws-clients`` subscribers to the ``posts`` topic and measures the time from starting a
+``POST /api/blog_post/`` to each subscriber receiving its event.
+
+``--save FILE`` stores the results as a baseline; ``--baseline FILE`` compares against one and
+exits with status 1 if any scenario's p95 latency rose, or its throughput fell, by more than
+``--threshold``.
+
+Usage: python -m benchmarks.load --base-url http://localhost:8000 --duration 10 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import websockets
+
+from .client import request_json
+
+SEARCH_TERMS = ("postgres", "query index", "cache", "latency pool", "docker deploy")
+
+
+class Targets:
+    """Ids the scenarios pick from, sampled from the running server."""
+
+    def __init__(self, base_url: str):
+        def ids(path: str) -> list[int]:
+            status, body = request_json(base_url, "GET", path)
+            if status != 200 or not body["items"]:
+                raise SystemExit(f"GET {path} returned {status}; seed the database first")
+            return [item["id"] for item in body["items"]]
+
+        self.user_ids = ids("/api/users/?limit=100")
+        self.post_ids = ids("/api/blog_post/?limit=100")
+        self.hot_post_ids = ids("/api/blog_post/?sort=discussed&limit=10")
+
+
+def _comment(rng: random.Random, targets: Targets):
+    body = {
+        "content": f"load test {uuid.uuid4().hex[:8]}",
+        "user_id": rng.choice(targets.user_ids),
+        "blog_post_id": rng.choice(targets.hot_post_ids),
+    }
+    return "POST", "/api/comments/", body
+
+
+# name -> function(rng, targets) returning (method, path, json body or None)
+SCENARIOS = {
+    "users.list": lambda rng, t: ("GET", "/api/users/?limit=50", None),
+    "users.get": lambda rng, t: ("GET", f"/api/users/{rng.choice(t.user_ids)}", None),
+    "posts.list": lambda rng, t: ("GET", "/api/blog_post/?limit=20", None),
+    "posts.discussed": lambda rng, t: ("GET", "/api/blog_post/?sort=discussed&limit=20", None),
+    "posts.get": lambda rng, t: ("GET", f"/api/blog_post/{rng.choice(t.post_ids)}", None),
+    "posts.comments": lambda rng, t: (
+        "GET",
+        f"/api/blog_posts/{rng.choice(t.hot_post_ids)}/comments?limit=50",
+        None,
+    ),
+    # Every worker on the same post at once (exercises request coalescing)
+    "posts.viral": lambda rng, t: (
+        "GET",
+        f"/api/blog_posts/{t.hot_post_ids[0]}/comments?limit=50",
+        None,
+    ),
+    "comments.list": lambda rng, t: ("GET", "/api/comments/?limit=50", None),
+    "search": lambda rng, t: (
+        "GET",
+        "/api/search?q=" + rng.choice(SEARCH_TERMS).replace(" ", "+"),
+        None,
+    ),
+    "comments.create": _comment,
+}
+WS_SCENARIO = "ws.feed"
+
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict:
+    if len(latencies) < 2:
+        return {"requests": len(latencies), "errors": errors, "rps": 0.0}
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+    }
+
+
+def _worker(base_url: str, scenario, targets, seed: int, warmup_until, until, result: dict):
+    latencies = result["latencies"] = []
+    result["errors"] = 0
+    url = urlsplit(base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    rng = random.Random(seed)
+    while True:
+        started = time.perf_counter()
+        if started >= until:
+            break
+        method, path, body = scenario(rng, targets)
+        try:
+            connection.request(
+                method,
+                path,
+                body=json.dumps(body) if body is not None else None,
+                headers={"Content-Type": "application/json"},
+            )
+            response = connection.getresponse()
+            response.read()
+            failed = response.status >= 400
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            failed = True
+        if started >= warmup_until:
+            latencies.append(time.perf_counter() - started)
+            result["errors"] += failed
+    connection.close()
+
+
+def run_rest(base_url: str, name: str, targets: Targets, concurrency, duration, warmup) -> dict:
+    warmup_until = time.perf_counter() + warmup
+    until = warmup_until + duration
+    worker_results = [{} for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(base_url, SCENARIOS[name], targets, i, warmup_until, until, worker_results[i]),
+        )
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = [latency for result in worker_results for latency in result["latencies"]]
+    errors = sum(result["errors"] for result in worker_results)
+    return summarize(latencies, errors, duration)
+
+
+async def _subscriber(url: str, ready: asyncio.Event, received: list, counter: list, clients: int):
+    async with websockets.connect(url, max_queue=None) as websocket:
+        await websocket.send(json.dumps({"action": "subscribe", "topics": ["posts"]}))
+        await websocket.recv()
+        counter[0] += 1
+        if counter[0] == clients:
+            ready.set()
+        async for message in websocket:
+            event = json.loads(message)
+            if event.get("type") == "post.created":
+                received.append((event["id"], time.perf_counter()))
+
+
+def _write_posts(base_url: str, targets: Targets, until: float, started_at: dict):
+    rng = random.Random(0)
+    while time.perf_counter() < until:
+        started = time.perf_counter()
+        body = {"title": "load test", "content": "feed", "user_id": rng.choice(targets.user_ids)}
+        status, post = request_json(base_url, "POST", "/api/blog_post/", body)
+        if status == 201:
+            started_at[post["id"]] = started
+
+
+async def run_ws(base_url: str, targets: Targets, clients: int, duration: float) -> dict:
+    url = urlsplit(base_url)
+    ws_url = f"ws://{url.netloc}/ws"
+    ready = asyncio.Event()
+    received: list[tuple[int, float]] = []
+    counter = [0]
+    subscribers = [
+        asyncio.create_task(_subscriber(ws_url, ready, received, counter, clients))
+        for _ in range(clients)
+    ]
+    await asyncio.wait_for(ready.wait(), 60)
+
+    started_at: dict[int, float] = {}
+    loop = asyncio.get_running_loop()
+    until = time.perf_counter() + duration
+    await loop.run_in_executor(None, _write_posts, base_url, targets, until, started_at)
+    await asyncio.sleep(1)  # let the last events arrive
+    for task in subscribers:
+        task.cancel()
+    await asyncio.gather(*subscribers, return_exceptions=True)
+
+    latencies = [at - started_at[id] for id, at in received if id in started_at]
+    missed = len(started_at) * clients - len(latencies)
+    return summarize(latencies, missed, duration)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "p95_ms" not in base or "p95_ms" not in result:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {base['p95_ms']} -> {result['p95_ms']} ms")
+        if result["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {base['rps']} -> {result['rps']} req/s")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None):
+    print(f"{'scenario':<18}{'reqs':>8}{'errors':>8}{'req/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, result in results.items():
+        line = f"{name:<18}{result['requests']:>8}{result['errors']:>8}{result['rps']:>10}"
+        if "p50_ms" in result:
+            line += f"{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+        base = (baseline or {}).get(name)
+        if base and "p95_ms" in base and "p95_ms" in result:
+            change = (result["p95_ms"] / base["p95_ms"] - 1) * 100 if base["p95_ms"] else 0
+            line += f"   p95 {change:+.0f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ws-clients", type=int, default=200)
+    parser.add_argument(
+        "--scenarios",
+        default=",".join([*SCENARIOS, WS_SCENARIO]),
+        help="comma-separated subset of: " + ", ".join([*SCENARIOS, WS_SCENARIO]),
+    )
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed regression (0.2 = 20%%)"
+    )
+    args = parser.parse_args()
+
+    names = args.scenarios.split(",")
+    unknown = [name for name in names if name not in SCENARIOS and name != WS_SCENARIO]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    targets = Targets(args.base_url)
+    results = {}
+    for name in names:
+        if name == WS_SCENARIO:
+            results[name] = asyncio.run(
+                run_ws(args.base_url, targets, args.ws_clients, args.duration)
+            )
+        else:
+            results[name] = run_rest(
+                args.base_url, name, targets, args.concurrency, args.duration, args.warmup
+            )
+        print(f"  {name}: done", file=sys.stderr)
+
+    print_table(results, baseline)
+
+    if args.save:
+        settings = {
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "ws_clients": args.ws_clients,
+        }
+        with open(args.save, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Generate a large, reproducible dataset for load testing.
+
+Rows are streamed into Postgres with COPY. Comments are spread over posts with a Zipf-like
+skew (``--skew``), so a few posts are hot and most have a handful of comments; the same
+``--seed`` always produces the same data. Posts get their ``comment_count`` /
+``last_comment_at`` computed while generating, so no repair pass is needed.
+
+New rows are appended after the existing ids (``--truncate`` empties the tables first).
+
+Usage: python -m benchmarks.seed --users 10000 --posts 50000 --comments 1000000
+"""
+
+import argparse
+import bisect
+import io
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal, engine
+from app.etag import VERSIONED_TABLES, bump_versions
+
+COPY_CHUNK_ROWS = 50_000
+
+WORDS = (
+    "postgres python query index latency cache pool worker socket stream batch cursor page "
+    "server client request response schema table column migration vacuum replica commit "
+    "transaction lock snapshot plan join scan sort hash bitmap tuple buffer disk memory thread "
+    "event loop async await deploy docker metric trace profile benchmark throughput queue"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def copy_rows(cursor, table: str, columns: tuple[str, ...], rows) -> int:
+    """COPY ``rows`` (tuples of str) into ``table`` in chunks; returns the row count."""
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, COPY_CHUNK_ROWS))
+        if not chunk:
+            return count
+        buffer = io.StringIO()
+        # Generated values never contain tabs, newlines or backslashes
+        buffer.writelines("\t".join(row) + "\n" for row in chunk)
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        count += len(chunk)
+
+
+def next_id(cursor, table: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def reset_sequence(cursor, table: str):
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+    )
+
+
+def drop_secondary_indexes(cursor) -> list[tuple[str, str]]:
+    """Drop the indexes that back no constraint; returns their definitions for rebuilding."""
+    cursor.execute(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE schemaname = current_schema()
+          AND tablename IN ('users', 'blog_posts', 'comments')
+          AND indexname NOT IN (SELECT conname FROM pg_constraint)
+        """
+    )
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+    return indexes
+
+
+def seed(users: int, posts: int, comments: int, skew: float, days: int, seed: int, truncate: bool):
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    span = timedelta(days=days).total_seconds()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        indexes = []
+        if truncate:
+            cursor.execute("TRUNCATE comments, blog_posts, users RESTART IDENTITY")
+            # Building an index once over the loaded table beats updating it row by row
+            indexes = drop_secondary_indexes(cursor)
+        first_user = next_id(cursor, "users")
+        first_post = next_id(cursor, "blog_posts")
+        first_comment = next_id(cursor, "comments")
+        user_ids = range(first_user, first_user + users)
+
+        started = time.perf_counter()
+        user_rows = (
+            (
+                str(user_id),
+                f"User {user_id}",
+                f"user{user_id}@seed.example.com",
+                (now - timedelta(seconds=rng.random() * span)).isoformat(),
+            )
+            for user_id in user_ids
+        )
+        copy_rows(cursor, "users", ("id", "name", "email", "created_at"), user_rows)
+        print(f"users:    {users:>10,} rows in {time.perf_counter() - started:6.1f}s")
+
+        # Zipf weights over a random ranking of the posts: post_rank[i] is hot if i is small
+        started = time.perf_counter()
+        post_created = [now - timedelta(seconds=rng.random() * span) for _ in range(posts)]
+        cumulative = list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(posts)))
+        ranking = list(range(posts))
+        rng.shuffle(ranking)
+        comment_posts = [
+            ranking[bisect.bisect(cumulative, rng.random() * cumulative[-1])]
+            for _ in range(comments)
+        ]
+        comment_created = []
+        counts = [0] * posts
+        last = [None] * posts
+        for post in comment_posts:
+            created = post_created[post] + (now - post_created[post]) * rng.random()
+            created = created.replace(microsecond=0)
+            comment_created.append(created)
+            counts[post] += 1
+            if last[post] is None or created > last[post]:
+                last[post] = created
+
+        post_rows = (
+            (
+                str(first_post + i),
+                sentence(rng, rng.randint(3, 8)),
+                ". ".join(sentence(rng, rng.randint(8, 16)) for _ in range(rng.randint(2, 6))),
+                str(rng.choice(user_ids)),
+                post_created[i].isoformat(),
+                post_created[i].isoformat(),
+                str(counts[i]),
+                last[i].isoformat() if last[i] else "\\N",
+            )
+            for i in range(posts)
+        )
+        copy_rows(
+            cursor,
+            "blog_posts",
+            (
+                "id",
+                "title",
+                "content",
+                "user_id",
+                "created_at",
+                "updated_at",
+                "comment_count",
+                "last_comment_at",
+            ),
+            post_rows,
+        )
+        print(f"posts:    {posts:>10,} rows in {time.perf_counter() - started:6.1f}s")
+
+        started = time.perf_counter()
+        comment_rows = (
+            (
+                str(first_comment + i),
+                sentence(rng, rng.randint(4, 20)),
+                str(rng.choice(user_ids)),
+                str(first_post + post),
+                created.isoformat(),
+                created.isoformat(),
+            )
+            for i, (post, created) in enumerate(zip(comment_posts, comment_created, strict=True))
+        )
+        copy_rows(
+            cursor,
+            "comments",
+            ("id", "content", "user_id", "blog_post_id", "created_at", "updated_at"),
+            comment_rows,
+        )
+        print(f"comments: {comments:>10,} rows in {time.perf_counter() - started:6.1f}s")
+
+        started = time.perf_counter()
+        for _, definition in indexes:
+            cursor.execute(definition)
+        if indexes:
+            print(f"indexes:  {len(indexes):>10,} built in {time.perf_counter() - started:5.1f}s")
+
+        for table in ("users", "blog_posts", "comments"):
+            reset_sequence(cursor, table)
+        # Planner statistics for the new distribution
+        cursor.execute("ANALYZE users, blog_posts, comments")
+        connection.commit()
+    finally:
+        connection.close()
+
+    # Cached responses and ETags of running servers must not outlive the new data
+    with SessionLocal() as db:
+        bump_versions(db, *VERSIONED_TABLES)
+        db.commit()
+
+    hottest = sorted(range(posts), key=counts.__getitem__, reverse=True)[:5]
+    print("hottest posts:", ", ".join(f"{first_post + i} ({counts[i]:,})" for i in hottest))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a load-testing dataset")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=50_000)
+    parser.add_argument("--comments", type=int, default=1_000_000)
+    parser.add_argument(
+        "--skew", type=float, default=1.1, help="Zipf exponent of comments per post (0 = uniform)"
+    )
+    parser.add_argument("--days", type=int, default=365, help="spread of created_at")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--truncate", action="store_true", help="delete ALL users, posts and comments first"
+    )
+    args = parser.parse_args()
+    if args.users < 1 or args.posts < 1:
+        parser.error("--users and --posts must be at least 1")
+
+    seed(args.users, args.posts, args.comments, args.skew, args.days, args.seed, args.truncate)
+
+
+if __name__ == "__main__":
+    main()
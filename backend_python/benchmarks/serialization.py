@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Compare the list endpoints' JSON fast path with the ORM + response model path it replaced.
+
+Runs in-process against the configured database (seed it first). For each page size the old
+path loads ORM entities, copies them into dicts, validates them against the route's
+``response_model`` and renders a ``JSONResponse``; the new path is the handler's own projection
++ orjson code. Both bodies are checked to be byte-identical before timing.
+
+Usage: python -m benchmarks.serialization --sizes 20,100,500 --repeat 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import BlogPost as BlogPostModel
+from app.models import Comment as CommentModel
+from app.models import User as UserModel
+from app.pagination import keyset_page
+from app.routers.blog_posts import _list_blog_posts
+from app.routers.comments import _list_comments
+from app.serialization import dump_json
+
+
+def _route_field(path: str):
+    for route in app.routes:
+        if getattr(route, "path", None) == path and "GET" in route.methods:
+            return route.response_field
+    raise SystemExit(f"no GET route for {path}")
+
+
+def orm_blog_posts(db, limit: int) -> dict:
+    query = db.query(BlogPostModel).join(UserModel).add_columns(UserModel.name.label("author_name"))
+    blog_posts, next_cursor = keyset_page(
+        query, BlogPostModel.created_at, BlogPostModel.id, None, limit
+    )
+    items = [
+        {
+            "id": blog_post.id,
+            "title": blog_post.title,
+            "content": blog_post.content,
+            "user_id": blog_post.user_id,
+            "created_at": blog_post.created_at,
+            "updated_at": blog_post.updated_at,
+            "author_name": author_name,
+            "comment_count": blog_post.comment_count,
+            "last_comment_at": blog_post.last_comment_at,
+        }
+        for blog_post, author_name in blog_posts
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def orm_comments(db, limit: int) -> dict:
+    query = (
+        db.query(CommentModel)
+        .join(UserModel, CommentModel.user_id == UserModel.id)
+        .join(BlogPostModel, CommentModel.blog_post_id == BlogPostModel.id)
+        .add_columns(
+            UserModel.name.label("author_name"), BlogPostModel.title.label("blog_post_title")
+        )
+    )
+    comments, next_cursor = keyset_page(
+        query, CommentModel.created_at, CommentModel.id, None, limit
+    )
+    items = [
+        {
+            "id": comment.id,
+            "content": comment.content,
+            "user_id": comment.user_id,
+            "blog_post_id": comment.blog_post_id,
+            "created_at": comment.created_at,
+            "author_name": author_name,
+            "blog_post_title": blog_post_title,
+        }
+        for comment, author_name, blog_post_title in comments
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def render_old(field, content) -> bytes:
+    content = await serialize_response(field=field, response_content=content, exclude_unset=True)
+    return JSONResponse(content).body
+
+
+async def render_loaded(field, load_orm, db, size: int) -> bytes:
+    return await render_old(field, load_orm(db, size))
+
+
+async def _coroutine(fn, *args):
+    return fn(*args)
+
+
+async def timed(repeat: int, fn, *args) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await fn(*args)
+    return (time.perf_counter() - started) / repeat
+
+
+async def bench(sizes: list[int], repeat: int):
+    cases = (
+        ("blog_posts", "/api/blog_post/", orm_blog_posts, _list_blog_posts),
+        ("comments", "/api/comments/", orm_comments, _list_comments),
+    )
+    print(
+        f"{'endpoint':<12}{'items':>7}{'old ms':>10}{'new ms':>10}{'encode old':>12}"
+        f"{'encode new':>12}{'speedup':>9}"
+    )
+    with SessionLocal() as db:
+        for name, path, load_orm, list_new in cases:
+            field = _route_field(path)
+            for size in sizes:
+                old_body = await render_old(field, load_orm(db, size))
+                new_body = list_new(db, None, size)
+                if old_body != new_body:
+                    raise SystemExit(f"{name} ({size}): bodies differ")
+
+                old_total = await timed(repeat, render_loaded, field, load_orm, db, size)
+                new_total = await timed(repeat, _coroutine, list_new, db, None, size)
+                # Encoding alone, from the same already loaded dicts
+                content = load_orm(db, size)
+                old_encode = await timed(repeat, render_old, field, content)
+                new_encode = await timed(repeat, _coroutine, dump_json, content)
+                print(
+                    f"{name:<12}{size:>7}{old_total * 1000:>10.2f}{new_total * 1000:>10.2f}"
+                    f"{old_encode * 1000:>12.2f}{new_encode * 1000:>12.2f}"
+                    f"{old_total / new_total:>8.1f}x"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument("--sizes", default="20,100,500", help="comma-separated page sizes")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(bench([int(size) for size in args.sizes.split(",")], args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Measure server startup (time to first successful response) and SIGTERM drain time.
+
+Each configuration is launched as a fresh process several times, e.g. to compare schema creation
+on boot or preloading:
+
+Usage: python -m benchmarks.startup --runs 5 --workers 4
+"""
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+CONFIGURATIONS = {
+    "server": {"PRELOAD": "true", "CREATE_TABLES": "false"},
+    "server+create_tables": {"PRELOAD": "true", "CREATE_TABLES": "true"},
+    "server-no-preload": {"PRELOAD": "false", "CREATE_TABLES": "false"},
+}
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.02)
+    raise RuntimeError("server did not become ready")
+
+
+def measure(env: dict, port: int, timeout: float) -> tuple[float, float]:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        env={**os.environ, **env, "PORT": str(port), "HOST": "127.0.0.1"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        ready = wait_until_ready(f"http://127.0.0.1:{port}/", process, timeout)
+        stopping = time.perf_counter()
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=timeout)
+        return ready, time.perf_counter() - stopping
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--only", choices=list(CONFIGURATIONS))
+    args = parser.parse_args()
+
+    for name, env in CONFIGURATIONS.items():
+        if args.only and name != args.only:
+            continue
+        env = {**env, "WEB_CONCURRENCY": str(args.workers)}
+        results = [measure(env, args.port, args.timeout) for _ in range(args.runs)]
+        ready = [r for r, _ in results]
+        drain = [d for _, d in results]
+        print(
+            f"{name:>22}: ready median={statistics.median(ready) * 1000:.0f}ms "
+            f"max={max(ready) * 1000:.0f}ms  shutdown median={statistics.median(drain) * 1000:.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Measure WebSocket broadcast delivery latency with thousands of simulated clients.
+
+Runs in-process against ConnectionManager with fake sockets (no network), comparing the old
+sequential fan-out with the queued one. A fraction of clients can be made slow to show that they
+no longer hold everybody else back.
+
+Usage: python -m benchmarks.ws_broadcast --clients 5000 --messages 20 --slow 0.01
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float, latencies: list, sent_at: dict):
+        self.delay = delay
+        self.latencies = latencies
+        self.sent_at = sent_at
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        # Every send yields to the loop, like a real socket write
+        await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - self.sent_at[message])
+
+
+def make_clients(count: int, slow: float, slow_delay: float, latencies: list, sent_at: dict):
+    slow_every = int(1 / slow) if slow else 0
+    return [
+        FakeWebSocket(slow_delay if slow_every and i % slow_every == 0 else 0, latencies, sent_at)
+        for i in range(count)
+    ]
+
+
+async def sequential_broadcast(clients, message: str):
+    # The previous ConnectionManager.broadcast: one awaited send per client
+    for client in clients:
+        await client.send_text(message)
+
+
+async def run(mode: str, args) -> dict:
+    latencies = []
+    sent_at = {}
+    clients = make_clients(args.clients, args.slow, args.slow_delay, latencies, sent_at)
+    manager = ConnectionManager(queue_size=args.queue_size, policy=args.policy)
+    if mode == "queued":
+        for client in clients:
+            manager.register(client)
+
+    started = time.perf_counter()
+    for i in range(args.messages):
+        message = f'{{"seq": {i}}}'
+        sent_at[message] = time.perf_counter()
+        if mode == "queued":
+            await manager.broadcast(message)
+        else:
+            await sequential_broadcast(clients, message)
+        await asyncio.sleep(args.interval)
+
+    # Wait for the fast clients to drain (slow ones may still be behind)
+    expected = args.messages * args.clients - manager.dropped
+    deadline = time.perf_counter() + args.drain_timeout
+    while len(latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+
+    for connection in manager.connections.values():
+        connection.writer.cancel()
+    return {"latencies": sorted(latencies), "elapsed": elapsed, "stats": manager.stats()}
+
+
+def percentile(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def report(mode: str, result: dict):
+    latencies = result["latencies"]
+    print(
+        f"{mode:>10}: {len(latencies)} deliveries in {result['elapsed']:.2f}s  "
+        f"p50={percentile(latencies, 0.50) * 1000:.1f}ms  "
+        f"p99={percentile(latencies, 0.99) * 1000:.1f}ms  "
+        f"max={latencies[-1] * 1000 if latencies else 0:.1f}ms  "
+        f"mean={statistics.fmean(latencies) * 1000 if latencies else 0:.1f}ms"
+    )
+    if mode == "queued":
+        stats = result["stats"]
+        print(f"{'':>10}  dropped={stats['dropped']} evicted={stats['evicted']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between broadcasts")
+    parser.add_argument("--slow", type=float, default=0.01, help="fraction of slow clients")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="send time of slow clients")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--policy", default="drop", choices=["drop", "evict"])
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    modes = ["queued"] if args.skip_sequential else ["sequential", "queued"]
+    for mode in modes:
+        report(mode, asyncio.run(run(mode, args)))
+
+
+if __name__ == "__main__":
+    main()
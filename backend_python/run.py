@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
+# Development server (auto-reload, single process); use `python -m app.server` in production
 import os
+
 import uvicorn
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
+    os.environ.setdefault("CREATE_TABLES", "true")
+    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
@@ -0,0 +1,64 @@
+import os
+
+os.environ.setdefault("DB_NAME", "blogdb_test")
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+import psycopg2
+import pytest
+from fastapi.testclient import TestClient
+from psycopg2 import sql
+from sqlalchemy import event
+
+from app import database
+from app.main import app
+from app.models import Base
+
+
+def _ensure_database():
+    try:
+        conn = psycopg2.connect(
+            dbname="postgres",
+            user=database.DB_USER,
+            password=database.DB_PASSWORD,
+            host=database.DB_HOST,
+            port=database.DB_PORT,
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL not available: {e}", allow_module_level=True)
+
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (database.DB_NAME,))
+        if cur.fetchone() is None:
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(database.DB_NAME)))
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def client():
+    _ensure_database()
+    Base.metadata.drop_all(bind=database.engine)
+    Base.metadata.create_all(bind=database.engine)
+    with TestClient(app) as client:
+        yield client
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def queries():
+    engine = database.async_engine.sync_engine if database.async_engine else database.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
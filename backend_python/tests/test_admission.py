@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app import admission as admission_module
+from app.admission import Admission, Rejected, classify, match_route
+from app.main import app
+
+
+async def _queued(controller: Admission, kind: str, order: list):
+    await controller.acquire(kind)
+    order.append(kind)
+
+
+async def _priority_order():
+    controller = Admission(limit=1, queue_size=10, max_wait=1)
+    await controller.acquire("read")
+    order = []
+    tasks = []
+    for kind in ("bulk", "write", "read"):
+        tasks.append(asyncio.create_task(_queued(controller, kind, order)))
+        await asyncio.sleep(0)
+    for _ in range(3):
+        controller.release("read" if not order else order[-1])
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_freed_slots_go_to_reads_then_writes_then_bulk():
+    assert asyncio.run(_priority_order()) == ["read", "write", "bulk"]
+
+
+async def _full_queue():
+    controller = Admission(limit=1, queue_size=1, max_wait=1)
+    await controller.acquire("write")
+    bulk = asyncio.create_task(controller.acquire("bulk"))
+    await asyncio.sleep(0)
+    read = asyncio.create_task(controller.acquire("read"))
+    await asyncio.sleep(0)
+    with pytest.raises(Rejected) as displaced:
+        await bulk
+    with pytest.raises(Rejected) as turned_away:
+        await controller.acquire("write")
+    controller.release("write")
+    await read
+    return displaced.value.reason, turned_away.value.reason, controller.stats()
+
+
+def test_full_queue_sheds_lowest_priority_first():
+    displaced, turned_away, stats = asyncio.run(_full_queue())
+    assert (displaced, turned_away) == ("displaced", "queue_full")
+    assert stats["in_flight"] == 1 and stats["active"]["read"] == 1 and stats["queued"] == 0
+
+
+async def _class_limits():
+    controller = Admission(limit=3, bulk_limit=1, queue_size=10, max_wait=0.05)
+    await controller.acquire("bulk")
+    with pytest.raises(Rejected) as timed_out:
+        await controller.acquire("bulk")
+    await controller.acquire("read")  # other classes still get the free slots
+    return timed_out.value.reason, controller.stats()
+
+
+def test_class_limit_and_deadline():
+    reason, stats = asyncio.run(_class_limits())
+    assert reason == "timeout"
+    assert stats["active"] == {"read": 1, "write": 0, "bulk": 1} and stats["queued"] == 0
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "query", "kind"),
+    [
+        ("GET", "/api/blog_post/1", b"", "read"),
+        ("GET", "/api/blog_post/", b"limit=20", "read"),
+        ("GET", "/api/blog_post/", b"", "bulk"),
+        ("GET", "/api/comments/", b"limit=500", "bulk"),
+        ("GET", "/api/comments/", b"limit=20&include=author", "bulk"),
+        ("GET", "/api/search", b"q=x", "bulk"),
+        ("POST", "/api/comments/", b"", "write"),
+    ],
+)
+def test_classify(method, path, query, kind):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": [],
+        "app": app,
+    }
+    assert classify(scope, match_route(scope)) == kind
+
+
+def test_overload_returns_503_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(admission_module.admission, "limit", 0)
+    monkeypatch.setattr(admission_module.admission, "max_wait", 0.01)
+    response = client.get("/api/users/?limit=1")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/").status_code == 200  # only /api/ routes are admitted
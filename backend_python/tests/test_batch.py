@@ -0,0 +1,71 @@
+import uuid
+
+import pytest
+
+from app import batch
+
+
+@pytest.fixture
+def author(client):
+    tag = uuid.uuid4().hex[:8]
+    return client.post(
+        "/api/users/", json={"name": "Batcher", "email": f"{tag}@batch.example.com"}
+    ).json()
+
+
+def test_user_batch_reports_duplicate_emails(client, author):
+    tag = uuid.uuid4().hex[:8]
+    result = client.post(
+        "/api/users/batch",
+        json=[
+            {"name": "New", "email": f"{tag}@batch.example.com"},
+            {"name": "Taken", "email": author["email"]},
+            {"name": "Again", "email": f"{tag}@batch.example.com"},
+        ],
+    ).json()
+
+    assert [user["name"] for user in result["created"]] == ["New"]
+    assert result["errors"] == [
+        {"index": 1, "detail": "Email already registered"},
+        {"index": 2, "detail": "Email already registered"},
+    ]
+
+
+def test_post_and_comment_batches_keep_valid_rows(client, author):
+    posts = client.post(
+        "/api/blog_post/batch",
+        json=[
+            {"title": "Kept", "content": "C", "user_id": author["id"]},
+            {"title": "Orphan", "content": "C", "user_id": 0},
+        ],
+    ).json()
+    assert [post["title"] for post in posts["created"]] == ["Kept"]
+    assert posts["errors"] == [{"index": 1, "detail": "User not found"}]
+    post = posts["created"][0]
+
+    comments = client.post(
+        "/api/comments/batch",
+        json=[
+            {"content": "kept", "user_id": author["id"], "blog_post_id": post["id"]},
+            {"content": "no post", "user_id": author["id"], "blog_post_id": 0},
+            {"content": "no user", "user_id": 0, "blog_post_id": post["id"]},
+        ],
+    ).json()
+    assert [comment["content"] for comment in comments["created"]] == ["kept"]
+    assert comments["created"][0]["blog_post_title"] == "Kept"
+    assert comments["errors"] == [
+        {"index": 1, "detail": "Blog post not found"},
+        {"index": 2, "detail": "User not found"},
+    ]
+    assert client.get(f"/api/blog_post/{post['id']}").json()["comment_count"] == 1
+
+
+def test_batch_size_limits(client, monkeypatch):
+    monkeypatch.setattr(batch, "MAX_BATCH_SIZE", 2)
+    assert client.post("/api/comments/batch", json=[]).status_code == 400
+    users = [{"name": "U", "email": f"{uuid.uuid4().hex[:8]}@batch.example.com"} for _ in range(3)]
+    response = client.post("/api/users/batch", json=users)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Batch too large (max 2 items)"
+    # Malformed items fail validation before anything is written
+    assert client.post("/api/users/batch", json=[{"name": "No email"}]).status_code == 422
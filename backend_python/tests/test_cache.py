@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+import uuid
+from datetime import datetime
+from fnmatch import fnmatch
+
+import orjson
+import pytest
+from sqlalchemy.util import greenlet_spawn
+
+from app import cache, etag
+from app.cache import (
+    LRUCache,
+    RedisCache,
+    blog_post_key,
+    decode_value,
+    encode_value,
+    invalidate_blog_post,
+)
+from app.events import CACHE_TOPIC, PostgresBus
+from app.routers import users
+
+
+@pytest.fixture
+def lru(monkeypatch):
+    lru = LRUCache()
+    monkeypatch.setattr(cache, "response_cache", lru)
+    monkeypatch.setattr(etag, "response_cache", lru)
+    return lru
+
+
+def _post(client):
+    tag = uuid.uuid4().hex[:8]
+    user = client.post(
+        "/api/users/", json={"name": "Cached", "email": f"{tag}@cache.example.com"}
+    ).json()
+    post = client.post(
+        "/api/blog_post/", json={"title": "Cached", "content": "C", "user_id": user["id"]}
+    ).json()
+    return user, post
+
+
+def test_hits_skip_the_database(client, lru, queries):
+    _, post = _post(client)
+    url = f"/api/blog_post/{post['id']}"
+    first = client.get(url)
+    before = queries.count
+    second = client.get(url)
+
+    assert queries.count == before
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_writes_invalidate_cached_responses(client, lru):
+    user, post = _post(client)
+    detail = f"/api/blog_post/{post['id']}"
+    comments = f"/api/blog_posts/{post['id']}/comments"
+    lists = "/api/blog_post/?limit=5"
+    for url in (detail, comments, lists):
+        client.get(url)
+
+    client.put(detail, json={"title": "Renamed", "content": "C"})
+    assert client.get(detail).json()["title"] == "Renamed"
+    assert client.get(lists).json()["items"][0]["title"] == "Renamed"
+
+    client.post(
+        "/api/comments/",
+        json={"content": "fresh", "user_id": user["id"], "blog_post_id": post["id"]},
+    )
+    assert [comment["content"] for comment in client.get(comments).json()] == ["fresh"]
+    assert client.get(detail).json()["comment_count"] == 1
+
+
+def test_prolific_users_invalidate_all_posts_at_once(client, lru, monkeypatch):
+    monkeypatch.setattr(users, "CACHE_MAX_TARGETED_INVALIDATIONS", 1)
+    user, post = _post(client)
+    client.post("/api/blog_post/", json={"title": "Second", "content": "C", "user_id": user["id"]})
+    _, other = _post(client)
+    for cached in (post, other):
+        client.get(f"/api/blog_post/{cached['id']}")
+    assert lru.size() == 2
+
+    client.put(f"/api/users/{user['id']}", json={"name": "Prolific", "email": user["email"]})
+    # Past the bound the post ids are not collected: every cached post response goes
+    assert lru.size() == 0
+    assert client.get(f"/api/blog_post/{post['id']}").json()["author_name"] == "Prolific"
+
+
+def test_incomplete_backends_cannot_be_created():
+    class GetOnly(cache.CacheBackend):
+        def get(self, key):
+            return cache._MISSING
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_lru_evicts_oldest_and_expires_entries():
+    lru = LRUCache(max_entries=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") is cache._MISSING
+    assert (lru.get("a"), lru.get("c"), lru.evictions) == (1, 3, 1)
+
+    expiring = LRUCache(ttl=0.01)
+    expiring.set("a", 1)
+    time.sleep(0.02)
+    assert expiring.get("a") is cache._MISSING
+
+
+@pytest.mark.parametrize(
+    ("workers", "bus", "expected"),
+    [(1, "memory", "memory"), (4, "postgres", "memory"), (4, "memory", "none")],
+)
+def test_default_backend_depends_on_workers(monkeypatch, workers, bus, expected):
+    monkeypatch.setattr(cache, "WEB_CONCURRENCY", workers)
+    monkeypatch.setattr(cache, "EVENT_BUS", bus)
+    assert cache.default_cache_backend() == expected
+
+
+def test_invalidations_from_other_workers_are_applied(lru):
+    lru.set(blog_post_key(1), "stale")
+    lru.set("blog_posts:list:recent:None:20:None", "stale")
+
+    # A worker's own notifications come back to it and are skipped
+    own = {"origin": cache._origin(), "keys": [blog_post_key(1)], "prefixes": []}
+    cache._on_invalidation(own)
+    assert lru.get(blog_post_key(1)) == "stale"
+
+    cache._on_invalidation(
+        {"origin": "elsewhere:1", "keys": [blog_post_key(1)], "prefixes": ["blog_posts:list:"]}
+    )
+    assert lru.size() == 0
+
+
+def test_invalidations_are_broadcast_over_postgres(client, lru, monkeypatch):
+    async def round_trip():
+        received = asyncio.Queue()
+        bus = PostgresBus(channel="blog_events_test")
+        bus.handle(CACHE_TOPIC, received.put_nowait)
+        await bus.start(lambda topics, event: delivered.append(event))
+        monkeypatch.setattr(cache, "event_bus", bus)
+        monkeypatch.setattr(cache, "BROADCAST_INVALIDATIONS", True)
+        try:
+            lru.set(blog_post_key(7), "stale")
+            invalidate_blog_post(7)
+            # Applied locally right away, not only when the notification comes back
+            assert lru.size() == 0
+            return await asyncio.wait_for(received.get(), 5)
+        finally:
+            await bus.stop()
+
+    delivered = []
+    event = asyncio.run(round_trip())
+    # Cache events never reach the WebSocket feed
+    assert delivered == []
+    assert event["keys"] == [blog_post_key(7)]
+    assert event["origin"] == cache._origin()
+
+
+class FakeRedis:
+    """Enough of redis.Redis for RedisCache, recording the threads it is called from."""
+
+    def __init__(self):
+        self.values = {}
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return self.values.get(key)
+
+    def set(self, key, value, px=None):
+        self.threads.append(threading.get_ident())
+        self.values[key] = value
+
+    def delete(self, *keys):
+        self.threads.append(threading.get_ident())
+        for key in keys:
+            self.values.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.values) if fnmatch(key, match)]
+
+
+def test_redis_values_are_json():
+    value = ("etag", b'{"items":[{"title":"caf\xc3\xa9"}]}')
+    raw = encode_value(value)
+    assert orjson.loads(raw)[0] == "etag"
+    assert decode_value(raw) == ["etag", value[1]]
+    assert decode_value(encode_value({"created_at": datetime(2026, 1, 2, 3, 4)})) == {
+        "created_at": "2026-01-02T03:04:00"
+    }
+
+
+def test_redis_calls_stay_off_the_event_loop():
+    redis = FakeRedis()
+    redis_cache = RedisCache(client=redis)
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+
+        async def load():
+            return "etag", b"[]"
+
+        assert await redis_cache.get_or_load("key", load) == ("etag", b"[]")
+        assert await redis_cache.get_or_load("key", load) == ["etag", b"[]"]
+        # Query functions run in a greenlet on the loop thread in async mode
+        await greenlet_spawn(redis_cache.delete_prefix, "")
+        assert redis.values == {}
+        return loop_thread
+
+    loop_thread = asyncio.run(scenario())
+    assert len(redis.threads) == 4
+    assert loop_thread not in redis.threads
@@ -0,0 +1,102 @@
+import itertools
+
+from sqlalchemy import update
+
+from app.comment_stats import blog_posts, repair
+from app.database import SessionLocal
+
+_emails = itertools.count()
+
+
+def _user(client):
+    response = client.post(
+        "/api/users/", json={"name": "Stats", "email": f"stats{next(_emails)}@example.com"}
+    )
+    return response.json()
+
+
+def _post(client, user):
+    response = client.post(
+        "/api/blog_post/", json={"title": "Stats", "content": "Body", "user_id": user["id"]}
+    )
+    return response.json()
+
+
+def _comment(client, user, post):
+    response = client.post(
+        "/api/comments/",
+        json={"content": "Hi", "user_id": user["id"], "blog_post_id": post["id"]},
+    )
+    return response.json()
+
+
+def _stats(client, post):
+    body = client.get(f"/api/blog_post/{post['id']}").json()
+    return body["comment_count"], body["last_comment_at"]
+
+
+def test_counters_follow_comment_writes(client):
+    author, commenter = _user(client), _user(client)
+    post = _post(client, author)
+    assert _stats(client, post) == (0, None)
+
+    first = _comment(client, author, post)
+    second = _comment(client, commenter, post)
+    assert _stats(client, post) == (2, second["created_at"])
+
+    client.delete(f"/api/comments/{second['id']}")
+    assert _stats(client, post) == (1, first["created_at"])
+
+    client.post(
+        "/api/comments/batch",
+        json=[{"content": "x", "user_id": commenter["id"], "blog_post_id": post["id"]}] * 3,
+    )
+    assert _stats(client, post)[0] == 4
+
+    client.delete(f"/api/users/{commenter['id']}")
+    assert _stats(client, post) == (1, first["created_at"])
+
+
+def test_sort_by_most_discussed(client):
+    user = _user(client)
+    quiet, busy = _post(client, user), _post(client, user)
+    for _ in range(3):
+        _comment(client, user, busy)
+
+    page = client.get("/api/blog_post/?sort=discussed&limit=1").json()
+    assert page["items"][0]["id"] == busy["id"]
+    counts = [post["comment_count"] for post in client.get("/api/blog_post/?sort=discussed").json()]
+    assert counts == sorted(counts, reverse=True)
+
+    ids = []
+    cursor = None
+    while True:
+        params = {"sort": "discussed", "limit": 2, "fields": "id"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/blog_post/", params=params).json()
+        ids += [post["id"] for post in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert quiet["id"] in ids and len(ids) == len(set(ids))
+
+    assert client.get("/api/blog_post/?sort=popular").status_code == 400
+
+
+def test_repair_recomputes_drifted_counters(client):
+    user = _user(client)
+    post = _post(client, user)
+    comment = _comment(client, user, post)
+
+    with SessionLocal() as db:
+        db.execute(
+            update(blog_posts)
+            .where(blog_posts.c.id == post["id"])
+            .values(comment_count=42, last_comment_at=None)
+        )
+        db.commit()
+        assert repair(db, batch_size=2) >= 1
+        assert repair(db) == 0
+
+    assert _stats(client, post) == (1, comment["created_at"])
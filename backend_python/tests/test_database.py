@@ -0,0 +1,45 @@
+import threading
+import uuid
+
+from sqlalchemy import select, text
+
+from app import database
+from app.database import open_database
+from app.models import User as UserModel
+
+
+def test_query_functions_run_on_the_configured_driver(client):
+    def probe(session):
+        value = session.execute(text("SELECT 1")).scalar_one()
+        return session.get_bind().dialect.driver, value, threading.get_ident()
+
+    async def run_probe():
+        async with open_database() as db:
+            return await db.run(probe), threading.get_ident()
+
+    (driver, value, thread), loop_thread = client.portal.call(run_probe)
+    assert value == 1
+    if database.DB_MODE == "async":
+        # run_sync: the function runs on the event loop, its queries are awaited on asyncpg
+        assert driver == "asyncpg"
+        assert thread == loop_thread
+    else:
+        assert driver == "psycopg2"
+        assert thread != loop_thread
+
+
+def test_stream_yields_batches(client):
+    tag = uuid.uuid4().hex[:8]
+    ids = [
+        client.post(
+            "/api/users/", json={"name": "Streamed", "email": f"{tag}{i}@db.example.com"}
+        ).json()["id"]
+        for i in range(5)
+    ]
+    statement = select(UserModel.id).where(UserModel.id.in_(ids)).order_by(UserModel.id)
+
+    async def stream():
+        async with open_database() as db:
+            return [[row.id for row in rows] async for rows in db.stream(statement, batch_size=2)]
+
+    assert client.portal.call(stream) == [ids[:2], ids[2:4], ids[4:]]
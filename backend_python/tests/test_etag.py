@@ -0,0 +1,89 @@
+import uuid
+
+import pytest
+
+from app.database import SessionLocal
+from app.etag import bump_versions, get_versions
+
+
+@pytest.fixture
+def post(client):
+    tag = uuid.uuid4().hex[:8]
+    user = client.post(
+        "/api/users/", json={"name": "Tagged", "email": f"{tag}@etag.example.com"}
+    ).json()
+    return client.post(
+        "/api/blog_post/", json={"title": "Tagged", "content": "C", "user_id": user["id"]}
+    ).json()
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["/api/blog_post/{id}", "/api/blog_post/?limit=5", "/api/blog_posts/{id}/comments"],
+)
+def test_matching_etag_gets_304(client, post, url):
+    url = url.format(id=post["id"])
+    response = client.get(url)
+    etag = response.headers["etag"]
+
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    # Compressed 200s carry the weak form of the tag (see compression)
+    assert revalidated.headers["etag"] == etag.removeprefix("W/")
+    assert revalidated.content == b""
+    assert client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_writes_change_the_etag(client, post):
+    detail = f"/api/blog_post/{post['id']}"
+    comments = f"/api/blog_posts/{post['id']}/comments"
+    tags = {url: client.get(url).headers["etag"] for url in (detail, comments)}
+
+    client.put(detail, json={"title": "Retitled", "content": "C"})
+    response = client.get(detail, headers={"If-None-Match": tags[detail]})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Retitled"
+    assert response.headers["etag"] != tags[detail]
+
+    client.post(
+        "/api/comments/",
+        json={"content": "new", "user_id": post["user_id"], "blog_post_id": post["id"]},
+    )
+    assert client.get(comments, headers={"If-None-Match": tags[comments]}).status_code == 200
+
+
+def test_post_edits_change_the_comment_list_etag(client, post):
+    client.post(
+        "/api/comments/",
+        json={"content": "titled", "user_id": post["user_id"], "blog_post_id": post["id"]},
+    )
+    url = "/api/comments/?limit=1"
+    etag = client.get(url).headers["etag"]
+
+    client.put(f"/api/blog_post/{post['id']}", json={"title": "New", "content": "C"})
+    response = client.get(url, headers={"If-None-Match": etag})
+    # Comment items carry their post's title
+    assert response.status_code == 200
+    assert response.json()["items"][0]["blog_post_title"] == "New"
+
+
+def test_user_renames_bump_content_versions(client, post):
+    with SessionLocal() as db:
+        before = get_versions(db, "users", "blog_posts", "comments")
+        client.put(
+            f"/api/users/{post['user_id']}",
+            json={"name": "Renamed", "email": f"{uuid.uuid4().hex[:8]}@etag.example.com"},
+        )
+        after = get_versions(db, "users", "blog_posts", "comments")
+    # Posts and comments embed the author name
+    assert all(new > old for old, new in zip(before, after, strict=True))
+
+
+def test_bump_versions_only_touches_named_tables(client):
+    with SessionLocal() as db:
+        users, posts = get_versions(db, "users", "blog_posts")
+        bump_versions(db, "users")
+        db.commit()
+        assert get_versions(db, "users", "blog_posts") == (users + 1, posts)
@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+
+from app.fields import EXCERPT_LENGTH
+
+
+@pytest.fixture
+def post(client):
+    tag = uuid.uuid4().hex[:8]
+    user = client.post(
+        "/api/users/", json={"name": "Sparse", "email": f"{tag}@fields.example.com"}
+    ).json()
+    post = client.post(
+        "/api/blog_post/",
+        json={"title": "Sparse", "content": "x" * (EXCERPT_LENGTH + 50), "user_id": user["id"]},
+    ).json()
+    client.post(
+        "/api/comments/",
+        json={"content": "Sparse comment", "user_id": user["id"], "blog_post_id": post["id"]},
+    )
+    return post
+
+
+def test_fields_select_only_the_requested_columns(client, post, queries):
+    before = queries.count
+    items = client.get("/api/blog_post/?limit=1&fields=title,id").json()["items"]
+    assert items == [{"title": "Sparse", "id": post["id"]}]
+    # The content column is not even read from the database
+    assert not any("content" in statement for statement in queries.statements[before:])
+
+    comments = client.get(f"/api/blog_posts/{post['id']}/comments?fields=content").json()
+    assert comments == [{"content": "Sparse comment"}]
+    page = client.get("/api/comments/?limit=1&fields=id,blog_post_id").json()
+    assert page["items"][0].keys() == {"id", "blog_post_id"}
+
+
+def test_fields_beyond_the_full_model_are_kept(client, post):
+    names = ["id", "title", "content", "user_id", "created_at", "updated_at", "excerpt"]
+    item = client.get(f"/api/blog_post/?limit=1&fields={','.join(names)}").json()["items"][0]
+    assert item["id"] == post["id"]
+    assert item["content"] == post["content"]
+    assert item["excerpt"] == "x" * EXCERPT_LENGTH
+    assert item.keys() == set(names)
+
+
+def test_summary_view_replaces_content_with_an_excerpt(client, post):
+    item = client.get("/api/blog_post/?limit=1&view=summary").json()["items"][0]
+    assert item["id"] == post["id"]
+    assert "content" not in item
+    assert item["excerpt"] == "x" * EXCERPT_LENGTH
+    assert item["author_name"] == "Sparse"
+
+    full = client.get("/api/blog_post/?limit=1&view=full").json()["items"][0]
+    assert full["content"] == post["content"]
+
+
+@pytest.mark.parametrize("params", ["fields=title,secret", "fields=,", "view=compact"])
+def test_invalid_fields_are_rejected(client, params):
+    assert client.get(f"/api/blog_post/?{params}").status_code == 400
+    assert client.get(f"/api/comments/?{params}").status_code == 400
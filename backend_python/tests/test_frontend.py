@@ -0,0 +1,109 @@
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.compression import choose_encoding
+from app.frontend import IMMUTABLE, REVALIDATE, Frontend, precompress
+
+INDEX = b"<!doctype html><div id=root></div>" + b" " * 2000
+BUNDLE = b"console.log('app');" * 200
+
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_bytes(INDEX)
+    (tmp_path / "assets" / "index-BQ3x_kd1.js").write_bytes(BUNDLE)
+    (tmp_path / "favicon.ico").write_bytes(b"\0" * 100)
+    precompress(str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def spa(build):
+    frontend = Frontend(str(build))
+    app = FastAPI()
+
+    @app.get("/{full_path:path}")
+    async def serve(full_path: str, request: Request):
+        return (frontend.get(full_path) or frontend.index).response(request)
+
+    return TestClient(app)
+
+
+def test_hashed_assets_are_immutable_and_precompressed(spa):
+    response = spa.get("/assets/index-BQ3x_kd1.js", headers={"Accept-Encoding": "gzip"})
+    assert response.content == BUNDLE
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].startswith('W/"')
+
+    identity = spa.get("/assets/index-BQ3x_kd1.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["content-length"] == str(len(BUNDLE))
+
+
+def test_index_fallback_and_revalidation(spa):
+    response = spa.get("/posts/1", headers={"Accept-Encoding": "gzip"})
+    assert response.content == INDEX
+    assert response.headers["cache-control"] == REVALIDATE
+
+    # A tag from either encoding revalidates the other
+    response = spa.get("/", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+    assert spa.get("/favicon.ico").headers["cache-control"] == REVALIDATE
+
+
+def test_stale_variants_are_ignored(build):
+    bundle = build / "assets" / "index-BQ3x_kd1.js"
+    stat = os.stat(bundle)
+    os.utime(bundle.with_name(bundle.name + ".gz"), (stat.st_atime, stat.st_mtime - 60))
+    assert "gzip" not in Frontend(str(build)).get("assets/index-BQ3x_kd1.js").variants
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip;q=1, br;q=0", "gzip"),
+        ("*", "br"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header, ("br", "gzip")) == expected
+
+
+def test_large_api_responses_are_compressed(client):
+    user = client.post(
+        "/api/users/", json={"name": "Compressed", "email": "compressed@example.com"}
+    ).json()
+    for i in range(20):
+        client.post(
+            "/api/blog_post/",
+            json={"title": f"Compressed {i}", "content": "x" * 100, "user_id": user["id"]},
+        )
+
+    response = client.get("/api/blog_post/?limit=20", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"].startswith('W/"')
+    assert len(response.json()["items"]) == 20
+    revalidated = client.get(
+        "/api/blog_post/?limit=20",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]},
+    )
+    assert revalidated.status_code == 304
+
+    small = client.get(f"/api/users/{user['id']}", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    stream = client.get(
+        "/api/blog_post/?stream=1",
+        headers={"Accept-Encoding": "gzip", "Accept": "application/x-ndjson"},
+    )
+    assert stream.headers["content-encoding"] == "gzip"
+    assert len(stream.text.splitlines()) >= 20
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app import database
+from app.group_commit import GroupCommit
+from app.routers import comments
+from app.schemas import CommentCreate
+
+
+def _author_and_post(client):
+    tag = uuid.uuid4().hex[:8]
+    user = client.post(
+        "/api/users/", json={"name": "Grouped", "email": f"{tag}@group.example.com"}
+    ).json()
+    post = client.post(
+        "/api/blog_post/", json={"title": "Grouped", "content": "C", "user_id": user["id"]}
+    ).json()
+    return user, post
+
+
+def test_concurrent_comments_share_a_commit(client, monkeypatch):
+    user, post = _author_and_post(client)
+    monkeypatch.setattr(comments, "COMMENT_GROUP_COMMIT", True)
+    monkeypatch.setattr(comments.comment_writes, "window", 0.2)
+    flushes = comments.comment_writes.flushes
+
+    bodies = [
+        {"content": f"c{i}", "user_id": user["id"], "blog_post_id": post["id"]} for i in range(8)
+    ]
+    bodies.append({"content": "bad", "user_id": 0, "blog_post_id": post["id"]})
+    responses = [None] * len(bodies)
+
+    def create(index):
+        responses[index] = client.post("/api/comments/", json=bodies[index])
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(len(bodies))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    created = [response.json() for response in responses[:-1]]
+    assert {response.status_code for response in responses[:-1]} == {201}
+    assert [comment["content"] for comment in created] == [body["content"] for body in bodies[:-1]]
+    assert len({comment["id"] for comment in created}) == 8
+    assert all(comment["blog_post_title"] == "Grouped" for comment in created)
+    assert responses[-1].status_code == 400
+    assert responses[-1].json()["detail"] == "User not found"
+    assert comments.comment_writes.flushes - flushes < len(bodies)
+    assert client.get(f"/api/blog_post/{post['id']}").json()["comment_count"] == 8
+
+
+def test_rows_failing_at_insert_are_isolated(client, monkeypatch):
+    user, post = _author_and_post(client)
+    lookup = comments._lookup_references
+
+    def stale_lookup(db, queued):
+        # As if post 0 existed when the references were checked, then was deleted
+        author_names, blog_post_titles = lookup(db, queued)
+        return author_names, {**blog_post_titles, 0: "Deleted"}
+
+    monkeypatch.setattr(comments, "_lookup_references", stale_lookup)
+    queued = [
+        CommentCreate(content="kept", user_id=user["id"], blog_post_id=post["id"]),
+        CommentCreate(content="lost", user_id=user["id"], blog_post_id=0),
+        CommentCreate(content="kept too", user_id=user["id"], blog_post_id=post["id"]),
+    ]
+    with database.SessionLocal() as db:
+        results = comments._create_comment_group(db, queued)
+
+    assert [result["content"] for result in (results[0], results[2])] == ["kept", "kept too"]
+    assert isinstance(results[1], HTTPException) and results[1].detail == "Blog post not found"
+    assert client.get(f"/api/blog_post/{post['id']}").json()["comment_count"] == 2
+
+
+def test_full_queue_is_turned_away():
+    async def scenario():
+        writes = GroupCommit("test", lambda db, items: items, window=0.05, max_pending=2)
+        queued = [asyncio.create_task(writes.submit(i)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            await writes.submit(2)
+        assert error.value.status_code == 503
+        assert await asyncio.gather(*queued) == [0, 1]
+        assert writes.stats()["flushes"] == 1
+        assert await writes.submit(3) == 3
+
+    asyncio.run(scenario())
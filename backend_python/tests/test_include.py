@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def author(client):
+    tag = uuid.uuid4().hex[:8]
+    return client.post(
+        "/api/users/", json={"name": f"Includer {tag}", "email": f"{tag}@include.example.com"}
+    ).json()
+
+
+def _post(client, author, comments=0):
+    post = client.post(
+        "/api/blog_post/", json={"title": "Included", "content": "body", "user_id": author["id"]}
+    ).json()
+    created = [
+        client.post(
+            "/api/comments/",
+            json={"content": f"c{i}", "user_id": author["id"], "blog_post_id": post["id"]},
+        ).json()
+        for i in range(comments)
+    ]
+    return post, created
+
+
+def test_blog_post_list_includes_author_and_limited_comments(client, author, queries):
+    posts = [_post(client, author, comments=3) for _ in range(2)]
+
+    page = client.get("/api/blog_post/?limit=2&include=author,comments&include_limit=2").json()
+    newest, newest_comments = posts[-1]
+    item = page["items"][0]
+    assert item["id"] == newest["id"]
+    assert item["author"] == author
+    assert [c["id"] for c in item["comments"]] == [c["id"] for c in newest_comments[::-1][:2]]
+    assert "blog_post_title" not in item["comments"][0]
+    assert item["comments"][0]["author_name"] == author["name"]
+
+    # The query count does not depend on the page size
+    counts = []
+    for limit in (1, 2):
+        before = queries.count
+        client.get(f"/api/blog_post/?limit={limit}&include=author,comments")
+        counts.append(queries.count - before)
+    assert counts[0] == counts[1]
+
+
+def test_detail_routes_include_relations(client, author):
+    post, comments = _post(client, author, comments=1)
+
+    comment = client.get(f"/api/comments/{comments[0]['id']}?include=author,blog_post").json()
+    assert comment["author"] == author
+    assert comment["blog_post"]["id"] == post["id"]
+    assert comment["blog_post"]["comment_count"] == 1
+
+    user = client.get(f"/api/users/{author['id']}?include=blog_posts,comments").json()
+    assert [p["id"] for p in user["blog_posts"]] == [post["id"]]
+    assert user["comments"][0]["blog_post_title"] == "Included"
+    assert "blog_posts" not in client.get(f"/api/users/{author['id']}").json()
+
+
+def test_include_etag_follows_children(client, author):
+    post, _ = _post(client, author)
+    url = f"/api/blog_post/{post['id']}?include=comments"
+    response = client.get(url)
+    assert response.json()["comments"] == []
+
+    client.post(
+        "/api/comments/",
+        json={"content": "new", "user_id": author["id"], "blog_post_id": post["id"]},
+    )
+    response = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 200
+    assert [c["content"] for c in response.json()["comments"]] == ["new"]
+
+
+def test_include_validation(client):
+    assert client.get("/api/blog_post/?include=tags").status_code == 400
+    assert client.get("/api/comments/?fields=content&include=author").status_code == 400
+    assert client.get("/api/comments/?stream=1&include=author").status_code == 400
@@ -0,0 +1,77 @@
+import json
+import re
+import uuid
+
+import pytest
+
+from app import instrumentation
+
+
+def _timing(response) -> dict[str, str]:
+    return dict(
+        re.match(r"(\w+);(.*)", metric.strip()).groups()
+        for metric in response.headers["server-timing"].split(",")
+    )
+
+
+def _log_records(output: str) -> list[dict]:
+    return [json.loads(line) for line in output.splitlines() if line.startswith("{")]
+
+
+@pytest.fixture(scope="module")
+def blog_post_with_comments(client):
+    email = f"{uuid.uuid4().hex}@example.com"
+    user = client.post("/api/users/", json={"name": "Timed", "email": email}).json()
+    blog_post = client.post(
+        "/api/blog_post/", json={"title": "Timed", "content": "Timed", "user_id": user["id"]}
+    ).json()
+    for i in range(instrumentation.N_PLUS_ONE_THRESHOLD + 1):
+        client.post(
+            "/api/comments/",
+            json={"content": f"c{i}", "user_id": user["id"], "blog_post_id": blog_post["id"]},
+        )
+    return blog_post
+
+
+def test_server_timing_header(client, blog_post_with_comments):
+    response = client.get("/api/users/")
+    timing = _timing(response)
+    assert set(timing) == {"db", "pool", "serialize", "total"}
+    assert re.match(r'dur=[\d.]+;desc="[1-9]\d* quer(y|ies)"', timing["db"])
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/users/",
+        "/api/blog_post/",
+        "/api/blog_post/?sort=discussed",
+        "/api/comments/",
+        "/api/blog_posts/{id}/comments",
+        "/api/blog_post/{id}",
+    ],
+)
+def test_read_endpoints_have_no_n_plus_one(client, blog_post_with_comments, capsys, path):
+    capsys.readouterr()
+    response = client.get(path.format(id=blog_post_with_comments["id"]))
+    assert response.status_code == 200
+    assert not any("n_plus_one" in record for record in _log_records(capsys.readouterr().out))
+
+
+def test_repeated_statements_are_flagged(client, monkeypatch, capsys):
+    monkeypatch.setattr(instrumentation, "N_PLUS_ONE_THRESHOLD", 1)
+    capsys.readouterr()
+    client.get("/api/users/")
+    (record,) = _log_records(capsys.readouterr().out)
+    assert record["path"] == "/api/users/"
+    assert record["n_plus_one"][0]["count"] >= 1
+
+
+def test_slow_queries_are_explained(client, blog_post_with_comments, monkeypatch, capsys):
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_MS", 0)
+    capsys.readouterr()
+    response = client.get(f"/api/blog_post/{blog_post_with_comments['id']}")
+    assert response.status_code == 200
+    (record,) = _log_records(capsys.readouterr().out)
+    assert record["slow_queries"]
+    assert any("Scan" in line for line in record["slow_queries"][0]["plan"])
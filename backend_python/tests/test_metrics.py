@@ -0,0 +1,31 @@
+from app.metrics import sample
+from app.websocket import manager
+
+
+def _value(client, line_prefix: str) -> float:
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_requests_are_counted_per_route_template(client):
+    counter = 'http_requests_total{method="GET",route="/api/users/{user_id}",status="404"}'
+    before = _value(client, counter)
+    client.get("/api/users/999999")
+    client.get("/api/users/999998")
+    assert _value(client, counter) == before + 2
+
+
+def test_latency_histogram(client):
+    client.get("/api/users/")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/users/"}' in response.text
+
+
+def test_sampled_gauges(client):
+    client.get("/api/users/")
+    sample(manager)
+    assert _value(client, 'db_pool_size{pool="sync"}') > 0
+    assert _value(client, "websocket_connections") == 0
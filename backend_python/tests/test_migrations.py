@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import text
+
+from app import migrations
+from app.database import engine
+from app.migrations import MigrationError, migrate, split_statements
+
+
+@pytest.fixture
+def migrations_dir(client, tmp_path):
+    (tmp_path / "001_create.sql").write_text(
+        "CREATE TABLE migration_test (id SERIAL PRIMARY KEY, note TEXT);\n"
+        "INSERT INTO migration_test (note) VALUES ('semi;colon');\n"
+    )
+    (tmp_path / "002_index.sql").write_text(
+        "-- migrate:no-transaction\n"
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_migration_test_note ON migration_test(note);\n"
+    )
+    yield tmp_path
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS migration_test"))
+        conn.execute(
+            text("DELETE FROM migrations WHERE filename IN ('001_create.sql', '002_index.sql')")
+        )
+
+
+class CountingCursor:
+    def __init__(self, cursor, statements):
+        self.cursor = cursor
+        self.statements = statements
+
+    def execute(self, statement, *args):
+        self.statements.append(statement)
+        return self.cursor.execute(statement, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class CountingEngine:
+    def __init__(self):
+        self.statements = []
+
+    def raw_connection(self):
+        connection = engine.raw_connection()
+        cursor = connection.cursor
+        connection.cursor = lambda: CountingCursor(cursor(), self.statements)
+        return connection
+
+
+def test_applies_pending_files_once(migrations_dir, monkeypatch):
+    assert migrate(migrations_dir) == ["001_create.sql", "002_index.sql"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT note FROM migration_test")).scalar() == "semi;colon"
+        assert conn.execute(text("SELECT to_regclass('idx_migration_test_note')")).scalar()
+
+    counting = CountingEngine()
+    monkeypatch.setattr(migrations, "engine", counting)
+    assert migrate(migrations_dir) == []
+    assert len(counting.statements) == 1
+
+
+def test_concurrent_runners_apply_each_file_once(migrations_dir):
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(migrate, [migrations_dir] * 4))
+    assert sorted(len(applied) for applied in results) == [0, 0, 0, 2]
+
+
+def test_modified_file_is_rejected(migrations_dir):
+    migrate(migrations_dir)
+    (migrations_dir / "001_create.sql").write_text("SELECT 1;")
+    with pytest.raises(MigrationError):
+        migrate(migrations_dir)
+
+
+def test_missing_or_empty_directory_is_an_error(tmp_path):
+    # Rather than a successful run against an empty schema
+    with pytest.raises(MigrationError, match="not found"):
+        migrate(tmp_path / "missing")
+    with pytest.raises(MigrationError, match="No migration files"):
+        migrate(tmp_path)
+
+
+def test_split_statements():
+    sql = """
+    -- a comment; not a statement
+    INSERT INTO t VALUES ('a;b', 'it''s');
+    CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql;
+    /* block; */ SELECT 2
+    """
+    assert split_statements(sql) == [
+        "INSERT INTO t VALUES ('a;b', 'it''s')",
+        "CREATE FUNCTION f() RETURNS int AS $body$ SELECT 1; $body$ LANGUAGE sql",
+        "SELECT 2",
+    ]
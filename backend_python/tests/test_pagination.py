@@ -0,0 +1,89 @@
+import uuid
+
+import pytest
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def author(client):
+    tag = uuid.uuid4().hex[:8]
+    return client.post(
+        "/api/users/", json={"name": f"Pager {tag}", "email": f"{tag}@page.example.com"}
+    ).json()
+
+
+def _post(client, author, title="Paged"):
+    return client.post(
+        "/api/blog_post/", json={"title": title, "content": "body", "user_id": author["id"]}
+    ).json()
+
+
+def _walk(client, url, limit):
+    ids = []
+    cursor = None
+    while True:
+        params = {"limit": limit}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get(url, params=params).json()
+        assert len(page["items"]) <= limit
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_the_full_list_in_order(client, author):
+    post = _post(client, author)
+    for i in range(5):
+        client.post(
+            "/api/comments/",
+            json={"content": f"c{i}", "user_id": author["id"], "blog_post_id": post["id"]},
+        )
+
+    url = f"/api/blog_posts/{post['id']}/comments"
+    full = [comment["id"] for comment in client.get(url).json()]
+    assert len(full) == 5
+    assert _walk(client, url, 2) == full
+    assert _walk(client, url, 5) == full
+
+
+def test_inserts_between_pages_do_not_shift_later_pages(client, author):
+    for i in range(3):
+        _post(client, author, f"Older {i}")
+
+    first = client.get("/api/blog_post/", params={"limit": 2}).json()
+    newer = _post(client, author, "Newer")
+    second = client.get(
+        "/api/blog_post/", params={"limit": 2, "cursor": first["next_cursor"]}
+    ).json()
+
+    first_ids = [item["id"] for item in first["items"]]
+    second_ids = [item["id"] for item in second["items"]]
+    # Keyset pages continue after the last row seen: nothing repeats, the new row is not pulled in
+    assert not set(first_ids) & set(second_ids)
+    assert newer["id"] not in second_ids
+    assert max(second_ids) < min(first_ids)
+
+
+def test_unpaginated_requests_keep_the_plain_list(client, author):
+    _post(client, author)
+    assert isinstance(client.get("/api/users/").json(), list)
+    assert isinstance(client.get("/api/users/", params={"limit": 1}).json(), dict)
+
+
+@pytest.mark.parametrize(
+    "url", ["/api/users/", "/api/blog_post/", "/api/comments/", "/api/blog_posts/1/comments"]
+)
+@pytest.mark.parametrize("cursor", ["bogus", encode_cursor(5, 1), "WyJub3QgYSBkYXRlIiwxXQ"])
+def test_invalid_cursors_are_rejected(client, url, cursor):
+    response = client.get(url, params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(3.5, 12)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, float) == (3.5, 12)
@@ -0,0 +1,68 @@
+import time
+import uuid
+
+from app import purge
+
+
+def _user(client, name):
+    tag = uuid.uuid4().hex[:8]
+    return client.post(
+        "/api/users/", json={"name": name, "email": f"{tag}@purge.example.com"}
+    ).json()
+
+
+def _wait_for_purge(client, user_id):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = client.get(f"/api/users/{user_id}/purge").json()
+        if status["status"] != "running":
+            return status
+        time.sleep(0.02)
+    raise AssertionError("purge did not finish")
+
+
+def test_background_purge_deletes_in_batches(client, monkeypatch):
+    monkeypatch.setattr(purge, "PURGE_BATCH_SIZE", 2)
+    monkeypatch.setattr(purge, "PURGE_PAUSE", 0)
+    author, other = _user(client, "Prolific"), _user(client, "Other")
+    others_post = client.post(
+        "/api/blog_post/", json={"title": "Kept", "content": "C", "user_id": other["id"]}
+    ).json()
+    kept = client.post(
+        "/api/comments/",
+        json={"content": "kept", "user_id": other["id"], "blog_post_id": others_post["id"]},
+    ).json()
+    posts = [
+        client.post(
+            "/api/blog_post/", json={"title": "Gone", "content": "C", "user_id": author["id"]}
+        ).json()
+        for _ in range(3)
+    ]
+    for post in [*posts, others_post, others_post]:
+        client.post(
+            "/api/comments/",
+            json={"content": "x", "user_id": author["id"], "blog_post_id": post["id"]},
+        )
+    client.post(
+        "/api/comments/",
+        json={"content": "y", "user_id": other["id"], "blog_post_id": posts[0]["id"]},
+    )
+
+    response = client.delete(f"/api/users/{author['id']}?background=true")
+    assert response.status_code == 202
+    assert response.headers["location"] == f"/api/users/{author['id']}/purge"
+    assert (response.json()["comments_total"], response.json()["blog_posts_total"]) == (6, 3)
+
+    status = _wait_for_purge(client, author["id"])
+    assert status["status"] == "done" and status["finished_at"] is not None
+    assert (status["comments_deleted"], status["blog_posts_deleted"]) == (6, 3)
+    assert client.get(f"/api/users/{author['id']}").status_code == 404
+    assert client.get(f"/api/blog_post/{posts[0]['id']}").status_code == 404
+
+    remaining = client.get(f"/api/blog_post/{others_post['id']}").json()
+    assert (remaining["comment_count"], remaining["last_comment_at"]) == (1, kept["created_at"])
+
+
+def test_purge_of_unknown_user(client):
+    assert client.delete("/api/users/0?background=true").status_code == 404
+    assert client.get("/api/users/0/purge").status_code == 404
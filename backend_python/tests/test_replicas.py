@@ -0,0 +1,75 @@
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from app import database
+from app.replicas import ReplicaSet
+
+from .conftest import QueryCounter
+
+
+def _url(host: str, port=None) -> str:
+    return (
+        f"postgresql://{database.DB_USER}:{database.DB_PASSWORD}@{host}:"
+        f"{port or database.DB_PORT}/{database.DB_NAME}"
+    )
+
+
+# The test database under a second host name stands in for a replica
+REPLICA_URL = _url("127.0.0.1")
+DOWN_URL = _url("127.0.0.1", port=1)
+
+
+def _listen(replica) -> QueryCounter:
+    engine = replica.async_engine.sync_engine if replica.async_engine else replica.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    return counter
+
+
+@pytest.fixture
+def replicas(client, monkeypatch):
+    replica_set = ReplicaSet([REPLICA_URL, DOWN_URL], database.DB_MODE == "async")
+    replica_set.check()
+    monkeypatch.setattr(database, "replicas", replica_set)
+    client.cookies.clear()
+    yield replica_set
+    client.cookies.clear()
+    replica_set.dispose()
+
+
+def test_unreachable_replica_leaves_rotation():
+    replica_set = ReplicaSet([REPLICA_URL, DOWN_URL, REPLICA_URL], database.DB_MODE == "async")
+    assert replica_set.choose() is None  # nothing joins before passing a check
+
+    replica_set.check()
+    up, down, other = replica_set.replicas
+    assert up.healthy and other.healthy and not down.healthy
+    assert {replica_set.choose().name for _ in range(4)} == {up.name, other.name}
+    replica_set.dispose()
+
+
+def test_reads_use_replica_and_writes_stick_to_primary(client, replicas, queries):
+    replica = _listen(replicas.replicas[0])
+
+    user = client.post(
+        "/api/users/", json={"name": "Replica", "email": f"{uuid.uuid4().hex}@replica.example.com"}
+    ).json()
+    assert database.READ_PRIMARY_COOKIE in client.cookies
+    assert replica.count == 0
+
+    # Right after writing, the client reads its own writes from the primary
+    primary_queries = queries.count
+    assert client.get(f"/api/users/{user['id']}").json() == user
+    assert replica.count == 0 and queries.count > primary_queries
+
+    # Other clients (no cookie) read from the replica
+    client.cookies.clear()
+    primary_queries = queries.count
+    assert client.get(f"/api/users/{user['id']}").json() == user
+    assert replica.count > 0 and queries.count == primary_queries
+
+    response = client.get("/api/blog_posts/0/comments")
+    assert response.status_code == 200
+    assert queries.count == primary_queries
@@ -0,0 +1,89 @@
+import itertools
+
+_emails = itertools.count()
+
+
+def _user(client):
+    response = client.post(
+        "/api/users/", json={"name": "Searcher", "email": f"search{next(_emails)}@example.com"}
+    )
+    return response.json()
+
+
+def _post(client, user, title, content):
+    response = client.post(
+        "/api/blog_post/", json={"title": title, "content": content, "user_id": user["id"]}
+    )
+    return response.json()
+
+
+def test_search_posts_ranks_title_matches_first(client):
+    user = _user(client)
+    in_content = _post(client, user, "Gardening notes", "Why zeppelins fascinate me")
+    in_title = _post(client, user, "Zeppelins", "A short history of airships")
+
+    page = client.get("/api/search", params={"q": "zeppelin"}).json()
+    assert [item["id"] for item in page["items"]] == [in_title["id"], in_content["id"]]
+    assert "<mark>zeppelins</mark>" in page["items"][1]["snippet"]
+    assert page["items"][0]["author_name"] == user["name"]
+
+
+def test_search_tracks_updates(client):
+    user = _user(client)
+    post = _post(client, user, "Draft", "Nothing yet")
+    assert client.get("/api/search", params={"q": "quokka"}).json()["items"] == []
+
+    client.put(f"/api/blog_post/{post['id']}", json={"title": "Quokka", "content": "Smiles"})
+    items = client.get("/api/search", params={"q": "quokka"}).json()["items"]
+    assert [item["id"] for item in items] == [post["id"]]
+
+
+def test_search_pagination(client):
+    user = _user(client)
+    ids = {_post(client, user, f"Marmot {i}", "marmot " * i)["id"] for i in range(1, 6)}
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"q": "marmot", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/search", params=params).json()
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) and set(seen) == ids
+
+
+def test_search_comments(client):
+    user = _user(client)
+    post = _post(client, user, "Pets", "Cats and dogs")
+    comment = client.post(
+        "/api/comments/",
+        json={"content": "My axolotl disagrees", "user_id": user["id"], "blog_post_id": post["id"]},
+    ).json()
+
+    items = client.get("/api/search", params={"q": "axolotl", "type": "comments"}).json()["items"]
+    assert [(item["id"], item["blog_post_id"], item["title"]) for item in items] == [
+        (comment["id"], post["id"], "Pets")
+    ]
+
+
+def test_search_validation(client):
+    assert client.get("/api/search", params={"q": " "}).status_code == 400
+    assert client.get("/api/search", params={"q": "x", "type": "users"}).status_code == 400
+    assert client.get("/api/search", params={"q": "x", "cursor": "bogus"}).status_code == 400
+
+
+def test_snippets_escape_html(client):
+    user = _user(client)
+    _post(client, user, "Payload", "<script>alert('x')</script> the narwhal & \"friends\"")
+
+    items = client.get("/api/search", params={"q": "narwhal"}).json()["items"]
+    snippet = items[0]["snippet"]
+    assert "<mark>narwhal</mark>" in snippet
+    assert "&lt;/script&gt;" in snippet and "&amp;" in snippet
+    # The highlight tags are the only markup left
+    assert "<" not in snippet.replace("<mark>", "").replace("</mark>", "")
+    assert ">" not in snippet.replace("<mark>", "").replace("</mark>", "")
@@ -0,0 +1,69 @@
+import json
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas import BlogPost, BlogPostPage, BlogPostSummary, BlogPostSummaryPage, CommentPage
+from app.serialization import output_fields, projection_model
+
+
+def _post_with_comment(client):
+    tag = uuid.uuid4().hex[:8]
+    user = client.post(
+        "/api/users/", json={"name": "Zoë ✓", "email": f"{tag}@serialize.example.com"}
+    ).json()
+    post = client.post(
+        "/api/blog_post/",
+        json={"title": "Ünïcode “quotes”", "content": "x" * 300, "user_id": user["id"]},
+    ).json()
+    client.post(
+        "/api/comments/",
+        json={"content": "first", "user_id": user["id"], "blog_post_id": post["id"]},
+    )
+    return post
+
+
+def _validated(model, body: bytes) -> bytes:
+    # What FastAPI rendered through response_model=..., response_model_exclude_unset=True
+    value = TypeAdapter(model).validate_python(json.loads(body))
+    content = jsonable_encoder(value, exclude_unset=True)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def test_output_fields_follow_response_model_order():
+    assert output_fields(None, BlogPost, BlogPostSummary) == tuple(BlogPost.model_fields)
+    assert output_fields(("created_at", "id"), BlogPost, BlogPostSummary) == ("id", "created_at")
+    full = tuple(reversed(BlogPost.model_fields))
+    assert output_fields(full, BlogPost, BlogPostSummary) == tuple(BlogPost.model_fields)
+    # Fields the full model does not have switch to the summary model instead of being dropped
+    assert projection_model((*full, "excerpt"), BlogPost, BlogPostSummary) is BlogPostSummary
+
+
+def test_list_bodies_match_response_model(client):
+    _post_with_comment(client)
+    full = ",".join(BlogPost.model_fields)
+    cases = [
+        ("/api/blog_post/?limit=5", BlogPostPage),
+        ("/api/blog_post/?limit=5&view=summary", BlogPostSummaryPage),
+        ("/api/blog_post/?limit=5&fields=title,id", BlogPostSummaryPage),
+        (f"/api/blog_post/?limit=5&fields={full}", BlogPostPage),
+        (f"/api/blog_post/?limit=5&fields={full},excerpt", BlogPostSummaryPage),
+        ("/api/comments/?limit=5", CommentPage),
+    ]
+    for url, model in cases:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == _validated(model, response.content), url
+
+
+def test_blog_post_comments_fast_path_keeps_etag(client):
+    post = _post_with_comment(client)
+    url = f"/api/blog_posts/{post['id']}/comments?limit=10"
+
+    response = client.get(url)
+    assert [item["content"] for item in response.json()["items"]] == ["first"]
+    assert response.json()["items"][0]["blog_post_title"] is None
+    etag = response.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+from sqlalchemy import text
+
+from app.routers import blog_posts
+from app.single_flight import SingleFlight
+
+
+async def _concurrent(flights: SingleFlight, count: int, generation: int = 0):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    results = await asyncio.gather(
+        *(flights.do(("body", "k"), load, generation) for _ in range(count))
+    )
+    return calls, results
+
+
+def test_concurrent_calls_share_one_load():
+    flights = SingleFlight(ttl=0)
+    calls, results = asyncio.run(_concurrent(flights, 10))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"leaders": 1, "joined": 9, "reused": 0, "waiting": 0, "in_flight": 0}
+
+
+async def _generations(flights: SingleFlight):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        call = len(calls)
+        await asyncio.sleep(0.01)
+        return call
+
+    before = asyncio.create_task(flights.do(("etag", "k"), load, 0))
+    await asyncio.sleep(0)
+    # Invalidated since the first flight started: not joined
+    after = await flights.do(("etag", "k"), load, 1)
+    return await before, after
+
+
+def test_flights_are_not_joined_across_invalidations():
+    assert asyncio.run(_generations(SingleFlight(ttl=0))) == (1, 2)
+
+
+async def _cancelled_leader(flights: SingleFlight):
+    async def load():
+        await asyncio.sleep(0.05)
+        return "loaded"
+
+    leader = asyncio.create_task(flights.do(("body", "k"), load))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do(("body", "k"), load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    return await follower
+
+
+def test_follower_takes_over_from_a_cancelled_leader():
+    flights = SingleFlight(ttl=0)
+    assert asyncio.run(_cancelled_leader(flights)) == "loaded"
+    assert flights.leaders == 2
+
+
+async def _sequential(flights: SingleFlight):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    return [await flights.do(("body", "k"), load) for _ in range(3)]
+
+
+def test_micro_ttl_reuses_finished_results():
+    assert asyncio.run(_sequential(SingleFlight(ttl=0))) == [1, 2, 3]
+    assert asyncio.run(_sequential(SingleFlight(ttl=60))) == [1, 1, 1]
+
+
+def test_identical_requests_share_queries(client, monkeypatch):
+    user = client.post("/api/users/", json={"name": "Viral", "email": "viral@example.com"}).json()
+    post = client.post(
+        "/api/blog_post/", json={"title": "Viral", "content": "C", "user_id": user["id"]}
+    ).json()
+
+    calls = []
+    load_etag = blog_posts._blog_post_etag
+
+    def slow_etag(db, *args):
+        calls.append(1)
+        # Keeps the first request in flight while the others arrive
+        db.execute(text("SELECT pg_sleep(0.3)"))
+        return load_etag(db, *args)
+
+    monkeypatch.setattr(blog_posts, "_blog_post_etag", slow_etag)
+    responses = []
+
+    def fetch():
+        responses.append(client.get(f"/api/blog_post/{post['id']}"))
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    stats = client.get("/api/single_flight/stats").json()
+    assert stats["joined"] >= 7 and stats["waiting"] == 0
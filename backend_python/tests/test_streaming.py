@@ -0,0 +1,76 @@
+import json
+import uuid
+
+from app import streaming
+
+
+def _author(client, name="Zoë"):
+    return client.post(
+        "/api/users/", json={"name": name, "email": f"{uuid.uuid4().hex[:8]}@stream.example.com"}
+    ).json()
+
+
+def test_stream_lines_match_paged_items(client):
+    user = _author(client)
+    post = client.post(
+        "/api/blog_post/",
+        json={"title": "Café ☕ streamed", "content": "Crème brûlée", "user_id": user["id"]},
+    ).json()
+
+    response = client.get("/api/blog_post/?stream=1")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = {json.loads(line)["id"]: line for line in response.text.splitlines()}
+    # Non-ASCII is written as is, like the paged responses
+    assert "Café ☕ streamed" in lines[post["id"]]
+
+    paged = {item["id"]: item for item in client.get("/api/blog_post/?limit=100").json()["items"]}
+    assert json.loads(lines[post["id"]]) == paged[post["id"]]
+
+
+def test_accept_header_streams_every_row_in_batches(client, monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_BATCH_SIZE", 2)
+    user = _author(client, "Batched")
+    post = client.post(
+        "/api/blog_post/", json={"title": "Streamed", "content": "C", "user_id": user["id"]}
+    ).json()
+    for i in range(5):
+        client.post(
+            "/api/comments/",
+            json={"content": f"line {i}", "user_id": user["id"], "blog_post_id": post["id"]},
+        )
+
+    response = client.get("/api/comments/", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == len(client.get("/api/comments/").json())
+    assert {row["content"] for row in rows if row["blog_post_id"] == post["id"]} == {
+        f"line {i}" for i in range(5)
+    }
+
+
+def test_fields_apply_to_streams(client):
+    user = _author(client)
+    client.post("/api/blog_post/", json={"title": "Narrow", "content": "C", "user_id": user["id"]})
+    lines = client.get("/api/blog_post/?stream=1&fields=id,title").text.splitlines()
+    assert lines and all(json.loads(line).keys() == {"id", "title"} for line in lines)
+
+
+def test_streams_order_keys_like_the_json_lists(client):
+    user = _author(client)
+    post = client.post(
+        "/api/blog_post/", json={"title": "Ordered", "content": "C", "user_id": user["id"]}
+    ).json()
+    client.post(
+        "/api/comments/", json={"content": "C", "user_id": user["id"], "blog_post_id": post["id"]}
+    )
+    cases = [
+        ("/api/blog_post/", ""),
+        ("/api/blog_post/", "&fields=title,id"),
+        ("/api/blog_post/", "&view=summary"),
+        ("/api/comments/", ""),
+        ("/api/comments/", "&fields=content,id"),
+    ]
+    for url, query in cases:
+        streamed = json.loads(client.get(f"{url}?stream=1{query}").text.splitlines()[0])
+        paged = client.get(f"{url}?limit=1{query}").json()["items"][0]
+        assert list(streamed) == list(paged), (url, query)
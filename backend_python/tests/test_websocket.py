@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import websocket
+from app.database import SessionLocal
+from app.events import EventBus, PostgresBus
+from app.websocket import ConnectionManager, handle_command
+
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.blocked = blocked
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.blocked:
+            await asyncio.Event().wait()
+        self.received.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def _broadcast(policy, messages):
+    manager = ConnectionManager(queue_size=2, policy=policy, send_timeout=5)
+    fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await manager.connect(fast)
+    await manager.connect(slow)
+    for i in range(messages):
+        await manager.broadcast({"seq": i})
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.01)
+    return manager, fast, slow
+
+
+def test_slow_consumer_drops_messages_without_delaying_others():
+    manager, fast, slow = asyncio.run(_broadcast("drop", 5))
+    assert fast.received == [f'{{"seq": {i}}}' for i in range(5)]
+    # One message in flight, two queued, the rest dropped
+    assert manager.stats()["dropped"] == 2
+    assert manager.stats()["max_queue_depth"] == 2
+    assert slow in manager.active_connections
+
+
+def test_slow_consumer_is_evicted():
+    manager, fast, slow = asyncio.run(_broadcast("evict", 5))
+    assert len(fast.received) == 5
+    assert slow not in manager.active_connections
+    assert slow.closed_with == 1013
+    assert manager.stats()["evicted"] == 1
+
+
+def test_commands_from_evicted_connections_are_ignored(monkeypatch):
+    async def evict_then_subscribe():
+        manager = ConnectionManager(queue_size=2, policy="evict", send_timeout=5)
+        monkeypatch.setattr(websocket, "manager", manager)
+        evicted = FakeWebSocket()
+        await manager.connect(evicted)
+        manager._evict(manager.connections[evicted])
+        await handle_command(evicted, {"action": "subscribe", "topics": ["posts"]})
+        await asyncio.sleep(0.01)
+        return manager, evicted
+
+    manager, evicted = asyncio.run(evict_then_subscribe())
+    assert manager.subscriptions == {}
+    assert evicted.received == []
+    assert evicted.closed_with == 1013
+
+
+def test_change_feed_delivers_to_topic_subscribers(client):
+    user = client.post("/api/users/", json={"name": "Feed", "email": "feed@example.com"}).json()
+    post = client.post(
+        "/api/blog_post/", json={"title": "Feed", "content": "x", "user_id": user["id"]}
+    ).json()
+
+    with client.websocket_connect("/ws") as post_feed, client.websocket_connect("/ws") as posts:
+        post_feed.send_text(json.dumps({"action": "subscribe", "topics": [f"post:{post['id']}"]}))
+        assert json.loads(post_feed.receive_text())["type"] == "subscribed"
+        posts.send_text(json.dumps({"action": "subscribe", "topics": ["posts"]}))
+        assert json.loads(posts.receive_text())["type"] == "subscribed"
+
+        comment = client.post(
+            "/api/comments/",
+            json={"content": "hi", "user_id": user["id"], "blog_post_id": post["id"]},
+        ).json()
+        client.put(f"/api/blog_post/{post['id']}", json={"title": "Edited", "content": "x"})
+
+        # The comment only reaches the post's subscribers; the edit reaches both
+        assert json.loads(post_feed.receive_text()) == {
+            "type": "comment.created",
+            "id": comment["id"],
+            "blog_post_id": post["id"],
+        }
+        assert json.loads(post_feed.receive_text()) == {"type": "post.updated", "id": post["id"]}
+        assert json.loads(posts.receive_text()) == {"type": "post.updated", "id": post["id"]}
+
+
+def test_change_feed_rejects_unknown_topics(client):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"action": "subscribe", "topics": ["users"]}))
+        assert json.loads(ws.receive_text())["type"] == "error"
+
+
+def test_buses_must_implement_publish():
+    class Silent(EventBus):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
+
+
+def test_postgres_bus_round_trip(client):
+    async def round_trip():
+        received = asyncio.Queue()
+        bus = PostgresBus(channel="blog_events_test")
+        await bus.start(lambda topics, event: received.put_nowait((topics, event)))
+        try:
+            bus.publish(["post:1"], {"type": "post.updated", "id": 1})
+            return await asyncio.wait_for(received.get(), 5)
+        finally:
+            await bus.stop()
+
+    assert asyncio.run(round_trip()) == (["post:1"], {"type": "post.updated", "id": 1})
+
+
+def test_postgres_bus_reconnects_a_dropped_listener(client):
+    async def drop_and_publish():
+        received = asyncio.Queue()
+        reconnected = asyncio.Event()
+        bus = PostgresBus(channel="blog_events_test", check_interval=0.1)
+        bus.on_reconnect(reconnected.set)
+        await bus.start(lambda topics, event: received.put_nowait((topics, event)))
+        try:
+            with SessionLocal() as db:
+                pid = bus.connection.get_server_pid()
+                db.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": pid})
+            # Nothing is published meanwhile: the worker notices on its own
+            await asyncio.wait_for(reconnected.wait(), 5)
+            bus.publish(["post:2"], {"type": "post.updated", "id": 2})
+            return await asyncio.wait_for(received.get(), 5), bus.stats()
+        finally:
+            await bus.stop()
+
+    event, stats = asyncio.run(drop_and_publish())
+    assert event == (["post:2"], {"type": "post.updated", "id": 2})
+    assert (stats["reconnects"], stats["failed"]) == (1, 0)
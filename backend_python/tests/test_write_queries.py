@@ -0,0 +1,191 @@
+import itertools
+
+import pytest
+
+_emails = itertools.count()
+
+
+def _create_user(client, name="Author"):
+    response = client.post(
+        "/api/users/", json={"name": name, "email": f"user{next(_emails)}@example.com"}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.fixture
+def user(client):
+    return _create_user(client)
+
+
+@pytest.fixture
+def blog_post(client, user):
+    response = client.post(
+        "/api/blog_post/", json={"title": "Title", "content": "Content", "user_id": user["id"]}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.fixture
+def comment(client, user, blog_post):
+    response = client.post(
+        "/api/comments/",
+        json={"content": "Comment", "user_id": user["id"], "blog_post_id": blog_post["id"]},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+# Each write is one data statement plus one version bump (see app/etag.py)
+
+
+def test_create_user(client, queries):
+    email = f"user{next(_emails)}@example.com"
+    response = client.post("/api/users/", json={"name": "New", "email": email})
+    assert response.status_code == 201
+    assert response.json()["email"] == email
+    assert queries.count == 2
+
+
+def test_create_user_duplicate_email(client, user, queries):
+    response = client.post("/api/users/", json={"name": "Dup", "email": user["email"]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+    assert queries.count == 1
+
+
+def test_update_user_email(client, user, queries):
+    email = f"user{next(_emails)}@example.com"
+    response = client.put(f"/api/users/{user['id']}", json={"name": user["name"], "email": email})
+    assert response.status_code == 200
+    assert response.json()["email"] == email
+    assert queries.count == 2
+
+
+def test_update_user_rename(client, user, blog_post, queries):
+    response = client.put(
+        f"/api/users/{user['id']}", json={"name": "Renamed", "email": user["email"]}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    # Renames also look up the posts whose cached responses embed the name
+    assert queries.count == 4
+    assert client.get(f"/api/blog_post/{blog_post['id']}").json()["author_name"] == "Renamed"
+
+
+def test_update_user_not_found(client, queries):
+    response = client.put("/api/users/0", json={"name": "x", "email": "missing@example.com"})
+    assert response.status_code == 404
+    assert queries.count == 1
+
+
+def test_create_blog_post(client, user, queries):
+    response = client.post(
+        "/api/blog_post/", json={"title": "T", "content": "C", "user_id": user["id"]}
+    )
+    assert response.status_code == 201
+    assert response.json()["author_name"] == user["name"]
+    assert queries.count == 2
+
+
+def test_create_blog_post_unknown_user(client, queries):
+    response = client.post("/api/blog_post/", json={"title": "T", "content": "C", "user_id": 0})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User not found"
+    assert queries.count == 1
+
+
+def test_update_blog_post(client, user, blog_post, queries):
+    response = client.put(
+        f"/api/blog_post/{blog_post['id']}", json={"title": "New", "content": "Body"}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["title"], body["author_name"]) == ("New", user["name"])
+    assert body["created_at"] == blog_post["created_at"]
+    assert queries.count == 2
+
+
+def test_update_blog_post_not_found(client, queries):
+    response = client.put("/api/blog_post/0", json={"title": "New", "content": "Body"})
+    assert response.status_code == 404
+    assert queries.count == 1
+
+
+def test_create_comment(client, user, blog_post, queries):
+    response = client.post(
+        "/api/comments/",
+        json={"content": "Hi", "user_id": user["id"], "blog_post_id": blog_post["id"]},
+    )
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["author_name"], body["blog_post_title"]) == (user["name"], blog_post["title"])
+    assert queries.count == 2
+
+
+def test_create_comment_unknown_user(client, blog_post, queries):
+    response = client.post(
+        "/api/comments/", json={"content": "Hi", "user_id": 0, "blog_post_id": blog_post["id"]}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "User not found"
+    assert queries.count == 1
+
+
+def test_create_comment_unknown_blog_post(client, user, queries):
+    response = client.post(
+        "/api/comments/", json={"content": "Hi", "user_id": user["id"], "blog_post_id": 0}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Blog post not found"
+    assert queries.count == 1
+
+
+def test_update_comment(client, user, blog_post, comment, queries):
+    response = client.put(f"/api/comments/{comment['id']}", json={"content": "Edited"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["content"] == "Edited"
+    assert (body["author_name"], body["blog_post_title"]) == (user["name"], blog_post["title"])
+    assert queries.count == 2
+
+
+def test_update_comment_not_found(client, queries):
+    response = client.put("/api/comments/0", json={"content": "Edited"})
+    assert response.status_code == 404
+    assert queries.count == 1
+
+
+def _author_with_content(client, posts, comments_per_post):
+    author, commenter = _create_user(client), _create_user(client, "Commenter")
+    for _ in range(posts):
+        post = client.post(
+            "/api/blog_post/", json={"title": "T", "content": "C", "user_id": author["id"]}
+        ).json()
+        for user in (author, commenter) * comments_per_post:
+            client.post(
+                "/api/comments/",
+                json={"content": "Hi", "user_id": user["id"], "blog_post_id": post["id"]},
+            )
+    return author
+
+
+def test_delete_user_is_set_based(client, queries):
+    # Lock, affected posts (2), comment statistics, three deletes and the version bump
+    counts = []
+    for posts in (1, 4):
+        author = _author_with_content(client, posts, comments_per_post=2)
+        before = queries.count
+        assert client.delete(f"/api/users/{author['id']}").status_code == 200
+        counts.append(queries.count - before)
+        assert client.get(f"/api/users/{author['id']}").status_code == 404
+    assert counts == [8, 8]
+
+
+def test_delete_blog_post_is_set_based(client, user, blog_post, comment, queries):
+    before = queries.count
+    assert client.delete(f"/api/blog_post/{blog_post['id']}").status_code == 200
+    assert queries.count - before == 4
+    assert client.get(f"/api/comments/{comment['id']}").status_code == 404
+    assert client.delete(f"/api/blog_post/{blog_post['id']}").status_code == 404
@@ -13,6 +13,8 @@ export interface BlogPost {
   created_at: Date | string;
   updated_at: Date | string;
   author_name?: string;
+  comment_count?: number;
+  last_comment_at?: Date | string | null;
 }
 
 export interface Comment {